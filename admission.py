@@ -0,0 +1,229 @@
+"""
+解析任务准入控制。
+
+每种格式有独立的并发上限和有界等待队列，所有格式共享一个内存预算：
+- 并发数未满且内存预算足够时立即执行
+- 否则进入该格式的等待队列，队列已满时立即拒绝（Overloaded，HTTP 层返回 429 和 Retry-After）
+- 每个解析任务预计占用的内存按文件大小乘以该格式的膨胀系数估算，
+  超过整个预算的大文件按整个预算计算，即只能单独执行
+- 内存预算不足时为（所有格式中）最早等待的任务预留所需的内存，后到的任务不能占用这部分预算，
+  大文件不会因为其他格式的小文件不断插队而一直等待
+
+过载时新请求快速失败，已接受的请求耗时可预期，而不是所有请求一起变慢、一起耗尽内存。
+只能在事件循环所在的线程中使用。
+"""
+import asyncio
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+# 解析时内存占用与文件大小之比的默认估计（按文本为主的文档测得，含图片的文档通常更低）
+DEFAULT_MEMORY_FACTORS = {"pdf": 20.0, "pptx": 5.0, "docx": 20.0, "xlsx": 50.0}
+
+# Retry-After 的取值范围（秒）
+_MIN_RETRY_AFTER = 1
+_MAX_RETRY_AFTER = 60
+
+
+class Overloaded(Exception):
+    """等待队列已满，请求被拒绝"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_format_map(spec: str) -> Dict[str, float]:
+    """
+    解析 "pdf=2,xlsx=1" 形式的配置。
+
+    Raises:
+        ValueError: 格式错误
+    """
+    result = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.partition("=")
+        try:
+            if not sep:
+                raise ValueError
+            result[name.strip().lower()] = float(value)
+        except ValueError:
+            raise ValueError(f"无效的配置项: {part}，应为 格式=数值")
+    return result
+
+
+class _Waiter:
+    def __init__(self, future: asyncio.Future, cost: int, queued: bool, seq: int):
+        self.future = future
+        self.cost = cost
+        self.queued = queued
+        # 开始等待的先后顺序（所有格式统一编号）
+        self.seq = seq
+
+
+class _Gate:
+    """一种格式的并发计数和等待队列"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiters: Deque[_Waiter] = deque()
+        # 最近解析耗时的指数移动平均（秒），用于估算 Retry-After
+        self.average_seconds = 1.0
+        self.rejected = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self.waiters if waiter.queued)
+
+
+class AdmissionController:
+    """
+    Args:
+        limits: 各格式同时解析的文件数上限
+        default_limit: limits 中未列出的格式的上限
+        queue_size: 每种格式等待队列的长度上限
+        memory_bytes: 所有解析任务的内存预算（字节），为 0 时不按内存限制
+        memory_factors: 各格式的内存膨胀系数，未列出的格式使用 DEFAULT_MEMORY_FACTORS 或 1
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, default_limit: int = 1,
+                 queue_size: int = 32, memory_bytes: int = 0,
+                 memory_factors: Optional[Dict[str, float]] = None):
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.queue_size = queue_size
+        self.memory_bytes = memory_bytes
+        self.memory_factors = {**DEFAULT_MEMORY_FACTORS, **(memory_factors or {})}
+        self.memory_used = 0
+        self._gates: Dict[str, _Gate] = {}
+        self._seq = itertools.count()
+
+    def _gate(self, fmt: str) -> _Gate:
+        gate = self._gates.get(fmt)
+        if gate is None:
+            gate = self._gates[fmt] = _Gate(max(1, int(self.limits.get(fmt, self.default_limit))))
+        return gate
+
+    def cost(self, fmt: str, size: int) -> int:
+        """文件预计占用的内存（字节），不超过整个内存预算"""
+        if self.memory_bytes <= 0:
+            return 0
+        return min(int(size * self.memory_factors.get(fmt, 1.0)), self.memory_bytes)
+
+    def _fits_memory(self, cost: int) -> bool:
+        return self.memory_bytes <= 0 or self.memory_used + cost <= self.memory_bytes
+
+    def _heads(self) -> List[Tuple[_Gate, _Waiter]]:
+        """并发数未满的格式的队首等待者，按开始等待的先后排序"""
+        heads = [(gate, gate.waiters[0]) for gate in self._gates.values()
+                 if gate.waiters and gate.active < gate.limit]
+        heads.sort(key=lambda head: head[1].seq)
+        return heads
+
+    def _reserved(self) -> int:
+        """为最早的等待者预留的内存：_wake 之后仍在等待的最早队首等待者只可能是因为内存不足"""
+        heads = self._heads()
+        return heads[0][1].cost if heads else 0
+
+    def _retry_after(self, gate: _Gate) -> int:
+        # 排在前面的任务按当前并发数分批完成所需的时间
+        seconds = gate.average_seconds * (gate.queued + gate.active + 1) / gate.limit
+        return max(_MIN_RETRY_AFTER, min(_MAX_RETRY_AFTER, math.ceil(seconds)))
+
+    async def acquire(self, fmt: str, size: int, queue: bool = True) -> int:
+        """
+        等待 fmt 格式、size 字节的文件获准解析，返回占用的内存额度（传给 release）。
+
+        Args:
+            queue: 为 True 时计入等待队列长度，队列已满时抛出 Overloaded；
+                为 False 时不受队列长度限制（用于已经自行限流的调用方，如批量解析和异步任务）
+
+        Raises:
+            Overloaded: 等待队列已满
+        """
+        gate = self._gate(fmt)
+        cost = self.cost(fmt, size)
+        if not gate.waiters and gate.active < gate.limit and self._fits_memory(cost + self._reserved()):
+            gate.active += 1
+            self.memory_used += cost
+            return cost
+        if queue and gate.queued >= self.queue_size:
+            gate.rejected += 1
+            raise Overloaded(f"服务繁忙：{fmt} 解析任务已满（{gate.active} 个执行中，"
+                             f"{gate.queued} 个等待），请稍后重试", self._retry_after(gate))
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), cost, queue, next(self._seq))
+        gate.waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已获准但调用方随即被取消：归还额度
+                self.release(fmt, cost)
+            else:
+                gate.waiters.remove(waiter)
+                self._wake()
+            raise
+        return cost
+
+    def release(self, fmt: str, cost: int, elapsed: Optional[float] = None) -> None:
+        """归还 acquire 取得的额度；elapsed 为解析耗时（秒），用于估算 Retry-After"""
+        gate = self._gate(fmt)
+        gate.active -= 1
+        self.memory_used -= cost
+        if elapsed is not None:
+            gate.average_seconds = 0.8 * gate.average_seconds + 0.2 * elapsed
+        self._wake()
+
+    def _wake(self) -> None:
+        """
+        按开始等待的先后放行各格式队首、且并发数和内存预算允许的等待者。
+        最早的队首等待者内存不足时为它预留内存，其余等待者只能使用预留之外的预算
+        """
+        while True:
+            reserved = None
+            for gate, waiter in self._heads():
+                if self._fits_memory(waiter.cost + (reserved or 0)):
+                    gate.waiters.popleft()
+                    gate.active += 1
+                    self.memory_used += waiter.cost
+                    waiter.future.set_result(None)
+                    break
+                if reserved is None:
+                    reserved = waiter.cost
+            else:
+                return
+
+    @asynccontextmanager
+    async def slot(self, fmt: str, size: int, queue: bool = True,
+                   timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        acquire 与 release 的上下文管理器形式。
+
+        Raises:
+            TimeoutError: 等待超过 timeout 秒仍未获准
+        """
+        cost = await asyncio.wait_for(self.acquire(fmt, size, queue), timeout)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(fmt, cost, time.monotonic() - start)
+
+    def stats(self) -> Dict[str, object]:
+        """各格式的并发上限、执行中和等待中的任务数、拒绝次数，以及内存预算的使用情况"""
+        return {
+            "formats": {
+                fmt: {"limit": gate.limit, "active": gate.active, "waiting": len(gate.waiters),
+                      "rejected": gate.rejected}
+                for fmt, gate in self._gates.items()
+            },
+            "memory_bytes": self.memory_bytes,
+            "memory_used": self.memory_used
+        }
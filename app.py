@@ -1,11 +1,100 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Header, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from parser import parse_pptx, parse_docx, parse_xlsx, parse_pdf
+from parser import (parse_pptx, parse_docx, parse_xlsx, parse_pdf, iter_parse_pdf, iter_pdf_result,
+                    sniff_format, detect_format, SNIFF_BYTES, SharedProgress)
 from fastapi import status
 from fastapi.openapi.utils import get_openapi
-import requests
+import httpx
 import mimetypes
+import os
+import asyncio
+import functools
+import time
+import zipfile
+from io import BytesIO
+from typing import Awaitable, Callable, List, Optional, Tuple
+from contextlib import AsyncExitStack, asynccontextmanager
+from parse_pool import ParsePool
+from downloader import Downloader
+from spooling import CHUNK_SIZE, MaxBodySizeMiddleware, PayloadTooLarge, SpooledBuffer
+from result_cache import ResultCache
+from jobs import Job, JobManager, JobQueueFull
+from responses import CompressionMiddleware, JSONSerializer, SerializedJSONResponse
+from admission import AdmissionController, Overloaded, parse_format_map
+import metrics
+from metrics import MetricsMiddleware
+from profiling import NULL_PROFILER, Profiler
+
+# 每个 PDF 并行解析页面的进程数，1 表示在解析任务所在进程内解析
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "1"))
+# 解析任务执行池：process（进程池，默认）或 thread（线程池）
+PARSE_POOL_KIND = os.environ.get("PARSE_POOL", "process")
+# 执行池大小，默认为 CPU 核数
+PARSE_POOL_WORKERS = int(os.environ.get("PARSE_POOL_WORKERS", "0")) or None
+
+# /parse-url 下载设置：连接超时和读取超时（秒）、最大下载字节数、转存到磁盘的内存阈值
+DOWNLOAD_CONNECT_TIMEOUT = float(os.environ.get("DOWNLOAD_CONNECT_TIMEOUT", "5"))
+DOWNLOAD_READ_TIMEOUT = float(os.environ.get("DOWNLOAD_READ_TIMEOUT", "30"))
+DOWNLOAD_MAX_BYTES = int(os.environ.get("DOWNLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+DOWNLOAD_MEMORY_BYTES = int(os.environ.get("DOWNLOAD_MEMORY_BYTES", str(8 * 1024 * 1024)))
+# 上传设置：单个文件大小上限、转存到磁盘的内存阈值
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_MEMORY_BYTES = int(os.environ.get("UPLOAD_MEMORY_BYTES", str(8 * 1024 * 1024)))
+# 请求体上限在文件上限之外为 multipart 边界和字段头预留的字节数
+MULTIPART_OVERHEAD = 64 * 1024
+# 解析结果缓存：内存缓存容量、SQLite 数据库路径（为空时不使用磁盘缓存）、磁盘缓存容量。
+# 与 MCP 服务配置同一个 RESULT_CACHE_PATH 即可共享磁盘缓存
+RESULT_CACHE_MEMORY_BYTES = int(os.environ.get("RESULT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH") or None
+RESULT_CACHE_DISK_BYTES = int(os.environ.get("RESULT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+# /parse-batch：单个请求最多包含的文件数、同时解析的文件数（默认为执行池大小的 2 倍）
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "1000"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "0")) or None
+# 异步任务（/jobs）：同时执行的任务数（默认为执行池大小）、等待执行的任务数上限、
+# 任务结束后保留状态和结果的秒数、解析 PDF 时更新进度的间隔秒数
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "0")) or None
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "100"))
+JOB_TTL = float(os.environ.get("JOB_TTL", "3600"))
+JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", "0.5"))
+# JSON 序列化器：json（标准库，默认）或 orjson（未安装时退回标准库）
+JSON_SERIALIZER = os.environ.get("JSON_SERIALIZER", "json")
+# 响应压缩：允许的编码（按优先级，逗号分隔，为空时不压缩）、压缩的最小响应体字节数、
+# gzip 压缩级别和 brotli 压缩质量。gzip 级别 1 的压缩率只比级别 6 低约 10%，
+# 耗时约为其 1/3（见 benchmark.py 的 bench_json_response）
+RESPONSE_COMPRESSION = [e.strip() for e in os.environ.get("RESPONSE_COMPRESSION", "br,gzip").split(",") if e.strip()]
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "1"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))
+# 准入控制：各格式同时解析的文件数（如 "pdf=2,xlsx=1"，未列出的格式为执行池大小）、
+# 每种格式等待队列的长度（队列满时返回 429）、所有解析任务的内存预算（为 0 时不按内存限制），
+# 以及各格式解析时内存占用与文件大小之比的估计（如 "xlsx=80"，未列出的格式使用 admission.py 中的默认值）
+ADMISSION_LIMITS = {fmt: int(n) for fmt, n in parse_format_map(os.environ.get("ADMISSION_LIMITS", "")).items()}
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", "32"))
+ADMISSION_MEMORY_BYTES = int(os.environ.get("ADMISSION_MEMORY_BYTES", str(2 * 1024 * 1024 * 1024)))
+ADMISSION_MEMORY_FACTORS = parse_format_map(os.environ.get("ADMISSION_MEMORY_FACTORS", ""))
+# 解析截止时间（秒）：请求头 X-Request-Timeout 的默认值和上限，0 表示不限制；
+# 异步任务从开始执行时起按 JOB_TIMEOUT 计算
+PARSE_TIMEOUT = float(os.environ.get("PARSE_TIMEOUT", "300"))
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", "0"))
+# 截止时间之后再等待解析器自行停止并返回部分结果的秒数，仍未返回时终止解析进程
+PARSE_KILL_GRACE = float(os.environ.get("PARSE_KILL_GRACE", "2"))
+
+# 按扩展名选择解析器
+PARSERS = {"pptx": parse_pptx, "docx": parse_docx, "xlsx": parse_xlsx, "pdf": parse_pdf}
+PARSER_FORMATS = {parser: fmt for fmt, parser in PARSERS.items()}
+
+class JSONResponse(SerializedJSONResponse):
+    """按 JSON_SERIALIZER 序列化的 JSON 响应"""
+    serializer = JSONSerializer(JSON_SERIALIZER)
+
+parse_pool = ParsePool(PARSE_POOL_KIND, PARSE_POOL_WORKERS)
+downloader = Downloader(DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT, DOWNLOAD_MAX_BYTES,
+                        DOWNLOAD_MEMORY_BYTES)
+result_cache = ResultCache(RESULT_CACHE_MEMORY_BYTES, RESULT_CACHE_PATH, RESULT_CACHE_DISK_BYTES)
+admission = AdmissionController(ADMISSION_LIMITS, parse_pool.max_workers, ADMISSION_QUEUE_SIZE,
+                                ADMISSION_MEMORY_BYTES, ADMISSION_MEMORY_FACTORS)
 
 def clean_and_validate_url(url: str) -> str:
     """
@@ -42,10 +131,177 @@ def clean_and_validate_url(url: str) -> str:
     
     return url
 
+def _extension_format(filename: Optional[str]) -> str:
+    """按扩展名得到文档格式（用作指标标签），不支持的扩展名为 "unknown" """
+    ext = filename.lower().rsplit(".", 1)[-1] if filename and "." in filename else ""
+    return ext if ext in PARSERS else "unknown"
+
+async def _spool_upload(file: UploadFile, profiler=NULL_PROFILER) -> SpooledBuffer:
+    """
+    按块读取上传文件，小文件保存在内存中，超过 UPLOAD_MEMORY_BYTES 后转存到磁盘。
+    
+    Raises:
+        HTTPException: 文件超过 UPLOAD_MAX_BYTES 时返回 413
+    """
+    body = SpooledBuffer(UPLOAD_MEMORY_BYTES, UPLOAD_MAX_BYTES)
+    try:
+        with profiler.stage("decode"), metrics.stage("decode", _extension_format(file.filename)):
+            while chunk := await file.read(CHUNK_SIZE):
+                body.write(chunk)
+    except PayloadTooLarge as e:
+        body.close()
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await file.close()
+    return body
+
+def _source_size(source) -> int:
+    """文件来源的字节数（bytes 或文件路径）"""
+    return len(source) if isinstance(source, bytes) else os.path.getsize(source)
+
+def request_deadline(
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="解析截止时间（秒），不超过 PARSE_TIMEOUT")
+) -> Optional[float]:
+    """由请求头 X-Request-Timeout 和 PARSE_TIMEOUT 得到解析截止时间（time.time() 时间戳），不限制时为 None"""
+    timeout = x_request_timeout
+    if PARSE_TIMEOUT > 0:
+        timeout = min(timeout or PARSE_TIMEOUT, PARSE_TIMEOUT)
+    return None if timeout is None else time.time() + timeout
+
+def request_profiler(
+    profile: bool = Query(False, description="返回各阶段和每页（幻灯片、工作表）的墙钟时间、CPU 时间和内存分配峰值，不使用结果缓存")
+):
+    """profile=true 时提供本次请求的 Profiler（请求期间开启 tracemalloc），否则提供 NULL_PROFILER"""
+    if not profile:
+        yield NULL_PROFILER
+        return
+    with Profiler() as profiler:
+        yield profiler
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """距截止时间的秒数，没有截止时间时为 None"""
+    return None if deadline is None else max(0.0, deadline - time.time())
+
+async def _run_parser(func, source, deadline: Optional[float], **options):
+    """
+    在执行池中解析。解析器在截止时间到达后停止并返回部分结果（"partial": true）；
+    再过 PARSE_KILL_GRACE 秒仍未返回时终止解析进程并抛出 ParseTimeout
+    """
+    document_format = PARSER_FORMATS[func]
+    with metrics.stage("parse", document_format):
+        if deadline is None:
+            result = await parse_pool.run(func, source, **options)
+        else:
+            result = await parse_pool.run_until(deadline + PARSE_KILL_GRACE, func, source,
+                                                deadline=deadline, **options)
+    metrics.count_items(document_format, result)
+    return result
+
+def _json_result(result: dict, document_format: str, profiler=NULL_PROFILER, **kwargs) -> JSONResponse:
+    """
+    序列化解析结果并记录 serialize 阶段耗时。剖析时先单独计时一次序列化，
+    再把剖析结果作为 "profile" 字段加入响应
+    """
+    if profiler.enabled:
+        with profiler.stage("serialize"):
+            JSONResponse.serializer.dumps(result)
+        result = {**result, "profile": profiler.to_dict()}
+    with metrics.stage("serialize", document_format):
+        return JSONResponse(content=result, **kwargs)
+
+async def _parse_cached(func, source, queue: bool = True, deadline: Optional[float] = None,
+                        profiler=NULL_PROFILER, **options):
+    """
+    先查解析结果缓存，未命中时经准入控制后在执行池中解析并写入缓存。
+    计算文件哈希和读写磁盘缓存在线程池中进行，不阻塞事件循环。
+    
+    Args:
+        queue: 传给 admission.acquire；为 True 时等待队列已满会抛出 Overloaded
+        deadline: 解析截止时间（time.time() 时间戳）。等待准入超过截止时间时抛出 TimeoutError；
+            不完整的结果不写入缓存
+        profiler: 开启剖析时不读写缓存，记录 admission、parse 阶段；解析器在执行池中
+            记录的子阶段放入 parse 阶段的 "stages"，每页（幻灯片、工作表）的记录加入 profiler.items
+    """
+    if profiler.enabled:
+        async with AsyncExitStack() as stack:
+            with profiler.stage("admission"):
+                await stack.enter_async_context(
+                    admission.slot(PARSER_FORMATS[func], _source_size(source), queue, _remaining(deadline)))
+            with profiler.stage("parse") as record:
+                result = await _run_parser(func, source, deadline, profile=True, **options)
+        profiler.merge(record, result.pop("profile"))
+        return result
+    key = await run_in_threadpool(result_cache.key, source, func, options)
+    result = await run_in_threadpool(result_cache.get, key)
+    if result is None:
+        async with admission.slot(PARSER_FORMATS[func], _source_size(source), queue, _remaining(deadline)):
+            result = await _run_parser(func, source, deadline, **options)
+        await run_in_threadpool(result_cache.put, key, result)
+    return result
+
+def _parser_options(parser, pages: Optional[str], text: bool, tables: bool, images: bool, mode: str,
+                    preview_rows: Optional[int], string_table: bool) -> dict:
+    """从不区分格式的接口（/parse、/jobs）的查询参数中取出 parser 适用的选项"""
+    if parser is parse_pdf:
+        return {"pages": pages, "text": text, "tables": tables, "images": images,
+                "workers": PDF_WORKERS, "mode": mode}
+    if parser is parse_xlsx:
+        return {"preview_rows": preview_rows, "string_table": string_table}
+    return {}
+
+async def _parse_pdf_with_progress(job: Job, source, deadline: Optional[float]) -> dict:
+    """
+    一次解析 PDF 的全部所选页面，解析期间每隔 JOB_PROGRESS_INTERVAL 秒
+    从共享内存读取已解析的页数和所选页数并更新任务进度
+    """
+    progress = SharedProgress()
+    try:
+        parsing = asyncio.ensure_future(_run_parser(parse_pdf, source, deadline, progress=progress,
+                                                    **job.options))
+        while not parsing.done():
+            await asyncio.wait([parsing], timeout=JOB_PROGRESS_INTERVAL)
+            done, total = progress.value
+            if total:
+                job.progress = done / total
+        return parsing.result()
+    finally:
+        parsing.cancel()
+        progress.close()
+
+async def _run_job(job: Job) -> None:
+    """执行 /jobs 提交的任务：先查解析结果缓存，未命中时解析并写入缓存"""
+    source = job.body.source()
+    key = await run_in_threadpool(result_cache.key, source, job.parser, job.options)
+    # 结果由任务保留到任务过期，不依赖缓存中的条目（可能在过期前被淘汰）
+    job.result = await run_in_threadpool(result_cache.get, key)
+    if job.result is not None:
+        return
+    deadline = time.time() + JOB_TIMEOUT if JOB_TIMEOUT > 0 else None
+    # 任务已由任务队列限流，等待准入时不占用（也不受限于）准入等待队列
+    async with admission.slot(PARSER_FORMATS[job.parser], _source_size(source), False, _remaining(deadline)):
+        if job.parser is parse_pdf and job.options.get("mode") != "outline":
+            result = await _parse_pdf_with_progress(job, source, deadline)
+        else:
+            result = await _run_parser(job.parser, source, deadline, **job.options)
+    await run_in_threadpool(result_cache.put, key, result)
+    job.result = result
+
+job_manager = JobManager(_run_job, JOB_WORKERS or parse_pool.max_workers, JOB_QUEUE_SIZE, JOB_TTL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    parse_pool.start()
+    job_manager.start()
+    yield
+    await job_manager.stop()
+    await downloader.aclose()
+    parse_pool.shutdown()
+
 app = FastAPI(
     title="PPTX 解析微服务",
     description="上传 .pptx 文件，返回结构化 JSON 内容。",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -55,9 +311,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MaxBodySizeMiddleware, max_size=UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD)
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    """准入等待队列已满：返回 429，Retry-After 为预计可以重试的秒数"""
+    return JSONResponse(content={"detail": str(exc)}, status_code=429,
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(TimeoutError)
+async def timeout_handler(request, exc: TimeoutError):
+    """等待准入或解析超过截止时间，且没有可返回的部分结果：返回 504"""
+    return JSONResponse(content={"detail": str(exc) or "解析超时"}, status_code=504)
+
+app.add_middleware(CompressionMiddleware, encodings=RESPONSE_COMPRESSION,
+                   minimum_size=COMPRESSION_MIN_BYTES, gzip_level=GZIP_LEVEL,
+                   brotli_quality=BROTLI_QUALITY)
+# 最外层：统计实际收发的（压缩后）字节数
+app.add_middleware(MetricsMiddleware)
 
 @app.post("/parse-ppt", summary="解析 PPTX 文件", response_description="结构化 JSON 内容", status_code=status.HTTP_200_OK)
-async def parse_ppt(file: UploadFile = File(...)):
+async def parse_ppt(file: UploadFile = File(...), deadline: Optional[float] = Depends(request_deadline),
+                    profiler=Depends(request_profiler)):
     """
     上传 PPTX 文件并解析为结构化 JSON。
     
@@ -66,6 +340,8 @@ async def parse_ppt(file: UploadFile = File(...)):
     2. Content-Type: multipart/form-data
     3. 参数：
        - file: PPTX文件（必需）
+       - profile: 是否剖析（可选，查询参数，默认 false）。开启后结果增加 "profile" 字段，
+         给出各阶段和每张幻灯片的墙钟时间、CPU 时间和内存分配峰值，本次请求不使用结果缓存
        
     返回格式：
     {
@@ -80,6 +356,9 @@ async def parse_ppt(file: UploadFile = File(...)):
     
     错误码：
     - 400：文件格式错误，仅支持.pptx文件
+    - 413：文件超过大小上限（UPLOAD_MAX_BYTES）
+    - 429：该格式的解析任务已满（ADMISSION_LIMITS、ADMISSION_QUEUE_SIZE），按 Retry-After 秒数后重试
+    - 504：超过截止时间（X-Request-Timeout、PARSE_TIMEOUT）且没有可返回的部分结果
     - 500：服务器解析错误
     
     使用示例：
@@ -94,17 +373,28 @@ async def parse_ppt(file: UploadFile = File(...)):
     """
     if not file.filename or not file.filename.endswith(".pptx"):
         raise HTTPException(status_code=400, detail="只支持 .pptx 文件")
-    file_bytes = await file.read()
-    try:
-        result = parse_pptx(file_bytes)
-    except ValueError as ve:
-        raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
-    return JSONResponse(content=result)
+    with await _spool_upload(file, profiler) as body:
+        try:
+            result = await _parse_cached(parse_pptx, body.source(), deadline=deadline, profiler=profiler)
+        except (Overloaded, TimeoutError):
+            raise
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
+    return _json_result(result, "pptx", profiler)
 
 @app.post("/parse-pdf", summary="解析 PDF 文件", response_description="结构化 JSON 内容", status_code=status.HTTP_200_OK)
-async def parse_pdf_file(file: UploadFile = File(...)):
+async def parse_pdf_file(
+    file: UploadFile = File(...),
+    pages: Optional[str] = Query(None, description="要解析的页码范围，如 1-5,10"),
+    text: bool = Query(True, description="是否提取页面文本"),
+    tables: bool = Query(True, description="是否检测并提取表格（最耗时的步骤）"),
+    images: bool = Query(True, description="是否提取图片信息"),
+    mode: str = Query("layout", description="解析模式：layout（版面分析）、fast（仅快速提取文本）或 outline（仅书签和页面标签）"),
+    deadline: Optional[float] = Depends(request_deadline),
+    profiler=Depends(request_profiler)
+):
     """
     上传 PDF 文件并解析为结构化 JSON。
     
@@ -113,6 +403,16 @@ async def parse_pdf_file(file: UploadFile = File(...)):
     2. Content-Type: multipart/form-data
     3. 参数：
        - file: PDF文件（必需）
+       - pages: 页码范围（可选，查询参数），如 "1-5,10"。只分析所选页面，
+         metadata 仍描述整个文档
+       - text / tables / images: 内容开关（可选，查询参数，默认均为 true）。
+         只需要文本时设置 tables=false 可跳过最耗时的表格检测
+       - mode: 解析模式（可选，查询参数，默认 layout）。fast 模式直接从内容流提取文本，
+         不做版面、表格和图片分析，速度约快一个数量级，但阅读顺序和空白可能不够准确；
+         outline 模式只返回书签树（outline）和页面标签（page_labels），不读取页面内容，
+         适合先浏览长文档结构再用 pages 参数解析需要的页
+       - profile: 是否剖析（可选，查询参数，默认 false）。开启后结果增加 "profile" 字段，
+         给出各阶段和每页（多进程解析时不记录每页）的墙钟时间、CPU 时间和内存分配峰值，本次请求不使用结果缓存
        
     返回格式：
     {
@@ -125,9 +425,11 @@ async def parse_pdf_file(file: UploadFile = File(...)):
                     ...
                 ],
                 "images": [
-                    {"bbox": [x1, y1, x2, y2], "type": "image"},
+                    {"object_id": 12, "bbox": [x0, top, x1, bottom], "type": "image",
+                     "width": 100, "height": 80},
                     ...
-                ]
+                ],
+                "scanned": false
             },
             ...
         ],
@@ -137,11 +439,19 @@ async def parse_pdf_file(file: UploadFile = File(...)):
             "author": "作者",
             "subject": "主题",
             "creator": "创建者"
-        }
+        },
+        "images": [
+            {"object_id": 12, "width": 800, "height": 600, "filter": ["DCTDecode"]},
+            ...
+        ]
     }
+    顶层 images 为文档级图片表，每个不同的图片只列出一次，页面通过 object_id 引用。
     
     错误码：
-    - 400：文件格式错误，仅支持.pdf文件
+    - 400：文件格式错误，仅支持.pdf文件；或页码范围无效
+    - 413：文件超过大小上限（UPLOAD_MAX_BYTES）
+    - 429：该格式的解析任务已满（ADMISSION_LIMITS、ADMISSION_QUEUE_SIZE），按 Retry-After 秒数后重试
+    - 504：超过截止时间（X-Request-Timeout、PARSE_TIMEOUT）且没有可返回的部分结果
     - 500：服务器解析错误
     
     使用示例：
@@ -152,21 +462,160 @@ async def parse_pdf_file(file: UploadFile = File(...)):
     files = {'file': open('example.pdf', 'rb')}
     response = requests.post(url, files=files)
     result = response.json()
+    
+    # 只解析第 1-5 页和第 10 页
+    response = requests.post(url, files=files, params={'pages': '1-5,10'})
     ```
     """
     if not file.filename or not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="只支持 .pdf 文件")
-    file_bytes = await file.read()
+    with await _spool_upload(file, profiler) as body:
+        try:
+            result = await _parse_cached(parse_pdf, body.source(), pages=pages, text=text,
+                                         tables=tables, images=images, workers=PDF_WORKERS,
+                                         mode=mode, deadline=deadline, profiler=profiler)
+        except (Overloaded, TimeoutError):
+            raise
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
+    return _json_result(result, "pdf", profiler)
+
+def _ndjson_events(first: tuple, events):
+    """将解析事件编码为 NDJSON 行；解析中途出错时输出 error 事件后结束"""
+    dumps = JSONResponse.serializer.dumps
+    kind, payload = first
+    yield dumps({"type": kind, kind: payload}) + b"\n"
     try:
-        result = parse_pdf(file_bytes)
+        for kind, payload in events:
+            yield dumps({"type": kind, kind: payload}) + b"\n"
+    except Exception as e:
+        yield dumps({"type": "error", "detail": str(e)}) + b"\n"
+
+def _observe_pdf_events(events):
+    """原样产出解析事件，结束时记录 parse 阶段耗时（包括等待客户端读取的时间）和页数"""
+    started = time.perf_counter()
+    pages = 0
+    try:
+        for kind, payload in events:
+            if kind == "page":
+                pages += 1
+            yield kind, payload
+    finally:
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage="parse", format="pdf")
+        metrics.PARSED_ITEMS.inc(pages, format="pdf", kind="page")
+
+async def _stream_then(lines, cleanup: Callable[[], None]):
+    """在线程池中迭代 lines 逐行输出，迭代结束、出错或客户端断开时调用 cleanup"""
+    try:
+        async for line in iterate_in_threadpool(lines):
+            yield line
+    finally:
+        cleanup()
+
+@app.post("/parse-pdf-stream", summary="流式解析 PDF 文件", response_description="NDJSON 事件流", status_code=status.HTTP_200_OK)
+async def parse_pdf_stream(
+    file: UploadFile = File(...),
+    pages: Optional[str] = Query(None, description="要解析的页码范围，如 1-5,10"),
+    text: bool = Query(True, description="是否提取页面文本"),
+    tables: bool = Query(True, description="是否检测并提取表格（最耗时的步骤）"),
+    images: bool = Query(True, description="是否提取图片信息"),
+    mode: str = Query("layout", description="解析模式：layout（版面分析）、fast（仅快速提取文本）或 outline（仅书签和页面标签）"),
+    deadline: Optional[float] = Depends(request_deadline)
+):
+    """
+    上传 PDF 文件并以 NDJSON（每行一个 JSON 对象）流式返回解析结果。
+    
+    与 /parse-pdf 参数相同，但不等待整份文档解析完成：先输出元数据，
+    之后每解析完一页就输出一行，服务端也不在内存中保留完整结果。
+    适合超长文档，客户端可在第一页解析完成后立即开始处理。
+    
+    请求说明：
+    1. 请求方式：POST
+    2. Content-Type: multipart/form-data
+    3. 参数：与 /parse-pdf 相同
+    
+    返回格式（Content-Type: application/x-ndjson）：
+    {"type": "metadata", "metadata": {"total_pages": 10, "title": "文档标题", ...}}
+    {"type": "page", "page": {"page_number": 1, "text": "...", "tables": [...], "images": [...], "scanned": false}}
+    {"type": "page", "page": {"page_number": 2, ...}}
+    ...
+    {"type": "images", "images": [{"object_id": 12, "width": 800, "height": 600, "filter": [...]}]}
+    
+    outline 模式依次输出 metadata、outline、page_labels 三个事件。
+    
+    解析中途出错时输出 {"type": "error", "detail": "错误信息"} 并结束，
+    没有收到 images 事件即表示结果不完整。
+    超过截止时间（X-Request-Timeout、PARSE_TIMEOUT）时在当前页解析完成后停止，
+    输出 {"type": "partial", "partial": true} 和 images 事件后结束。
+    
+    结果缓存中已有相同文件和参数的解析结果时直接输出缓存内容；
+    流式解析的结果不写入缓存。
+    
+    错误码：
+    - 400：文件格式错误，仅支持.pdf文件；页码范围无效；或文件无法打开
+    - 413：文件超过大小上限（UPLOAD_MAX_BYTES）
+    - 429：该格式的解析任务已满（ADMISSION_LIMITS、ADMISSION_QUEUE_SIZE），按 Retry-After 秒数后重试
+    - 504：超过截止时间（X-Request-Timeout、PARSE_TIMEOUT）且没有可返回的部分结果
+    - 500：服务器解析错误
+    
+    使用示例：
+    ```python
+    import json
+    import requests
+    
+    url = 'http://your-server/parse-pdf-stream'
+    files = {'file': open('example.pdf', 'rb')}
+    with requests.post(url, files=files, stream=True) as response:
+        for line in response.iter_lines():
+            event = json.loads(line)
+            if event['type'] == 'page':
+                print(event['page']['page_number'])
+    ```
+    """
+    if not file.filename or not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="只支持 .pdf 文件")
+    body = await _spool_upload(file)
+    options = {"pages": pages, "text": text, "tables": tables, "images": images, "mode": mode}
+    # 流式输出结束（或客户端断开）后依次执行：归还准入额度、删除暂存文件
+    cleanups = [body.close]
+
+    def cleanup():
+        while cleanups:
+            cleanups.pop()()
+
+    try:
+        # 缓存中已有相同文件和选项的结果时直接输出；未命中时边解析边输出，不写入缓存，
+        # 以免为了缓存在内存中保留完整结果
+        source = body.source()
+        key = await run_in_threadpool(result_cache.key, source, parse_pdf, options)
+        cached = await run_in_threadpool(result_cache.get, key)
+        if cached is not None:
+            events = iter_pdf_result(cached)
+        else:
+            cost = await asyncio.wait_for(admission.acquire("pdf", _source_size(source)),
+                                          _remaining(deadline))
+            started = time.monotonic()
+            cleanups.append(lambda: admission.release("pdf", cost, time.monotonic() - started))
+            events = _observe_pdf_events(iter_parse_pdf(source, deadline=deadline, **options))
+        # 先在响应开始前打开文档并取得元数据，文件无效时仍可返回 400
+        first = await run_in_threadpool(next, events)
+    except (Overloaded, TimeoutError):
+        cleanup()
+        raise
     except ValueError as ve:
+        cleanup()
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
+        cleanup()
         raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
-    return JSONResponse(content=result)
+    return StreamingResponse(_stream_then(_ndjson_events(first, events), cleanup),
+                             media_type="application/x-ndjson")
 
 @app.post("/parse-docx", summary="解析 DOCX 文件", response_description="结构化 JSON 内容", status_code=status.HTTP_200_OK)
-async def parse_docx_file(file: UploadFile = File(...)):
+async def parse_docx_file(file: UploadFile = File(...), deadline: Optional[float] = Depends(request_deadline),
+                          profiler=Depends(request_profiler)):
     """
     上传 DOCX 文件并解析为结构化 JSON。
     
@@ -175,6 +624,8 @@ async def parse_docx_file(file: UploadFile = File(...)):
     2. Content-Type: multipart/form-data
     3. 参数：
        - file: DOCX文件（必需）
+       - profile: 是否剖析（可选，查询参数，默认 false）。开启后结果增加 "profile" 字段，
+         给出各阶段和每个表格的墙钟时间、CPU 时间和内存分配峰值，本次请求不使用结果缓存
        
     返回格式：
     {
@@ -191,6 +642,9 @@ async def parse_docx_file(file: UploadFile = File(...)):
     
     错误码：
     - 400：文件格式错误，仅支持.docx文件
+    - 413：文件超过大小上限（UPLOAD_MAX_BYTES）
+    - 429：该格式的解析任务已满（ADMISSION_LIMITS、ADMISSION_QUEUE_SIZE），按 Retry-After 秒数后重试
+    - 504：超过截止时间（X-Request-Timeout、PARSE_TIMEOUT）且没有可返回的部分结果
     - 500：服务器解析错误
     
     使用示例：
@@ -205,17 +659,25 @@ async def parse_docx_file(file: UploadFile = File(...)):
     """
     if not file.filename or not file.filename.endswith(".docx"):
         raise HTTPException(status_code=400, detail="只支持 .docx 文件")
-    file_bytes = await file.read()
-    try:
-        result = parse_docx(file_bytes)
-    except ValueError as ve:
-        raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
-    return JSONResponse(content=result)
+    with await _spool_upload(file, profiler) as body:
+        try:
+            result = await _parse_cached(parse_docx, body.source(), deadline=deadline, profiler=profiler)
+        except (Overloaded, TimeoutError):
+            raise
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
+    return _json_result(result, "docx", profiler)
 
 @app.post("/parse-xlsx", summary="解析 XLSX 文件", response_description="结构化 JSON 内容", status_code=status.HTTP_200_OK)
-async def parse_xlsx_file(file: UploadFile = File(...)):
+async def parse_xlsx_file(
+    file: UploadFile = File(...),
+    preview_rows: Optional[int] = Query(None, ge=0, description="预览模式：每个工作表只读取前 N 行"),
+    string_table: bool = Query(False, description="以字符串表下标输出文本单元格，压缩重复文本"),
+    deadline: Optional[float] = Depends(request_deadline),
+    profiler=Depends(request_profiler)
+):
     """
     上传 XLSX 文件并解析为结构化 JSON。
     
@@ -224,6 +686,12 @@ async def parse_xlsx_file(file: UploadFile = File(...)):
     2. Content-Type: multipart/form-data
     3. 参数：
        - file: XLSX文件（必需）
+       - preview_rows: 预览行数（可选，查询参数）。设置后只读取每个工作表的
+         尺寸（dimension、max_row、max_column）和前 N 行，耗时与表格长度无关
+       - string_table: 是否输出字符串表（可选，查询参数，默认 false）。开启后结果
+         顶层增加 "strings" 列表，文本单元格输出为 {"string_index": 0, "coordinate": "B2"}
+       - profile: 是否剖析（可选，查询参数，默认 false）。开启后结果增加 "profile" 字段，
+         给出各阶段和每个工作表的墙钟时间、CPU 时间和内存分配峰值，本次请求不使用结果缓存
        
     返回格式：
     {
@@ -248,6 +716,9 @@ async def parse_xlsx_file(file: UploadFile = File(...)):
     
     错误码：
     - 400：文件格式错误，仅支持.xlsx文件
+    - 413：文件超过大小上限（UPLOAD_MAX_BYTES）
+    - 429：该格式的解析任务已满（ADMISSION_LIMITS、ADMISSION_QUEUE_SIZE），按 Retry-After 秒数后重试
+    - 504：超过截止时间（X-Request-Timeout、PARSE_TIMEOUT）且没有可返回的部分结果
     - 500：服务器解析错误
     
     使用示例：
@@ -258,21 +729,104 @@ async def parse_xlsx_file(file: UploadFile = File(...)):
     files = {'file': open('example.xlsx', 'rb')}
     response = requests.post(url, files=files)
     result = response.json()
+    
+    # 预览模式：只取每个工作表的前 20 行
+    response = requests.post(url, files=files, params={'preview_rows': 20})
     ```
     """
     if not file.filename or not file.filename.endswith(".xlsx"):
         raise HTTPException(status_code=400, detail="只支持 .xlsx 文件")
-    file_bytes = await file.read()
-    try:
-        result = parse_xlsx(file_bytes)
-    except ValueError as ve:
-        raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
-    return JSONResponse(content=result)
+    with await _spool_upload(file, profiler) as body:
+        try:
+            result = await _parse_cached(parse_xlsx, body.source(), preview_rows=preview_rows,
+                                         string_table=string_table, deadline=deadline, profiler=profiler)
+        except (Overloaded, TimeoutError):
+            raise
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
+    return _json_result(result, "xlsx", profiler)
+
+@app.post("/parse", summary="自动识别格式并解析文件", response_description="结构化 JSON 内容", status_code=status.HTTP_200_OK)
+async def parse_any(
+    file: UploadFile = File(...),
+    pages: Optional[str] = Query(None, description="PDF：要解析的页码范围，如 1-5,10"),
+    text: bool = Query(True, description="PDF：是否提取页面文本"),
+    tables: bool = Query(True, description="PDF：是否检测并提取表格（最耗时的步骤）"),
+    images: bool = Query(True, description="PDF：是否提取图片信息"),
+    mode: str = Query("layout", description="PDF：解析模式 layout、fast 或 outline"),
+    preview_rows: Optional[int] = Query(None, ge=0, description="XLSX：预览模式，每个工作表只读取前 N 行"),
+    string_table: bool = Query(False, description="XLSX：以字符串表下标输出文本单元格"),
+    deadline: Optional[float] = Depends(request_deadline),
+    profiler=Depends(request_profiler)
+):
+    """
+    上传 PPTX、DOCX、XLSX 或 PDF 文件，按文件内容识别格式并解析，不依赖文件名。
+    
+    格式识别：
+    - 文件以 "%PDF-" 开头：PDF
+    - zip 文件：读取 [Content_Types].xml 中主文档部件的内容类型，区分 PPTX、DOCX、XLSX
+      （包括模板和启用宏的变体）
+    文件头既不是 PDF 也不是 zip 时在暂存文件之前直接返回 400；
+    识别只读取文件头、zip 中央目录和 [Content_Types].xml，不打开整个文档。
+    
+    请求说明：
+    1. 请求方式：POST
+    2. Content-Type: multipart/form-data
+    3. 参数：
+       - file: 文件（必需），文件名可以任意
+       - pages / text / tables / images / mode: 与 /parse-pdf 相同，仅对 PDF 有效
+       - preview_rows / string_table: 与 /parse-xlsx 相同，仅对 XLSX 有效
+       - profile: 与 /parse-pdf 等接口相同，额外记录 detect（识别格式）阶段
+    
+    返回格式：与对应格式的接口（/parse-ppt、/parse-docx、/parse-xlsx、/parse-pdf）相同，
+    识别出的格式在响应头 X-Document-Format 中给出（pptx、docx、xlsx 或 pdf）。
+    
+    错误码：
+    - 400：无法识别的文件格式，或文件内容无效
+    - 413：文件超过大小上限（UPLOAD_MAX_BYTES）
+    - 429：该格式的解析任务已满（ADMISSION_LIMITS、ADMISSION_QUEUE_SIZE），按 Retry-After 秒数后重试
+    - 504：超过截止时间（X-Request-Timeout、PARSE_TIMEOUT）且没有可返回的部分结果
+    - 500：服务器解析错误
+    
+    使用示例：
+    ```python
+    import requests
+    
+    url = 'http://your-server/parse'
+    files = {'file': open('report', 'rb')}
+    response = requests.post(url, files=files)
+    print(response.headers['X-Document-Format'], response.json())
+    ```
+    """
+    unsupported = "无法识别的文件格式，只支持 .pptx, .docx, .xlsx, .pdf 文件"
+    # 先检查文件头，明显不支持的文件不必暂存
+    head = await file.read(SNIFF_BYTES)
+    if sniff_format(head) is None:
+        await file.close()
+        raise HTTPException(status_code=400, detail=unsupported)
+    await file.seek(0)
+    with await _spool_upload(file, profiler) as body:
+        source = body.source()
+        with profiler.stage("detect"):
+            document_format = await run_in_threadpool(detect_format, source)
+        if document_format is None:
+            raise HTTPException(status_code=400, detail=unsupported)
+        parser = PARSERS[document_format]
+        options = _parser_options(parser, pages, text, tables, images, mode, preview_rows, string_table)
+        try:
+            result = await _parse_cached(parser, source, deadline=deadline, profiler=profiler, **options)
+        except (Overloaded, TimeoutError):
+            raise
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
+    return _json_result(result, document_format, profiler, headers={"X-Document-Format": document_format})
 
 @app.post("/parse-url", summary="通过URL解析PPT/Word/Excel/PDF文件", response_description="结构化 JSON 内容", status_code=status.HTTP_200_OK)
-async def parse_url(url: str):
+async def parse_url(url: str, deadline: Optional[float] = Depends(request_deadline), profiler=Depends(request_profiler)):
     """
     通过URL下载并解析PPT/Word/Excel/PDF文件，返回结构化JSON。
     
@@ -281,6 +835,7 @@ async def parse_url(url: str):
     2. Content-Type: application/json
     3. 参数：
        - url: 文件的公开URL地址（必需）
+       - profile: 与 /parse-pdf 等接口相同，额外记录 download（下载）阶段
        
     支持的文件类型：
     - .pptx：PowerPoint文件
@@ -329,9 +884,16 @@ async def parse_url(url: str):
            }
        }
     
+    下载限制：
+    - 连接超时 DOWNLOAD_CONNECT_TIMEOUT 秒，读取超时 DOWNLOAD_READ_TIMEOUT 秒
+    - 文件大小上限 DOWNLOAD_MAX_BYTES 字节，超过 DOWNLOAD_MEMORY_BYTES 字节的文件暂存到磁盘
+    
     错误码：
-    - 400：URL无效或文件下载失败
+    - 400：URL无效、文件下载失败或下载超时
     - 400：不支持的文件格式
+    - 413：文件超过大小上限
+    - 429：该格式的解析任务已满（ADMISSION_LIMITS、ADMISSION_QUEUE_SIZE），按 Retry-After 秒数后重试
+    - 504：超过截止时间（X-Request-Timeout、PARSE_TIMEOUT）且没有可返回的部分结果
     - 500：服务器解析错误
     
     使用示例：
@@ -347,22 +909,325 @@ async def parse_url(url: str):
     try:
         # 清理和验证URL
         cleaned_url = clean_and_validate_url(url)
-        resp = requests.get(cleaned_url)
-        resp.raise_for_status()
-        file_bytes = resp.content
-    except Exception as e:
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=f"文件下载失败: {e}")
     # 文件类型判断
     filename = cleaned_url.split("?")[0].split("/")[-1]
     ext = filename.lower().split(".")[-1]
-    if ext == "pptx":
-        result = parse_pptx(file_bytes)
-    elif ext == "docx":
-        result = parse_docx(file_bytes)
-    elif ext == "xlsx":
-        result = parse_xlsx(file_bytes)
-    elif ext == "pdf":
-        result = parse_pdf(file_bytes)
+    if ext not in ("pptx", "docx", "xlsx", "pdf"):
+        raise HTTPException(status_code=400, detail="只支持 .pptx, .docx, .xlsx, .pdf 文件")
+    try:
+        with profiler.stage("download"), metrics.stage("download", ext):
+            body = await downloader.fetch(cleaned_url)
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=400, detail="文件下载失败: 下载超时")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=400, detail=f"文件下载失败: {e}")
+    with body:
+        if ext == "pptx":
+            result = await _parse_cached(parse_pptx, body.source(), deadline=deadline, profiler=profiler)
+        elif ext == "docx":
+            result = await _parse_cached(parse_docx, body.source(), deadline=deadline, profiler=profiler)
+        elif ext == "xlsx":
+            result = await _parse_cached(parse_xlsx, body.source(), deadline=deadline, profiler=profiler)
+        elif ext == "pdf":
+            result = await _parse_cached(parse_pdf, body.source(), workers=PDF_WORKERS, deadline=deadline,
+                                         profiler=profiler)
+    return _json_result(result, ext, profiler)
+
+def _read_zip_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> SpooledBuffer:
+    """按块解压 zip 中的一个文件，超过 UPLOAD_MAX_BYTES 时返回 413（按实际解压的字节数计算）"""
+    body = SpooledBuffer(UPLOAD_MEMORY_BYTES, UPLOAD_MAX_BYTES)
+    try:
+        with archive.open(info) as f:
+            while chunk := f.read(CHUNK_SIZE):
+                body.write(chunk)
+    except PayloadTooLarge as e:
+        body.close()
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        body.close()
+        raise
+    return body
+
+async def _parse_batch_item(filename: str, load: Callable[[], Awaitable[SpooledBuffer]],
+                            semaphore: asyncio.Semaphore, deadline: Optional[float] = None) -> dict:
+    """
+    解析批量请求中的一个文件，load 读取文件内容；出错时返回错误信息而不抛出异常。
+    deadline 为整个批量请求的截止时间
+    """
+    ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
+    parser = PARSERS.get(ext)
+    if parser is None:
+        return {"filename": filename, "status_code": 400, "error": "只支持 .pptx, .docx, .xlsx, .pdf 文件"}
+    options = {"workers": PDF_WORKERS} if parser is parse_pdf else {}
+    async with semaphore:
+        try:
+            body = await load()
+        except HTTPException as e:
+            return {"filename": filename, "status_code": e.status_code, "error": e.detail}
+        except Exception as e:
+            return {"filename": filename, "status_code": 400, "error": f"文件读取失败: {str(e)}"}
+        with body:
+            try:
+                # 批量请求已由 BATCH_CONCURRENCY 限流，各文件排队等待准入而不是被拒绝
+                result = await _parse_cached(parser, body.source(), queue=False, deadline=deadline, **options)
+            except ValueError as ve:
+                return {"filename": filename, "status_code": 400, "error": str(ve)}
+            except TimeoutError as e:
+                return {"filename": filename, "status_code": 504, "error": str(e) or "解析超时"}
+            except Exception as e:
+                return {"filename": filename, "status_code": 500, "error": f"解析失败: {str(e)}"}
+    return {"filename": filename, "status_code": 200, "result": result}
+
+async def _parse_batch_items(items: List[Tuple[str, Callable[[], Awaitable[SpooledBuffer]]]],
+                             deadline: Optional[float] = None) -> List[dict]:
+    """并发解析多个文件，同时读取和解析的文件数不超过 BATCH_CONCURRENCY，结果按输入顺序返回"""
+    if len(items) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"文件数量超过上限 {BATCH_MAX_FILES}")
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY or parse_pool.max_workers * 2)
+    return await asyncio.gather(*(_parse_batch_item(filename, load, semaphore, deadline)
+                                  for filename, load in items))
+
+@app.post("/parse-batch", summary="批量解析文件", response_description="每个文件的解析结果", status_code=status.HTTP_200_OK)
+async def parse_batch(files: List[UploadFile] = File(...), deadline: Optional[float] = Depends(request_deadline)):
+    """
+    一次上传多个文件（或一个包含文档的 zip 压缩包）并分别解析。
+    
+    每个文件按扩展名选择解析器，多个文件在执行池中并行解析，
+    省去逐个请求的 HTTP 和 multipart 开销，适合批量导入大量小文件。
+    
+    请求说明：
+    1. 请求方式：POST
+    2. Content-Type: multipart/form-data
+    3. 参数：
+       - files: 文件列表（必需），可重复多次。支持 .pptx、.docx、.xlsx、.pdf；
+         只上传一个 .zip 文件时解析压缩包中的所有文件（忽略目录、隐藏文件和 __MACOSX）
+    
+    限制：
+    - 整个请求体不超过 UPLOAD_MAX_BYTES，压缩包中每个文件解压后不超过 UPLOAD_MAX_BYTES
+    - 文件数不超过 BATCH_MAX_FILES，同时解析的文件数不超过 BATCH_CONCURRENCY
+    
+    返回格式（results 与上传顺序或压缩包中的顺序一致）：
+    {
+        "results": [
+            {"filename": "a.pptx", "status_code": 200, "result": {"slides": [...]}},
+            {"filename": "b.txt", "status_code": 400, "error": "只支持 .pptx, .docx, .xlsx, .pdf 文件"},
+            ...
+        ],
+        "succeeded": 1,
+        "failed": 1
+    }
+    单个文件的错误不影响其他文件，status_code 含义与对应的单文件接口相同。
+    
+    错误码：
+    - 400：文件数超过上限，或 zip 文件无法读取
+    - 413：请求体超过大小上限
+    
+    使用示例：
+    ```python
+    import requests
+    
+    url = 'http://your-server/parse-batch'
+    files = [('files', open('a.pptx', 'rb')), ('files', open('b.pdf', 'rb'))]
+    response = requests.post(url, files=files)
+    for item in response.json()['results']:
+        print(item['filename'], item['status_code'])
+    
+    # 上传 zip 压缩包
+    response = requests.post(url, files=[('files', open('docs.zip', 'rb'))])
+    ```
+    """
+    if len(files) == 1 and (files[0].filename or "").lower().endswith(".zip"):
+        with await _spool_upload(files[0]) as archive_body:
+            source = archive_body.source()
+            try:
+                archive = zipfile.ZipFile(BytesIO(source) if isinstance(source, bytes) else source)
+            except zipfile.BadZipFile as e:
+                raise HTTPException(status_code=400, detail=f"无法读取 zip 文件: {e}")
+            with archive:
+                entries = [
+                    info for info in archive.infolist()
+                    if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+                    and not os.path.basename(info.filename).startswith(".")
+                ]
+                results = await _parse_batch_items([
+                    (info.filename, functools.partial(run_in_threadpool, _read_zip_entry, archive, info))
+                    for info in entries
+                ], deadline)
     else:
+        results = await _parse_batch_items([
+            (file.filename or "", functools.partial(_spool_upload, file)) for file in files
+        ], deadline)
+    succeeded = sum(1 for item in results if item["status_code"] == 200)
+    return _json_result({"results": results, "succeeded": succeeded,
+                         "failed": len(results) - succeeded}, "batch")
+
+@app.post("/jobs", summary="提交异步解析任务", response_description="任务状态", status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    file: UploadFile = File(...),
+    pages: Optional[str] = Query(None, description="PDF：要解析的页码范围，如 1-5,10"),
+    text: bool = Query(True, description="PDF：是否提取页面文本"),
+    tables: bool = Query(True, description="PDF：是否检测并提取表格（最耗时的步骤）"),
+    images: bool = Query(True, description="PDF：是否提取图片信息"),
+    mode: str = Query("layout", description="PDF：解析模式 layout、fast 或 outline"),
+    preview_rows: Optional[int] = Query(None, ge=0, description="XLSX：预览模式，每个工作表只读取前 N 行"),
+    string_table: bool = Query(False, description="XLSX：以字符串表下标输出文本单元格")
+):
+    """
+    上传文件并提交异步解析任务，立即返回任务 ID，不等待解析完成。
+    
+    适合解析耗时较长的大文件：客户端无需在解析期间保持连接，
+    之后通过 GET /jobs/{job_id} 查询进度和结果。
+    
+    请求说明：
+    1. 请求方式：POST
+    2. Content-Type: multipart/form-data
+    3. 参数：
+       - file: 文件（必需），按扩展名选择解析器，支持 .pptx、.docx、.xlsx、.pdf
+       - pages / text / tables / images / mode: 与 /parse-pdf 相同，仅对 PDF 有效
+       - preview_rows / string_table: 与 /parse-xlsx 相同，仅对 XLSX 有效
+    
+    任务进入有界队列，最多同时执行 JOB_WORKERS 个；PDF 按已解析的页数每隔
+    JOB_PROGRESS_INTERVAL 秒更新一次进度。解析结果写入解析结果缓存，并由任务保留到任务结束 JOB_TTL 秒后过期。
+    
+    返回格式（202，Location 头为任务地址）：
+    {
+        "job_id": "3f2a...",
+        "filename": "example.pdf",
+        "status": "queued",
+        "progress": 0.0,
+        "created_at": 1700000000.0,
+        "started_at": null,
+        "finished_at": null
+    }
+    
+    错误码：
+    - 400：不支持的文件格式
+    - 413：文件超过大小上限（UPLOAD_MAX_BYTES）
+    - 503：等待执行的任务数已达上限（JOB_QUEUE_SIZE），请稍后重试
+    
+    使用示例：
+    ```python
+    import time
+    import requests
+    
+    files = {'file': open('example.pdf', 'rb')}
+    job = requests.post('http://your-server/jobs', files=files).json()
+    while True:
+        job = requests.get(f"http://your-server/jobs/{job['job_id']}").json()
+        if job['status'] in ('succeeded', 'failed'):
+            break
+        time.sleep(1)
+    result = job.get('result')
+    ```
+    """
+    filename = file.filename or ""
+    ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
+    parser = PARSERS.get(ext)
+    if parser is None:
         raise HTTPException(status_code=400, detail="只支持 .pptx, .docx, .xlsx, .pdf 文件")
-    return JSONResponse(content=result)
\ No newline at end of file
+    options = _parser_options(parser, pages, text, tables, images, mode, preview_rows, string_table)
+    body = await _spool_upload(file)
+    try:
+        job = job_manager.submit(Job(filename, parser, options, body))
+    except JobQueueFull as e:
+        body.close()
+        raise HTTPException(status_code=503, detail=str(e))
+    return JSONResponse(content=job.to_dict(), status_code=202,
+                        headers={"Location": f"/jobs/{job.id}"})
+
+@app.get("/jobs/{job_id}", summary="查询异步解析任务", response_description="任务状态和结果", status_code=status.HTTP_200_OK)
+async def get_job(job_id: str):
+    """
+    查询 POST /jobs 提交的任务。
+    
+    返回格式：
+    {
+        "job_id": "3f2a...",
+        "filename": "example.pdf",
+        "status": "running",        // queued、running、succeeded 或 failed
+        "progress": 0.4,            // 0-1，PDF 按已解析的页数计算，其他格式完成时为 1
+        "created_at": 1700000000.0,
+        "started_at": 1700000001.0,
+        "finished_at": null
+    }
+    status 为 succeeded 时增加 "result"，内容与对应的单文件接口相同；
+    status 为 failed 时增加 "status_code"（含义与单文件接口相同）和 "error"。
+    
+    错误码：
+    - 404：任务不存在或已过期（任务结束 JOB_TTL 秒后过期）
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    info = job.to_dict()
+    if job.status == "succeeded":
+        info["result"] = job.result
+        return _json_result(info, PARSER_FORMATS[job.parser])
+    return JSONResponse(content=info)
+
+@app.get("/cache/stats", summary="解析结果缓存统计", status_code=status.HTTP_200_OK)
+async def cache_stats():
+    """
+    返回解析结果缓存的统计信息。
+    
+    缓存键由文件内容的 SHA-256、解析器、解析参数（未指定的参数按默认值计入）和解析器版本组成，
+    所有解析接口都会先查询缓存。
+    
+    返回格式：
+    {
+        "hits": 10,                 // 命中次数（memory_hits + disk_hits）
+        "misses": 5,                // 未命中次数
+        "hit_ratio": 0.667,         // 命中率
+        "memory_hits": 8,
+        "disk_hits": 2,
+        "memory_evictions": 0,      // 内存缓存因容量不足淘汰的结果数
+        "disk_evictions": 0,        // 磁盘缓存因容量不足淘汰的结果数
+        "memory_entries": 12,
+        "memory_bytes": 1048576,
+        "disk_entries": 15,         // 仅启用磁盘缓存（RESULT_CACHE_PATH）时返回
+        "disk_bytes": 2097152
+    }
+    """
+    return JSONResponse(content=await run_in_threadpool(result_cache.stats))
+
+@app.get("/admission/stats", summary="准入控制状态", status_code=status.HTTP_200_OK)
+async def admission_stats():
+    """
+    返回各格式的并发上限、执行中和等待中的解析任务数、因队列已满被拒绝（429）的次数，
+    以及内存预算的使用情况。
+    
+    返回格式：
+    {
+        "formats": {
+            "pdf": {"limit": 4, "active": 4, "waiting": 10, "rejected": 3},
+            ...
+        },
+        "memory_bytes": 2147483648,     // 内存预算，0 表示不按内存限制
+        "memory_used": 104857600        // 执行中和已获准的任务按文件大小估算的内存占用
+    }
+    """
+    return JSONResponse(content=admission.stats())
+
+@app.get("/metrics", summary="Prometheus 指标", response_class=PlainTextResponse, status_code=status.HTTP_200_OK)
+async def metrics_endpoint():
+    """
+    以 Prometheus 文本格式返回服务指标，供 Prometheus 抓取。
+    
+    指标：
+    - docparse_requests_total{handler, status}：各接口（路由模板）按状态码统计的请求数
+    - docparse_request_bytes_total{handler} / docparse_response_bytes_total{handler}：
+      收到的请求体和返回的响应体字节数（压缩后）
+    - docparse_stage_duration_seconds{stage, format}：各阶段耗时直方图。stage 为
+      download（/parse-url 下载）、decode（读取上传文件）、parse（解析，缓存命中不计）、
+      serialize（JSON 序列化）；format 为 pptx、docx、xlsx、pdf，
+      无法按扩展名确定时为 unknown，批量接口的序列化为 batch
+    - docparse_parsed_items_total{format, kind}：解析的页（pdf）、幻灯片（pptx）、
+      段落和表格行（docx）、行（xlsx）数
+    
+    指标按进程统计，以多个工作进程运行时需分别抓取或汇总。
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
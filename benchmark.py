@@ -0,0 +1,353 @@
+"""
+文档解析性能基准。
+
+使用方法：
+    python benchmark.py > bench_output.txt
+
+测试文档均在内存中生成，不依赖外部文件。
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from io import BytesIO
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+import openpyxl
+import PyPDF2
+
+from parser import parse_pdf, parse_xlsx
+from responses import JSONSerializer, _BrotliStream, _GzipStream, available_encodings
+
+
+def make_pdf(pages: int, lines: int = 20, image: bool = False, outline: bool = False) -> bytes:
+    """
+    生成一个每页包含若干行文本的 PDF 文档。
+
+    Args:
+        pages: 页数
+        lines: 每页文本行数，为 0 时页面不含文本层
+        image: 是否在每页铺满同一张图片（所有页面引用同一个 XObject），
+            与 lines=0 一起使用可模拟扫描件
+        outline: 是否添加书签（每页一个一级书签 "Page N"，第一页下有一个二级书签
+            "Section 1.1"）和页面标签（第一页为 "i"，之后从 "1" 开始编号）
+
+    Returns:
+        PDF文件的二进制内容
+    """
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    resources = b"/Font << /F1 %d 0 R >>" % font
+    if image:
+        pixels = zlib.compress(bytes(range(0, 256, 16)) * 16)
+        xobject = add(b"<< /Type /XObject /Subtype /Image /Width 16 /Height 16 "
+                      b"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\n"
+                      b"stream\n%s\nendstream" % (len(pixels), pixels))
+        resources += b" /XObject << /Im1 %d 0 R >>" % xobject
+    kids = []
+    for page_num in range(1, pages + 1):
+        content = b"q 612 0 0 792 0 0 cm /Im1 Do Q " if image else b""
+        if lines:
+            content += b"BT /F1 11 Tf 14 TL 50 780 Td " + b"".join(
+                b"(Page %d line %d lorem ipsum dolor sit amet) '" % (page_num, line)
+                for line in range(1, lines + 1)
+            ) + b" ET"
+        stream = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << %s >> /Contents %d 0 R >>"
+            % (pages_obj, resources, stream)
+        ))
+    catalog_extra = b""
+    if outline:
+        root = add(b"")
+        items = [add(b"") for _ in kids]
+        child = add(b"<< /Title (Section 1.1) /Parent %d 0 R /Dest [%d 0 R /Fit] >>"
+                    % (items[0], kids[0]))
+        for i, (item, kid) in enumerate(zip(items, kids)):
+            links = b""
+            if i > 0:
+                links += b" /Prev %d 0 R" % items[i - 1]
+            if i < len(items) - 1:
+                links += b" /Next %d 0 R" % items[i + 1]
+            if i == 0:
+                links += b" /First %d 0 R /Last %d 0 R /Count 1" % (child, child)
+            objects[item - 1] = (b"<< /Title (Page %d) /Parent %d 0 R /Dest [%d 0 R /Fit]%s >>"
+                                 % (i + 1, root, kid, links))
+        objects[root - 1] = b"<< /Type /Outlines /First %d 0 R /Last %d 0 R /Count %d >>" % (
+            items[0], items[-1], len(items))
+        catalog_extra = (b" /Outlines %d 0 R /PageLabels << /Nums [0 << /S /r >> 1 << /S /D >>] >>"
+                         % root)
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R%s >>" % (pages_obj, catalog_extra)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+    info = add(b"<< /Title (Benchmark) /Author (ppt-mcp) >>")
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objects) + 1, catalog, info, xref))
+    return out.getvalue()
+
+
+def make_xlsx(rows: int = 100) -> bytes:
+    """生成包含两列数据和一列公式的工作簿（第二列为重复的状态值）"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["name", "status", "total"])
+    for i in range(2, rows + 1):
+        ws.append([f"item{i}", "open" if i % 2 else "closed", f"=LEN(A{i})"])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def timeit(func: Callable[[], object], repeat: int = 3) -> float:
+    """返回多次运行中的最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def import_time(module: str) -> Tuple[Optional[float], List[str]]:
+    """
+    在新的解释器中以 python -X importtime 导入 module，
+    返回其导入耗时（秒，包括它导入的其他模块）和导入过程中加载的全部模块名
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    seconds = None
+    modules = []
+    # 每行形如 "import time:       522 |       3095 |   result_cache"（微秒），第一行为表头
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        name = name.strip()
+        modules.append(name)
+        if name == module:
+            seconds = int(cumulative) / 1e6
+    return seconds, modules
+
+
+def bench_import_time() -> None:
+    """对比各入口模块的启动（导入）耗时，以及是否加载了解析依赖"""
+    print("== 启动耗时 ==")
+    heavy = {"pptx", "docx", "openpyxl", "PyPDF2", "pdfplumber", "pdfminer", "PIL"}
+    for module in ("parser", "mcp_server", "app"):
+        seconds = min(import_time(module)[0] for _ in range(3))
+        loaded = sorted({name.split(".")[0] for name in import_time(module)[1]} & heavy)
+        print(f"import {module}: {seconds * 1000:.0f} ms, 加载的解析依赖: {', '.join(loaded) or '无'}")
+    # 解析依赖在首次解析对应格式时导入，这部分耗时从启动移到了该格式的第一次解析
+    deferred = {dep: min(import_time(dep)[0] for _ in range(3))
+                for dep in ("pptx", "docx", "openpyxl", "PyPDF2", "pdfplumber")}
+    print("首次解析时导入: " + ", ".join(f"{dep} {seconds * 1000:.0f} ms" for dep, seconds in deferred.items()))
+
+
+def bench_pdf_single_pass() -> None:
+    """对比旧实现中额外的 PyPDF2 元数据解析开销与单次解析的总耗时"""
+    print("== PDF 单次解析 ==")
+    for pages in (100, 1000):
+        data = make_pdf(pages)
+
+        def pypdf2_metadata():
+            reader = PyPDF2.PdfReader(BytesIO(data))
+            return reader.metadata, len(reader.pages)
+
+        saved = timeit(pypdf2_metadata)
+        total = timeit(lambda: parse_pdf(data), repeat=1)
+        print(f"{pages:>5} 页: parse_pdf {total:.3f}s, 去掉的 PyPDF2 解析 {saved:.3f}s "
+              f"({saved / (total + saved):.1%})")
+
+
+def bench_pdf_features(pages: int = 100) -> None:
+    """分别测量 PDF 文本、表格和图片提取的耗时"""
+    print("== PDF 各项内容提取耗时 ==")
+    data = make_pdf(pages)
+    baseline = timeit(lambda: parse_pdf(data, text=False, tables=False, images=False), repeat=1)
+    print(f"{pages} 页: 仅打开文档 {baseline:.3f}s")
+    for feature in ("text", "tables", "images"):
+        options = {"text": False, "tables": False, "images": False, feature: True}
+        elapsed = timeit(lambda: parse_pdf(data, **options), repeat=1)
+        print(f"{pages} 页: 仅 {feature:<6} {elapsed:.3f}s (+{elapsed - baseline:.3f}s)")
+    elapsed = timeit(lambda: parse_pdf(data), repeat=1)
+    print(f"{pages} 页: 全部内容 {elapsed:.3f}s")
+
+
+def bench_pdf_fast_mode(pages: int = 200) -> None:
+    """对比快速文本模式与版面分析模式的耗时"""
+    print("== PDF 快速文本模式 ==")
+    data = make_pdf(pages)
+    layout = timeit(lambda: parse_pdf(data, tables=False, images=False), repeat=1)
+    fast = timeit(lambda: parse_pdf(data, mode="fast"))
+    print(f"{pages} 页: layout(仅文本) {layout:.3f}s, fast {fast:.3f}s (加速 {layout / fast:.1f}x)")
+
+
+def bench_pdf_scanned(pages: int = 200) -> None:
+    """测量纯图片扫描件的解析耗时"""
+    print("== PDF 扫描件 ==")
+    data = make_pdf(pages, lines=0, image=True)
+    elapsed = timeit(lambda: parse_pdf(data), repeat=1)
+    print(f"{pages} 页扫描件: {elapsed:.3f}s")
+
+
+def bench_pdf_workers(pages: int = 200) -> None:
+    """测量多进程并行解析 PDF 在 1-16 个进程下的扩展性"""
+    print("== PDF 多进程并行解析 ==")
+    data = make_pdf(pages)
+    serial = None
+    for workers in (1, 2, 4, 8, 16):
+        elapsed = timeit(lambda: parse_pdf(data, workers=workers), repeat=1)
+        serial = serial or elapsed
+        print(f"{pages} 页, {workers:>2} 进程: {elapsed:.3f}s (加速 {serial / elapsed:.2f}x)")
+
+
+def bench_event_loop(small_requests: int = 40, interval: float = 0.05, large_pages: int = 100) -> None:
+    """
+    小文件请求的延迟：无大文件在解析时 vs 有大文件在解析时。
+
+    小请求按固定间隔发出，延迟从计划发出的时刻算起，
+    事件循环被阻塞的时间也会计入延迟。
+    """
+    from app import app
+
+    print("== HTTP 事件循环负载测试 ==")
+    small_file = make_xlsx(rows=20)
+    large_file = make_pdf(large_pages)
+
+    async def small_latencies(client: httpx.AsyncClient) -> List[float]:
+        t0 = time.perf_counter()
+
+        async def one(i: int) -> float:
+            scheduled = t0 + i * interval
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            resp = await client.post("/parse-xlsx", files={"file": ("s.xlsx", small_file)})
+            resp.raise_for_status()
+            return time.perf_counter() - scheduled
+
+        return sorted(await asyncio.gather(*(one(i) for i in range(small_requests))))
+
+    async def scenario() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await small_latencies(client)  # 预热执行池
+            idle = await small_latencies(client)
+            large = [asyncio.create_task(client.post("/parse-pdf", files={"file": ("l.pdf", large_file)}))
+                     for _ in range(2)]
+            busy = await small_latencies(client)
+            await asyncio.gather(*large)
+        p99 = lambda xs: xs[min(len(xs) - 1, int(len(xs) * 0.99))]
+        print(f"小请求 p99: 空闲 {p99(idle) * 1000:.1f}ms, 2 个 {large_pages} 页 PDF 解析中 "
+              f"{p99(busy) * 1000:.1f}ms")
+
+    asyncio.run(scenario())
+
+
+def bench_batch(files: int = 300, rows: int = 5) -> None:
+    """
+    对比逐个请求和一次 /parse-batch 请求解析大量小文件的吞吐量（文件/秒）。
+
+    服务在子进程中用 uvicorn 启动并通过本机 TCP 访问，逐个请求的 HTTP 和 multipart
+    开销都计入耗时；关闭结果缓存，两种方式都真正解析每个文件。
+    """
+    print("== 批量解析吞吐量 ==")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, RESULT_CACHE_MEMORY_BYTES="0", RESULT_CACHE_PATH="")
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port),
+                               "--log-level", "warning"], env=env)
+    try:
+        documents = [(f"f{i}.xlsx", make_xlsx(rows=rows)) for i in range(files)]
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            for _ in range(100):
+                try:
+                    client.post("/parse-xlsx", files={"file": documents[0]})  # 等待服务启动并预热执行池
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            start = time.perf_counter()
+            for document in documents:
+                client.post("/parse-xlsx", files={"file": document}).raise_for_status()
+            single = time.perf_counter() - start
+            start = time.perf_counter()
+            resp = client.post("/parse-batch", files=[("files", document) for document in documents])
+            resp.raise_for_status()
+            batch = time.perf_counter() - start
+            assert resp.json()["succeeded"] == files
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"{files} 个 {rows} 行 XLSX: 逐个请求 {files / single:.1f} 文件/秒, "
+          f"/parse-batch {files / batch:.1f} 文件/秒 (提升 {single / batch:.2f}x)")
+
+
+def bench_json_response(rows: int = 50000, bandwidth_mbit: float = 100) -> None:
+    """
+    对比大型 XLSX 解析结果的序列化和传输耗时：标准库 json 与 orjson，不压缩、gzip 与 brotli。
+
+    传输耗时按 bandwidth_mbit Mbit/s 的链路估算（本机回环的传输耗时可以忽略）。
+    """
+    print("== JSON 序列化与响应压缩 ==")
+    result = parse_xlsx(make_xlsx(rows=rows))
+    serialize = {}
+    for kind in ("json", "orjson"):
+        serializer = JSONSerializer(kind)
+        body = serializer.dumps(result)
+        serialize[kind] = timeit(lambda: serializer.dumps(result))
+        print(f"{rows} 行 XLSX 结果 {len(body) / 1e6:.1f} MB, 序列化 {serializer.kind}: {serialize[kind] * 1000:.1f} ms")
+    codecs = [("identity", None), ("gzip-1", lambda: _GzipStream(1)), ("gzip-6", lambda: _GzipStream(6))]
+    if "br" in available_encodings():
+        codecs.append(("br-4", lambda: _BrotliStream(4)))
+    for name, make_stream in codecs:
+        if make_stream is None:
+            compressed, compress = body, 0.0
+        else:
+            compressed = make_stream().compress(body, final=True)
+            compress = timeit(lambda: make_stream().compress(body, final=True))
+        transfer = len(compressed) * 8 / (bandwidth_mbit * 1e6)
+        totals = ", ".join(f"{kind} {(serialize[kind] + compress + transfer) * 1000:.0f} ms" for kind in serialize)
+        print(f"{name}: {len(compressed) / 1e6:.2f} MB, 压缩 {compress * 1000:.1f} ms, "
+              f"传输 {transfer * 1000:.0f} ms ({bandwidth_mbit:g} Mbit/s); 合计 {totals}")
+
+
+def main() -> None:
+    bench_import_time()
+    bench_pdf_single_pass()
+    bench_pdf_features()
+    bench_pdf_fast_mode()
+    bench_pdf_scanned()
+    bench_pdf_workers()
+    bench_event_loop()
+    bench_batch()
+    bench_json_response()
+
+
+if __name__ == "__main__":
+    main()
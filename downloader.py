@@ -0,0 +1,79 @@
+"""
+异步文件下载。
+
+Downloader 持有一个共享连接池的 httpx.AsyncClient，下载时：
+- 连接和读取分别设置超时，远端无响应不会让请求无限挂起
+- 边下载边检查大小，超过上限立即中断（Content-Length 超限时不读取响应体）
+- 响应体写入 SpooledBuffer，大文件转存到磁盘
+"""
+from typing import Optional
+
+import httpx
+
+from spooling import CHUNK_SIZE, PayloadTooLarge, SpooledBuffer
+
+
+class Downloader:
+    """
+    异步下载器，整个服务共用一个实例以复用连接。
+
+    Args:
+        connect_timeout: 建立连接的超时（秒）
+        read_timeout: 两次收到数据之间的最长间隔（秒）
+        max_size: 允许下载的最大字节数，None 表示不限制
+        max_memory: 超过该字节数后响应体转存到磁盘
+        max_connections: 连接池的最大连接数
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_size: Optional[int] = 100 * 1024 * 1024,
+        max_memory: int = 8 * 1024 * 1024,
+        max_connections: int = 20
+    ):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.max_size = max_size
+        self.max_memory = max_memory
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits,
+                                             follow_redirects=True)
+        return self._client
+
+    async def fetch(self, url: str) -> SpooledBuffer:
+        """
+        下载 url 的内容。
+
+        Returns:
+            保存响应体的 SpooledBuffer，调用方负责 close
+
+        Raises:
+            PayloadTooLarge: 响应体超过 max_size
+            httpx.HTTPError: 连接失败、超时或响应状态码表示错误
+        """
+        async with self.client.stream("GET", url) as resp:
+            resp.raise_for_status()
+            length = resp.headers.get("content-length")
+            if self.max_size is not None and length and length.isdigit() and int(length) > self.max_size:
+                raise PayloadTooLarge(self.max_size)
+            body = SpooledBuffer(self.max_memory, self.max_size)
+            try:
+                async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                    body.write(chunk)
+            except BaseException:
+                body.close()
+                raise
+            return body
+
+    async def aclose(self) -> None:
+        """关闭连接池，之后再次调用 fetch 会创建新的连接池"""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
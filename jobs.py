@@ -0,0 +1,156 @@
+"""
+异步解析任务。
+
+客户端提交文件后立即得到任务 ID，之后轮询任务状态，无需在解析期间保持连接。
+任务进入有界队列，由固定数量的协程依次取出执行（实际解析仍在解析执行池中进行）；
+任务结束 ttl 秒后记录被删除。
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger("ppt-mcp")
+
+
+class JobQueueFull(Exception):
+    """等待执行的任务数已达上限"""
+
+
+class Job:
+    """
+    一个解析任务。
+
+    runner 执行时可以更新 progress（0-1），并设置 result。
+    """
+
+    def __init__(self, filename: str, parser: Callable[..., Dict[str, Any]],
+                 options: Dict[str, Any], body: Any = None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.parser = parser
+        self.options = options
+        self.body = body
+        self.status = "queued"
+        self.progress = 0.0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.status_code: Optional[int] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """任务状态（不含解析结果）"""
+        info = {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.status == "failed":
+            info["status_code"] = self.status_code
+            info["error"] = self.error
+        return info
+
+
+class JobManager:
+    """
+    管理任务队列、执行协程和任务记录。
+
+    Args:
+        runner: 执行任务的协程函数 runner(job)
+        workers: 同时执行的任务数
+        max_queued: 等待执行的任务数上限，超过时 submit 抛出 JobQueueFull
+        ttl: 任务结束后保留记录和结果的秒数
+    """
+
+    def __init__(self, runner: Callable[[Job], Awaitable[None]], workers: int = 1,
+                 max_queued: int = 100, ttl: float = 3600):
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """在当前事件循环中启动执行协程（在其他事件循环中启动过时重新启动）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(self.max_queued)
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """停止执行协程，释放未执行任务占用的文件"""
+        tasks, self._tasks, self._loop = self._tasks, [], None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            if job.status in ("queued", "running"):
+                self._release(job)
+
+    def submit(self, job: Job) -> Job:
+        """
+        将任务加入队列。
+
+        Raises:
+            JobQueueFull: 等待执行的任务数已达上限
+        """
+        self._purge()
+        self.start()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"任务队列已满（{self.max_queued} 个任务等待执行），请稍后重试")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """返回任务，不存在或已过期时返回 None"""
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def _purge(self) -> None:
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _release(self, job: Job) -> None:
+        if job.body is not None:
+            job.body.close()
+            job.body = None
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                await self.runner(job)
+                job.progress = 1.0
+                job.status = "succeeded"
+            except asyncio.CancelledError:
+                raise
+            except ValueError as e:
+                job.status, job.status_code, job.error = "failed", 400, str(e)
+            except TimeoutError as e:
+                job.status, job.status_code, job.error = "failed", 504, str(e) or "解析超时"
+            except Exception as e:
+                logger.error(f"任务 {job.id} 执行失败: {e}")
+                job.status, job.status_code, job.error = "failed", 500, f"解析失败: {str(e)}"
+            finally:
+                job.finished_at = time.time()
+                self._release(job)
+                self._queue.task_done()
@@ -1,16 +1,97 @@
 import sys
 import os
 import base64
+import functools
+import inspect
+import json
 import logging
+import time
 from typing import Optional, Dict, Any
 from mcp.server.fastmcp import FastMCP
 import requests
 from parser import parse_pptx, parse_docx, parse_xlsx, parse_pdf
+from result_cache import ResultCache
+import metrics
+from profiling import NULL_PROFILER, Profiler
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger("ppt-mcp")
 
+# 每个 PDF 并行解析页面的进程数，1 表示在服务进程内解析
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "1"))
+# 解析结果缓存：内存缓存容量、SQLite 数据库路径（为空时不使用磁盘缓存）、磁盘缓存容量。
+# 与 HTTP 服务配置同一个 RESULT_CACHE_PATH 即可共享磁盘缓存
+RESULT_CACHE_MEMORY_BYTES = int(os.environ.get("RESULT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH") or None
+RESULT_CACHE_DISK_BYTES = int(os.environ.get("RESULT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+# 在该端口以 HTTP 提供 Prometheus 指标（/metrics），为 0 时不启动；也可通过 metrics_handler 工具获取
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+# 解析截止时间（秒）：工具参数 timeout 的默认值和上限，0 表示不限制
+PARSE_TIMEOUT = float(os.environ.get("PARSE_TIMEOUT", "300"))
+
+result_cache = ResultCache(RESULT_CACHE_MEMORY_BYTES, RESULT_CACHE_PATH, RESULT_CACHE_DISK_BYTES)
+
+def request_deadline(timeout: Optional[float]) -> Optional[float]:
+    """由工具参数 timeout 和 PARSE_TIMEOUT 得到解析截止时间（time.time() 时间戳），不限制时为 None"""
+    if timeout is not None and timeout <= 0:
+        raise ValueError("timeout must be positive")
+    if PARSE_TIMEOUT > 0:
+        timeout = min(timeout or PARSE_TIMEOUT, PARSE_TIMEOUT)
+    return None if timeout is None else time.time() + timeout
+
+PARSER_FORMATS = {parse_pptx: "pptx", parse_docx: "docx", parse_xlsx: "xlsx", parse_pdf: "pdf"}
+
+def _parse_cached(func, file_bytes: bytes, profiler=NULL_PROFILER, **options) -> Dict[str, Any]:
+    """
+    经解析结果缓存解析，缓存未命中时记录 parse 阶段耗时和解析的页/幻灯片/行数。
+    剖析时不读写缓存，解析器记录的子阶段和每页（幻灯片、工作表）并入 parse 阶段
+    """
+    document_format = PARSER_FORMATS[func]
+
+    @functools.wraps(func)
+    def parse(source, **kwargs):
+        with metrics.stage("parse", document_format):
+            result = func(source, **kwargs)
+        metrics.count_items(document_format, result)
+        return result
+
+    if profiler.enabled:
+        with profiler.stage("parse") as record:
+            result = parse(file_bytes, profile=True, **options)
+        profiler.merge(record, result.pop("profile"))
+        return result
+    return result_cache.parse(parse, file_bytes, **options)
+
+def _dumps(result: Dict[str, Any], document_format: str, profiler=NULL_PROFILER) -> str:
+    """
+    序列化为 JSON 字符串并记录 serialize 阶段耗时。剖析时先单独计时一次序列化，
+    再把剖析结果作为 "profile" 字段加入返回内容
+    """
+    if profiler.enabled:
+        with profiler.stage("serialize"):
+            json.dumps(result, ensure_ascii=False, indent=2)
+        result = {**result, "profile": profiler.to_dict()}
+    with metrics.stage("serialize", document_format):
+        return json.dumps(result, ensure_ascii=False, indent=2)
+
+def _metered(handler):
+    """统计工具调用次数（返回 "Error: " 开头时记为 error）、收到的 base64 内容和返回内容的字节数"""
+    signature = inspect.signature(handler)
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        file_bytes_b64 = signature.bind(*args, **kwargs).arguments.get("file_bytes_b64")
+        output = handler(*args, **kwargs)
+        name = handler.__name__
+        metrics.REQUESTS.inc(handler=name, status="error" if output.startswith("Error: ") else "ok")
+        metrics.REQUEST_BYTES.inc(len(file_bytes_b64 or ""), handler=name)
+        metrics.RESPONSE_BYTES.inc(len(output.encode("utf-8")), handler=name)
+        return output
+
+    return wrapper
+
 def clean_and_validate_url(url: str) -> str:
     """
     清理和验证URL，移除末尾的无效字符和多余斜杠
@@ -54,9 +135,12 @@ mcp = FastMCP(
 )
 
 @mcp.tool()
+@_metered
 def parse_pptx_handler(
     file_url: Optional[str] = None,
-    file_bytes_b64: Optional[str] = None
+    file_bytes_b64: Optional[str] = None,
+    timeout: Optional[float] = None,
+    profile: bool = False
 ) -> str:
     """
     解析 PPTX 文件，支持 file_url 或 base64，返回结构化 JSON。    注意：此工具函数仅支持解析 PPTX 格式文件，不支持 DOCX 或 XLSX。
@@ -78,6 +162,11 @@ def parse_pptx_handler(
     Args:
         file_url: PPTX文件的URL，与file_bytes_b64参数二选一
         file_bytes_b64: PPTX文件的base64内容，与file_url参数二选一
+        timeout: 可选，解析截止时间（秒，从调用开始计算），不超过 PARSE_TIMEOUT。
+            超过截止时间时停止解析，返回已解析的部分，结果中 partial 为 true
+        profile: 可选，为 True 时结果增加 profile 字段，给出 download 或 decode、parse（含解析器的
+            open、extract 等子阶段）、serialize 各阶段和每张幻灯片的墙钟时间、CPU 时间和
+            内存分配峰值，用于定位慢在哪一步；剖析时不使用结果缓存
         
     Returns:
         结构化PPT内容的JSON字符串，包含幻灯片文本、表格等信息
@@ -88,41 +177,47 @@ def parse_pptx_handler(
         - "Error: Invalid file format, only PPTX files are supported"
     """
     try:
-        # 获取文件内容
-        if file_url:
-            # 清理和验证URL
-            cleaned_url = clean_and_validate_url(file_url)
-            logger.info(f"Downloading file from URL: {cleaned_url}")
-            resp = requests.get(cleaned_url, timeout=10)
-            if resp.status_code != 200:
-                error_msg = f"Failed to download file from url: {cleaned_url}"
+        with (Profiler() if profile else NULL_PROFILER) as profiler:
+            deadline = request_deadline(timeout)
+            # 获取文件内容
+            if file_url:
+                # 清理和验证URL
+                cleaned_url = clean_and_validate_url(file_url)
+                logger.info(f"Downloading file from URL: {cleaned_url}")
+                with profiler.stage("download"), metrics.stage("download", "pptx"):
+                    resp = requests.get(cleaned_url, timeout=10)
+                if resp.status_code != 200:
+                    error_msg = f"Failed to download file from url: {cleaned_url}"
+                    logger.error(error_msg)
+                    return f"Error: {error_msg}"
+                file_bytes = resp.content
+                logger.info(f"Successfully downloaded file, size: {len(file_bytes)} bytes")
+            elif file_bytes_b64:
+                logger.info("Processing base64 encoded file")
+                with profiler.stage("decode"), metrics.stage("decode", "pptx"):
+                    file_bytes = base64.b64decode(file_bytes_b64)
+                logger.info(f"Successfully decoded base64, size: {len(file_bytes)} bytes")
+            else:
+                error_msg = "Missing parameter: file_url or file_bytes_b64"
                 logger.error(error_msg)
                 return f"Error: {error_msg}"
-            file_bytes = resp.content
-            logger.info(f"Successfully downloaded file, size: {len(file_bytes)} bytes")
-        elif file_bytes_b64:
-            logger.info("Processing base64 encoded file")
-            file_bytes = base64.b64decode(file_bytes_b64)
-            logger.info(f"Successfully decoded base64, size: {len(file_bytes)} bytes")
-        else:
-            error_msg = "Missing parameter: file_url or file_bytes_b64"
-            logger.error(error_msg)
-            return f"Error: {error_msg}"
-        
-        # 解析PPTX文件
-        result = parse_pptx(file_bytes)
-        logger.info(f"Successfully parsed PPTX, found {len(result.get('slides', []))} slides")
-        import json
-        return json.dumps(result, ensure_ascii=False, indent=2)
+            
+            # 解析PPTX文件
+            result = _parse_cached(parse_pptx, file_bytes, profiler, deadline=deadline)
+            logger.info(f"Successfully parsed PPTX, found {len(result.get('slides', []))} slides")
+            return _dumps(result, "pptx", profiler)
     except Exception as e:
         error_msg = f"parse_pptx_handler error: {e}"
         logger.error(error_msg)
         return f"Error: {str(e)}"
 
 @mcp.tool()
+@_metered
 def parse_docx_handler(
     file_url: Optional[str] = None,
-    file_bytes_b64: Optional[str] = None
+    file_bytes_b64: Optional[str] = None,
+    timeout: Optional[float] = None,
+    profile: bool = False
 ) -> str:
     """
     解析 DOCX 文件，支持 file_url 或 base64，返回结构化 JSON。
@@ -145,6 +240,11 @@ def parse_docx_handler(
     Args:
         file_url: DOCX文件的URL，与file_bytes_b64参数二选一
         file_bytes_b64: DOCX文件的base64内容，与file_url参数二选一
+        timeout: 可选，解析截止时间（秒，从调用开始计算），不超过 PARSE_TIMEOUT。
+            超过截止时间时停止解析，返回已解析的部分，结果中 partial 为 true
+        profile: 可选，为 True 时结果增加 profile 字段，给出 download 或 decode、parse（含解析器的
+            open、extract 等子阶段）、serialize 各阶段和每个表格的墙钟时间、CPU 时间和
+            内存分配峰值，用于定位慢在哪一步；剖析时不使用结果缓存
         
     Returns:
         结构化Word内容的JSON字符串，包含：
@@ -158,41 +258,49 @@ def parse_docx_handler(
         - "Error: Invalid file format, only DOCX files are supported"
     """
     try:
-        # 获取文件内容
-        if file_url:
-            # 清理和验证URL
-            cleaned_url = clean_and_validate_url(file_url)
-            logger.info(f"Downloading file from URL: {cleaned_url}")
-            resp = requests.get(cleaned_url, timeout=10)
-            if resp.status_code != 200:
-                error_msg = f"Failed to download file from url: {cleaned_url}"
+        with (Profiler() if profile else NULL_PROFILER) as profiler:
+            deadline = request_deadline(timeout)
+            # 获取文件内容
+            if file_url:
+                # 清理和验证URL
+                cleaned_url = clean_and_validate_url(file_url)
+                logger.info(f"Downloading file from URL: {cleaned_url}")
+                with profiler.stage("download"), metrics.stage("download", "docx"):
+                    resp = requests.get(cleaned_url, timeout=10)
+                if resp.status_code != 200:
+                    error_msg = f"Failed to download file from url: {cleaned_url}"
+                    logger.error(error_msg)
+                    return f"Error: {error_msg}"
+                file_bytes = resp.content
+                logger.info(f"Successfully downloaded file, size: {len(file_bytes)} bytes")
+            elif file_bytes_b64:
+                logger.info("Processing base64 encoded file")
+                with profiler.stage("decode"), metrics.stage("decode", "docx"):
+                    file_bytes = base64.b64decode(file_bytes_b64)
+                logger.info(f"Successfully decoded base64, size: {len(file_bytes)} bytes")
+            else:
+                error_msg = "Missing parameter: file_url or file_bytes_b64"
                 logger.error(error_msg)
                 return f"Error: {error_msg}"
-            file_bytes = resp.content
-            logger.info(f"Successfully downloaded file, size: {len(file_bytes)} bytes")
-        elif file_bytes_b64:
-            logger.info("Processing base64 encoded file")
-            file_bytes = base64.b64decode(file_bytes_b64)
-            logger.info(f"Successfully decoded base64, size: {len(file_bytes)} bytes")
-        else:
-            error_msg = "Missing parameter: file_url or file_bytes_b64"
-            logger.error(error_msg)
-            return f"Error: {error_msg}"
-        
-        # 解析DOCX文件
-        result = parse_docx(file_bytes)
-        logger.info(f"Successfully parsed DOCX, found {len(result.get('paragraphs', []))} paragraphs")
-        import json
-        return json.dumps(result, ensure_ascii=False, indent=2)
+            
+            # 解析DOCX文件
+            result = _parse_cached(parse_docx, file_bytes, profiler, deadline=deadline)
+            logger.info(f"Successfully parsed DOCX, found {len(result.get('paragraphs', []))} paragraphs")
+            return _dumps(result, "docx", profiler)
     except Exception as e:
         error_msg = f"parse_docx_handler error: {e}"
         logger.error(error_msg)
         return f"Error: {str(e)}"
 
 @mcp.tool()
+@_metered
 def parse_xlsx_handler(
     file_url: Optional[str] = None,
-    file_bytes_b64: Optional[str] = None
+    file_bytes_b64: Optional[str] = None,
+    preview_rows: Optional[int] = None,
+    string_table: bool = False,
+    timeout: Optional[float] = None,
+    profile: bool = False
 ) -> str:
     """
     解析 XLSX 文件，支持 file_url 或 base64，返回结构化 JSON。
@@ -215,6 +323,15 @@ def parse_xlsx_handler(
     Args:
         file_url: XLSX文件的URL，与file_bytes_b64参数二选一
         file_bytes_b64: XLSX文件的base64内容，与file_url参数二选一
+        preview_rows: 可选，预览模式下每个工作表只读取前 N 行，
+            适合先快速了解工作簿结构再决定是否完整解析
+        string_table: 可选，为 True 时文本单元格输出为顶层 strings 列表的下标，
+            重复文本较多的表格可显著缩小返回内容
+        timeout: 可选，解析截止时间（秒，从调用开始计算），不超过 PARSE_TIMEOUT。
+            超过截止时间时停止解析，返回已解析的部分，结果中 partial 为 true
+        profile: 可选，为 True 时结果增加 profile 字段，给出 download 或 decode、parse（含解析器的
+            open、extract 等子阶段）、serialize 各阶段和每个工作表的墙钟时间、CPU 时间和
+            内存分配峰值，用于定位慢在哪一步；剖析时不使用结果缓存
         
     Returns:
         结构化Excel内容的JSON字符串，包含：
@@ -222,6 +339,8 @@ def parse_xlsx_handler(
           - title: 工作表名称
           - cells: 单元格内容和坐标
           - formulas: 公式列表
+          - dimension / max_row / max_column: 工作表尺寸（仅预览模式）
+        - strings: 字符串表（仅 string_table=True）
         
     错误返回示例：
         - "Error: Failed to download file from url: {url}"
@@ -229,41 +348,53 @@ def parse_xlsx_handler(
         - "Error: Invalid file format, only XLSX files are supported"
     """
     try:
-        # 获取文件内容
-        if file_url:
-            # 清理和验证URL
-            cleaned_url = clean_and_validate_url(file_url)
-            logger.info(f"Downloading file from URL: {cleaned_url}")
-            resp = requests.get(cleaned_url, timeout=10)
-            if resp.status_code != 200:
-                error_msg = f"Failed to download file from url: {cleaned_url}"
+        with (Profiler() if profile else NULL_PROFILER) as profiler:
+            deadline = request_deadline(timeout)
+            # 获取文件内容
+            if file_url:
+                # 清理和验证URL
+                cleaned_url = clean_and_validate_url(file_url)
+                logger.info(f"Downloading file from URL: {cleaned_url}")
+                with profiler.stage("download"), metrics.stage("download", "xlsx"):
+                    resp = requests.get(cleaned_url, timeout=10)
+                if resp.status_code != 200:
+                    error_msg = f"Failed to download file from url: {cleaned_url}"
+                    logger.error(error_msg)
+                    return f"Error: {error_msg}"
+                file_bytes = resp.content
+                logger.info(f"Successfully downloaded file, size: {len(file_bytes)} bytes")
+            elif file_bytes_b64:
+                logger.info("Processing base64 encoded file")
+                with profiler.stage("decode"), metrics.stage("decode", "xlsx"):
+                    file_bytes = base64.b64decode(file_bytes_b64)
+                logger.info(f"Successfully decoded base64, size: {len(file_bytes)} bytes")
+            else:
+                error_msg = "Missing parameter: file_url or file_bytes_b64"
                 logger.error(error_msg)
                 return f"Error: {error_msg}"
-            file_bytes = resp.content
-            logger.info(f"Successfully downloaded file, size: {len(file_bytes)} bytes")
-        elif file_bytes_b64:
-            logger.info("Processing base64 encoded file")
-            file_bytes = base64.b64decode(file_bytes_b64)
-            logger.info(f"Successfully decoded base64, size: {len(file_bytes)} bytes")
-        else:
-            error_msg = "Missing parameter: file_url or file_bytes_b64"
-            logger.error(error_msg)
-            return f"Error: {error_msg}"
-        
-        # 解析XLSX文件
-        result = parse_xlsx(file_bytes)
-        logger.info(f"Successfully parsed XLSX, found {len(result.get('sheets', []))} sheets")
-        import json
-        return json.dumps(result, ensure_ascii=False, indent=2)
+            
+            # 解析XLSX文件
+            result = _parse_cached(parse_xlsx, file_bytes, profiler, preview_rows=preview_rows,
+                                   string_table=string_table, deadline=deadline)
+            logger.info(f"Successfully parsed XLSX, found {len(result.get('sheets', []))} sheets")
+            return _dumps(result, "xlsx", profiler)
     except Exception as e:
         error_msg = f"parse_xlsx_handler error: {e}"
         logger.error(error_msg)
         return f"Error: {str(e)}"
 
 @mcp.tool()
+@_metered
 def parse_pdf_handler(
     file_url: Optional[str] = None,
-    file_bytes_b64: Optional[str] = None
+    file_bytes_b64: Optional[str] = None,
+    pages: Optional[str] = None,
+    text: bool = True,
+    tables: bool = True,
+    images: bool = True,
+    mode: str = "layout",
+    timeout: Optional[float] = None,
+    profile: bool = False
 ) -> str:
     """
     解析 PDF 文件，支持 file_url 或 base64，返回结构化 JSON。
@@ -286,6 +417,21 @@ def parse_pdf_handler(
     Args:
         file_url: PDF文件的URL，与file_bytes_b64参数二选一
         file_bytes_b64: PDF文件的base64内容，与file_url参数二选一
+        pages: 可选，要解析的页码范围，如 "1-5,10"。只分析所选页面，
+            metadata 仍描述整个文档，适合只需要长文档中少数几页的场景
+        text: 可选，是否提取页面文本，默认 True
+        tables: 可选，是否检测并提取表格，默认 True；只需要文本时设为 False 可大幅提速
+        images: 可选，是否提取图片信息，默认 True
+        mode: 可选，解析模式。"layout"（默认）做完整版面分析；"fast" 只从内容流快速
+            提取文本（tables、images 为空），速度约快一个数量级，适合搜索索引；
+            "outline" 只返回书签树（outline：title/level/page_number）和页面标签
+            （page_labels），不读取页面内容。浏览长文档时建议先用 outline 模式定位章节，
+            再用 pages 参数只解析需要的页
+        timeout: 可选，解析截止时间（秒，从调用开始计算），不超过 PARSE_TIMEOUT。
+            超过截止时间时停止解析，返回已解析的部分，结果中 partial 为 true
+        profile: 可选，为 True 时结果增加 profile 字段，给出 download 或 decode、parse（含解析器的
+            open、extract 等子阶段）、serialize 各阶段和每页的墙钟时间、CPU 时间和
+            内存分配峰值，用于定位慢在哪一步；剖析时不使用结果缓存
         
     Returns:
         结构化PDF内容的JSON字符串，包含：
@@ -293,13 +439,15 @@ def parse_pdf_handler(
           - page_number: 页码
           - text: 页面文本内容
           - tables: 表格内容
-          - images: 图片信息
+          - images: 图片信息，object_id 指向顶层 images 图片表
+          - scanned: 是否为无文本层的扫描页（扫描页不提取文本和表格）
         - metadata: 文档元数据，包含：
           - total_pages: 总页数
           - title: 文档标题
           - author: 作者
           - subject: 主题
           - creator: 创建者
+        - images: 文档级图片表，每个不同的图片只列出一次（object_id、像素尺寸、解码器）
         
     错误返回示例：
         - "Error: Failed to download file from url: {url}"
@@ -307,40 +455,78 @@ def parse_pdf_handler(
         - "Error: Invalid file format, only PDF files are supported"
     """
     try:
-        # 获取文件内容
-        if file_url:
-            # 清理和验证URL
-            cleaned_url = clean_and_validate_url(file_url)
-            logger.info(f"Downloading file from URL: {cleaned_url}")
-            resp = requests.get(cleaned_url, timeout=10)
-            if resp.status_code != 200:
-                error_msg = f"Failed to download file from url: {cleaned_url}"
+        with (Profiler() if profile else NULL_PROFILER) as profiler:
+            deadline = request_deadline(timeout)
+            # 获取文件内容
+            if file_url:
+                # 清理和验证URL
+                cleaned_url = clean_and_validate_url(file_url)
+                logger.info(f"Downloading file from URL: {cleaned_url}")
+                with profiler.stage("download"), metrics.stage("download", "pdf"):
+                    resp = requests.get(cleaned_url, timeout=10)
+                if resp.status_code != 200:
+                    error_msg = f"Failed to download file from url: {cleaned_url}"
+                    logger.error(error_msg)
+                    return f"Error: {error_msg}"
+                file_bytes = resp.content
+                logger.info(f"Successfully downloaded file, size: {len(file_bytes)} bytes")
+            elif file_bytes_b64:
+                logger.info("Processing base64 encoded file")
+                with profiler.stage("decode"), metrics.stage("decode", "pdf"):
+                    file_bytes = base64.b64decode(file_bytes_b64)
+                logger.info(f"Successfully decoded base64, size: {len(file_bytes)} bytes")
+            else:
+                error_msg = "Missing parameter: file_url or file_bytes_b64"
                 logger.error(error_msg)
                 return f"Error: {error_msg}"
-            file_bytes = resp.content
-            logger.info(f"Successfully downloaded file, size: {len(file_bytes)} bytes")
-        elif file_bytes_b64:
-            logger.info("Processing base64 encoded file")
-            file_bytes = base64.b64decode(file_bytes_b64)
-            logger.info(f"Successfully decoded base64, size: {len(file_bytes)} bytes")
-        else:
-            error_msg = "Missing parameter: file_url or file_bytes_b64"
-            logger.error(error_msg)
-            return f"Error: {error_msg}"
-        
-        # 解析PDF文件
-        result = parse_pdf(file_bytes)
-        logger.info(f"Successfully parsed PDF, found {len(result.get('pages', []))} pages")
-        import json
-        return json.dumps(result, ensure_ascii=False, indent=2)
+            
+            # 解析PDF文件
+            result = _parse_cached(parse_pdf, file_bytes, profiler, pages=pages, text=text, tables=tables,
+                                   images=images, workers=PDF_WORKERS, mode=mode, deadline=deadline)
+            logger.info(f"Successfully parsed PDF, found {len(result.get('pages', []))} pages")
+            return _dumps(result, "pdf", profiler)
     except Exception as e:
         error_msg = f"parse_pdf_handler error: {e}"
         logger.error(error_msg)
         return f"Error: {str(e)}"
 
+@mcp.tool()
+def cache_stats_handler() -> str:
+    """
+    返回解析结果缓存的统计信息。
+    
+    Returns:
+        JSON字符串，包含：
+        - hits / misses / hit_ratio: 命中次数、未命中次数和命中率
+        - memory_hits / disk_hits: 内存缓存和磁盘缓存各自的命中次数
+        - memory_evictions / disk_evictions: 因容量不足被淘汰的结果数
+        - memory_entries / memory_bytes: 内存缓存当前的条目数和字节数
+        - disk_entries / disk_bytes: 磁盘缓存当前的条目数和字节数（启用磁盘缓存时）
+    """
+    import json
+    return json.dumps(result_cache.stats(), ensure_ascii=False, indent=2)
+
+@mcp.tool()
+def metrics_handler() -> str:
+    """
+    以 Prometheus 文本格式返回本服务进程的指标。
+    
+    Returns:
+        Prometheus 文本，包含：
+        - docparse_requests_total{handler, status}: 各工具的调用次数（status 为 ok 或 error）
+        - docparse_request_bytes_total / docparse_response_bytes_total: 收到的 base64 内容和返回内容的字节数
+        - docparse_stage_duration_seconds{stage, format}: download、decode、parse（缓存命中不计）、
+          serialize 各阶段的耗时直方图
+        - docparse_parsed_items_total{format, kind}: 解析的页、幻灯片、段落和行数
+    """
+    return metrics.registry.render()
+
 def run_stdio():
     """运行 PPT MCP 服务器在 stdio 模式"""
     try:
+        if METRICS_PORT:
+            metrics.start_http_server(METRICS_PORT)
+            logger.info(f"Serving metrics on port {METRICS_PORT}")
         logger.info("Starting PPT MCP server with stdio transport")
         mcp.run(transport="stdio")
     except KeyboardInterrupt:
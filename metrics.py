@@ -0,0 +1,252 @@
+"""
+Prometheus 文本格式的服务指标。
+
+- 请求数、请求和响应字节数：按接口（HTTP 路由或 MCP 工具）和状态统计
+- 各阶段耗时直方图：download（下载）、decode（读取上传文件或 base64 解码）、
+  parse（解析，只统计缓存未命中）、serialize（JSON 序列化），按文档格式区分
+- 解析的页数、幻灯片数、段落数和行数
+
+指标保存在进程内，可在多个线程中更新；uvicorn 以多个工作进程运行时每个进程分别统计。
+不依赖 prometheus_client。
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 阶段耗时直方图的桶上限（秒）：覆盖毫秒级的小文件到分钟级的大文件
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 的标签应为 {', '.join(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}",
+                *self._samples()]
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values]
+
+
+class Histogram(_Metric):
+    """按桶统计观测值分布的直方图，同时记录观测次数和总和"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶（不累计）的计数..., +Inf 桶计数], 总和
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+            return sum(counts)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """一组指标，render 按注册顺序输出 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.counter("docparse_requests_total", "处理的请求数", ("handler", "status"))
+REQUEST_BYTES = registry.counter("docparse_request_bytes_total", "收到的请求字节数", ("handler",))
+RESPONSE_BYTES = registry.counter("docparse_response_bytes_total", "返回的响应字节数（压缩后）", ("handler",))
+STAGE_SECONDS = registry.histogram("docparse_stage_duration_seconds", "各阶段耗时（秒）",
+                                   ("stage", "format"))
+PARSED_ITEMS = registry.counter("docparse_parsed_items_total", "解析的页、幻灯片、段落和行数",
+                                ("format", "kind"))
+
+
+@contextmanager
+def stage(name: str, document_format: str) -> Iterator[None]:
+    """记录 with 块的耗时（包括其中 await 的时间）；块内抛出异常时不记录"""
+    started = time.perf_counter()
+    yield
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage=name, format=document_format)
+
+
+def count_items(document_format: str, result: Optional[Dict[str, Any]]) -> None:
+    """按解析结果累计页数（pdf）、幻灯片数（pptx）、段落数（docx）和行数（xlsx）"""
+    if not result:
+        return
+    if document_format == "pdf":
+        PARSED_ITEMS.inc(len(result.get("pages", [])), format="pdf", kind="page")
+    elif document_format == "pptx":
+        PARSED_ITEMS.inc(len(result.get("slides", [])), format="pptx", kind="slide")
+    elif document_format == "docx":
+        PARSED_ITEMS.inc(len(result.get("paragraphs", [])), format="docx", kind="paragraph")
+        PARSED_ITEMS.inc(sum(len(table) for table in result.get("tables", [])), format="docx", kind="row")
+    elif document_format == "xlsx":
+        PARSED_ITEMS.inc(sum(len(sheet.get("cells", [])) for sheet in result.get("sheets", [])),
+                         format="xlsx", kind="row")
+
+
+class MetricsMiddleware:
+    """
+    ASGI 中间件：按路由模板统计 HTTP 请求数（按状态码）、请求体和响应体字节数。
+
+    放在压缩中间件外层时统计的是实际发送的（压缩后）字节数。未匹配任何路由的请求
+    记为 handler="unmatched"，避免路径中的任意值产生过多标签组合。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        received = 0
+        sent = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal sent, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            route = scope.get("route")
+            handler = getattr(route, "path", None) or "unmatched"
+            REQUESTS.inc(handler=handler, status=str(status))
+            REQUEST_BYTES.inc(received, handler=handler)
+            RESPONSE_BYTES.inc(sent, handler=handler)
+
+
+def start_http_server(port: int, host: str = "0.0.0.0", target: Registry = registry) -> ThreadingHTTPServer:
+    """在后台线程中以 HTTP 提供 /metrics（用于没有 HTTP 接口的 MCP stdio 服务），返回服务器对象"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = target.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,208 @@
+"""
+解析任务执行池。
+
+解析器都是同步的 CPU 密集型函数，直接在 FastAPI 的事件循环中调用会阻塞
+同一进程上的所有其他请求。ParsePool 把解析任务交给进程池（默认）或线程池执行，
+事件循环只负责 I/O。
+
+同时提交给执行器的任务不超过工作进程（线程）数，其余任务在事件循环中排队，
+因此已提交的任务总是正在执行，排队的任务超时时直接放弃，不影响其他任务。
+
+run_until 在截止时间之后仍在执行的任务会被强制终止：进程池终止全部工作进程并重建，
+被连带终止的其他任务在新进程池中自动重试（重试同样受各自的截止时间限制）；
+工作进程收到 SIGTERM 时先终止自己创建的子进程（如 PDF_WORKERS 的页面进程池）。
+线程无法终止，线程池只停止等待，任务结束前仍占用一个线程。
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Optional
+
+logger = logging.getLogger("ppt-mcp")
+
+POOL_KINDS = ("process", "thread")
+
+
+class ParseTimeout(TimeoutError):
+    """解析任务超过截止时间，已被终止"""
+
+
+def _terminate_children(signum, frame) -> None:
+    # 工作进程被终止时一并终止它创建的子进程，否则这些进程会在后台继续解析
+    for child in multiprocessing.active_children():
+        child.terminate()
+    os._exit(128 + signum)
+
+
+def _init_worker() -> None:
+    """工作进程初始化：收到 SIGTERM 时终止子进程后退出"""
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _terminate_children)
+
+
+class ParsePool:
+    """
+    在独立的执行器中运行同步解析函数。
+
+    - kind="process"：进程池，解析真正并行且不受 GIL 影响；函数、参数和结果需可被 pickle
+    - kind="thread"：线程池，无需序列化，适合无法创建子进程的环境
+
+    执行器在第一次使用时创建。进程池无法创建时自动退回线程池；
+    工作进程异常退出导致进程池损坏时，下一次调用会重建进程池。
+    只能在事件循环所在的线程中调用 run 和 run_until。
+    """
+
+    def __init__(self, kind: str = "process", max_workers: Optional[int] = None):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"不支持的执行池类型: {kind}，可选值: {', '.join(POOL_KINDS)}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[Executor] = None
+        # 因任务超时被主动终止的进程池
+        self._terminated = weakref.WeakSet()
+        # 已提交给执行器、尚未结束的任务数，以及等待提交的任务
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _create_executor(self) -> Executor:
+        if self.kind == "process":
+            try:
+                executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+                # 进程池按需 fork 工作进程，fork 发生在调用 submit 的线程（即事件循环）中，
+                # 父进程越大越慢。创建时一次性启动全部工作进程，避免处理请求时卡顿
+                for _ in range(self.max_workers):
+                    executor.submit(os.getpid)
+                return executor
+            except (OSError, NotImplementedError, ImportError) as e:
+                logger.warning(f"无法创建进程池，改用线程池: {e}")
+                self.kind = "thread"
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="parse")
+
+    def start(self) -> None:
+        """提前创建执行器（服务启动时调用），避免第一个请求承担创建开销"""
+        self.executor
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._create_executor()
+        return self._executor
+
+    @property
+    def waiting(self) -> int:
+        """等待提交给执行器的任务数"""
+        return len(self._waiters)
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """在执行池中运行 func(*args, **kwargs)，等待期间不阻塞事件循环"""
+        return await self._run(None, functools.partial(func, *args, **kwargs))
+
+    async def run_until(self, deadline: Optional[float], func: Callable[..., Any], /, *args: Any,
+                        **kwargs: Any) -> Any:
+        """
+        与 run 相同，但 deadline（time.time() 时间戳）之后仍未返回时终止任务。
+        deadline 只能按位置传入，关键字参数 deadline 原样传给 func。
+
+        Raises:
+            ParseTimeout: 超过截止时间
+        """
+        return await self._run(deadline, functools.partial(func, *args, **kwargs))
+
+    async def _run(self, deadline: Optional[float], call: Callable[[], Any]) -> Any:
+        for attempt in range(2):
+            # 每次尝试都按截止时间重新计算剩余时间，重试不会超过截止时间
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                await asyncio.wait_for(self._acquire(), timeout)
+            except asyncio.TimeoutError:
+                # 仍在排队，尚未提交给执行器：直接放弃
+                raise ParseTimeout("解析超时，任务未开始执行")
+            executor = self.executor
+            try:
+                future = executor.submit(call)
+            except BaseException:
+                self._release()
+                raise
+            self._release_when_done(future)
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            result = asyncio.wrap_future(future)
+            try:
+                return await asyncio.wait_for(asyncio.shield(result), timeout)
+            except asyncio.TimeoutError:
+                # 不再等待结果：取走任务之后的异常（如被终止时的 BrokenProcessPool），避免未取回异常的警告
+                result.add_done_callback(lambda f: f.cancelled() or f.exception())
+                # 已提交的任务通常已在执行；只有取消失败（确实在执行）时才终止进程池
+                if not future.cancel() and not future.done() and self.kind == "process":
+                    self._terminate(executor)
+                raise ParseTimeout("解析超时，已终止")
+            except BrokenProcessPool:
+                if executor in self._terminated and attempt == 0:
+                    # 进程池因其他任务超时被终止：在新进程池中重试
+                    continue
+                logger.error("解析进程异常退出，进程池将在下次调用时重建")
+                self.shutdown(wait=False)
+                raise
+
+    async def _acquire(self) -> None:
+        """等待到已提交的任务数少于工作进程数"""
+        if self._active < self.max_workers and not self._waiters:
+            self._active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已轮到但调用方随即被取消：让给下一个等待者
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self) -> None:
+        """一个已提交的任务结束：唤醒下一个等待者，没有等待者时减少计数"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _release_when_done(self, future: Future) -> None:
+        """任务结束（包括被取消、进程被终止）时在事件循环线程中调用 _release"""
+        loop = asyncio.get_running_loop()
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:  # 事件循环已关闭
+                self._release()
+
+        future.add_done_callback(done)
+
+    def _terminate(self, executor: Executor) -> None:
+        """终止进程池的全部工作进程，下一次调用会创建新的进程池"""
+        logger.warning("解析任务超过截止时间，终止解析进程")
+        if self._executor is executor:
+            self._executor = None
+        self._terminated.add(executor)
+        # ProcessPoolExecutor 没有终止单个任务的接口，只能终止其工作进程；
+        # 进程池随后被标记为损坏，其余未完成的任务以 BrokenProcessPool 结束
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭执行器，之后再次调用 run 会创建新的执行器"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -1,15 +1,136 @@
-from pptx import Presentation
-from typing import List, Dict, Any
+# python-pptx、python-docx、openpyxl、PyPDF2、pdfplumber（pdfminer）在首次解析对应格式时
+# 才在函数内导入：导入全部依赖需要约半秒，每次会话启动一个进程的 MCP stdio 客户端会直接感受到，
+# 只解析一种格式的进程也不必加载其他格式的依赖。test_parser.TestImportTime 检查启动耗时
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Union, BinaryIO, Callable, TYPE_CHECKING
+from contextlib import contextmanager
 from io import BytesIO
-from docx import Document
-import openpyxl
-import tempfile
+import io
+import itertools
+import re
+import struct
+import time
+import zipfile
 import os
-from typing import Any, Dict
-from PIL import Image
-# PDF解析相关导入
-import PyPDF2
-import pdfplumber
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from profiling import NULL_PROFILER, Profiler
+
+if TYPE_CHECKING:
+    from pdfplumber.page import Page
+
+# 解析结果格式版本，修改任何解析器的输出内容或结构时递增，使已缓存的旧结果失效
+PARSER_VERSION = "1"
+
+# 解析器接受的文件来源：文件内容（bytes）、文件路径或可定位的二进制文件对象
+DocumentSource = Union[bytes, str, os.PathLike, BinaryIO]
+
+
+@contextmanager
+def _open_source(source: DocumentSource) -> Iterator[BinaryIO]:
+    """
+    以二进制文件对象的形式打开文件来源，不复制文件内容。
+    
+    - bytes：包装为 BytesIO（与原 bytes 共享内存，不复制）
+    - 文件路径：以只读方式打开，退出时关闭，内容按需从磁盘读取
+    - 文件对象：定位到开头后直接使用，由调用方负责关闭
+    """
+    if isinstance(source, bytes):
+        yield BytesIO(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        source.seek(0)
+        yield source
+
+
+def _profiler(profile: bool):
+    """profile 为 True 时返回新的 Profiler，否则返回不记录任何内容的 NULL_PROFILER"""
+    return Profiler() if profile else NULL_PROFILER
+
+
+def _attach_profile(result: Dict[str, Any], profiler) -> Dict[str, Any]:
+    """开启剖析时把剖析结果加入 result["profile"]"""
+    if profiler.enabled:
+        result["profile"] = profiler.to_dict()
+    return result
+
+
+def _expired(deadline: Optional[float]) -> bool:
+    """
+    截止时间（time.time() 时间戳，跨进程可比较）是否已过。
+
+    解析器在每张幻灯片、每页、每行之间检查，过期后停止解析并返回已完成的部分，
+    结果中增加 "partial": true。
+    """
+    return deadline is not None and time.time() >= deadline
+
+
+# 文件头：PDF 以 "%PDF-" 开头，OOXML（pptx/docx/xlsx）是以本地文件头开始的 zip
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+# sniff_format 需要的文件头字节数
+SNIFF_BYTES = max(len(PDF_MAGIC), len(ZIP_MAGIC))
+
+# OOXML 主文档部件的内容类型（含模板、放映和启用宏的变体）与格式的对应关系
+_OOXML_MAIN_TYPES = {
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml": "pptx",
+    "application/vnd.openxmlformats-officedocument.presentationml.slideshow.main+xml": "pptx",
+    "application/vnd.openxmlformats-officedocument.presentationml.template.main+xml": "pptx",
+    "application/vnd.ms-powerpoint.presentation.macroenabled.main+xml": "pptx",
+    "application/vnd.ms-powerpoint.slideshow.macroenabled.main+xml": "pptx",
+    "application/vnd.ms-powerpoint.template.macroenabled.main+xml": "pptx",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml": "docx",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml": "docx",
+    "application/vnd.ms-word.document.macroenabled.main+xml": "docx",
+    "application/vnd.ms-word.template.macroenabledtemplate.main+xml": "docx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml": "xlsx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml": "xlsx",
+    "application/vnd.ms-excel.sheet.macroenabled.main+xml": "xlsx",
+    "application/vnd.ms-excel.template.macroenabled.main+xml": "xlsx",
+}
+# [Content_Types].xml 最多读取的字节数，避免被构造的超大部件拖慢检测
+_CONTENT_TYPES_MAX_BYTES = 1024 * 1024
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """
+    根据文件开头的 SNIFF_BYTES 个字节判断文件类型：
+    返回 "pdf"、"zip"（可能是 OOXML 文档，需用 detect_format 进一步区分）或 None
+    """
+    if head.startswith(PDF_MAGIC):
+        return "pdf"
+    if head.startswith(ZIP_MAGIC):
+        return "zip"
+    return None
+
+
+def detect_format(file_bytes: DocumentSource) -> Optional[str]:
+    """
+    根据文件内容判断文档格式，不打开整个文档。
+
+    - 以 "%PDF-" 开头：pdf
+    - zip：只读取中央目录和 [Content_Types].xml，按主文档部件的内容类型返回 pptx、docx 或 xlsx
+
+    Returns:
+        "pdf"、"pptx"、"docx"、"xlsx"，无法识别时返回 None
+    """
+    with _open_source(file_bytes) as f:
+        kind = sniff_format(f.read(SNIFF_BYTES))
+        if kind != "zip":
+            return kind
+        f.seek(0)
+        try:
+            with zipfile.ZipFile(f) as archive:
+                with archive.open("[Content_Types].xml") as types:
+                    content_types = types.read(_CONTENT_TYPES_MAX_BYTES)
+        except (zipfile.BadZipFile, KeyError, OSError):
+            return None
+    for content_type in re.findall(rb'ContentType="([^"]+)"', content_types):
+        kind = _OOXML_MAIN_TYPES.get(content_type.decode("ascii", "replace").lower())
+        if kind is not None:
+            return kind
+    return None
 
 
 def extract_text_from_shape(shape) -> List[str]:
@@ -44,7 +165,8 @@ def extract_text_from_shape(shape) -> List[str]:
             texts.extend(extract_text_from_shape(sub_shape))
     return texts
 
-def parse_pptx(file_bytes: bytes) -> Dict[str, Any]:
+def parse_pptx(file_bytes: DocumentSource, deadline: Optional[float] = None,
+               profile: bool = False) -> Dict[str, Any]:
     """
     解析 PPTX 文件，返回结构化 JSON。
     
@@ -66,7 +188,11 @@ def parse_pptx(file_bytes: bytes) -> Dict[str, Any]:
        }
     
     Args:
-        file_bytes: PPTX文件的二进制内容
+        file_bytes: PPTX文件的二进制内容、文件路径或二进制文件对象
+        deadline: 截止时间（time.time() 时间戳），过期后不再解析后续幻灯片，
+            返回已解析的幻灯片并增加 "partial": true
+        profile: 是否剖析各阶段（open、extract 等）和每个幻灯片的墙钟时间、CPU 时间和
+            内存分配峰值，结果加入 "profile"：{"stages": [...], "items": [...]}
         
     Returns:
         包含所有幻灯片文本内容的字典
@@ -74,26 +200,41 @@ def parse_pptx(file_bytes: bytes) -> Dict[str, Any]:
     Raises:
         ValueError: 当文件不是有效的PPTX格式时抛出
     """
-    try:
-        prs = Presentation(BytesIO(file_bytes))
-    except Exception as e:
-        raise ValueError(f"无法读取 pptx 文件: {e}")
-    slides = []
-    for idx, slide in enumerate(prs.slides, start=1):
-        texts = []
-        for shape in slide.shapes:
-            try:
-                texts.extend(extract_text_from_shape(shape))
-            except Exception:
-                continue
-        slides.append({
-            "slide_index": idx,
-            "text": texts
-        })
-    return {"slides": slides}
+    from pptx import Presentation
+
+    profiler = _profiler(profile)
+    with profiler:
+        try:
+            with profiler.stage("open"), _open_source(file_bytes) as f:
+                prs = Presentation(f)
+        except Exception as e:
+            raise ValueError(f"无法读取 pptx 文件: {e}")
+        slides = []
+        partial = False
+        with profiler.stage("extract"):
+            for idx, slide in enumerate(prs.slides, start=1):
+                if _expired(deadline):
+                    partial = True
+                    break
+                with profiler.item("slide", idx):
+                    texts = []
+                    for shape in slide.shapes:
+                        try:
+                            texts.extend(extract_text_from_shape(shape))
+                        except Exception:
+                            continue
+                slides.append({
+                    "slide_index": idx,
+                    "text": texts
+                })
+    result = {"slides": slides}
+    if partial:
+        result["partial"] = True
+    return _attach_profile(result, profiler)
 
 
-def parse_docx(file_bytes: bytes) -> Dict[str, Any]:
+def parse_docx(file_bytes: DocumentSource, deadline: Optional[float] = None,
+               profile: bool = False) -> Dict[str, Any]:
     """
     解析 DOCX 文件，返回结构化 JSON。
     
@@ -117,44 +258,712 @@ def parse_docx(file_bytes: bytes) -> Dict[str, Any]:
        }
     
     Args:
-        file_bytes: DOCX文件的二进制内容
+        file_bytes: DOCX文件的二进制内容、文件路径或二进制文件对象
+        deadline: 截止时间（time.time() 时间戳），过期后停止提取，
+            返回已提取的内容并增加 "partial": true
+        profile: 是否剖析各阶段（open、paragraphs、tables、images）和每个表格的墙钟时间、
+            CPU 时间和内存分配峰值，结果加入 "profile"：{"stages": [...], "items": [...]}
         
     Returns:
         包含文档内容的结构化字典
         
     注意：
-    - 使用临时文件处理，会自动清理
+    - 直接从内存或原文件读取，不再写入临时文件
     - 图片内容仅保存基本信息，不包含实际图片数据
     """
+    from docx import Document
+
     result = {"paragraphs": [], "tables": [], "images": []}
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-        tmp.write(file_bytes)
-        tmp_path = tmp.name
-    try:
-        doc = Document(tmp_path)
-        # 段落
+    profiler = _profiler(profile)
+    with profiler, _open_source(file_bytes) as f:
+        with profiler.stage("open"):
+            doc = Document(f)
+        _extract_docx(doc, result, deadline, profiler)
+    return _attach_profile(result, profiler)
+
+
+def _extract_docx(doc, result: Dict[str, Any], deadline: Optional[float], profiler) -> None:
+    """依次提取段落、表格和图片信息到 result，截止时间过期时停止并标记 partial"""
+    # 段落
+    with profiler.stage("paragraphs"):
         for para in doc.paragraphs:
+            if _expired(deadline):
+                result["partial"] = True
+                return
             result["paragraphs"].append(para.text)
-        # 表格
-        for table in doc.tables:
-            table_data = []
-            for row in table.rows:
-                row_data = [cell.text for cell in row.cells]
-                table_data.append(row_data)
-            result["tables"].append(table_data)
-        # 图片
+    # 表格
+    with profiler.stage("tables"):
+        for index, table in enumerate(doc.tables, start=1):
+            with profiler.item("table", index):
+                table_data = []
+                for row in table.rows:
+                    if _expired(deadline):
+                        result["tables"].append(table_data)
+                        result["partial"] = True
+                        return
+                    row_data = [cell.text for cell in row.cells]
+                    table_data.append(row_data)
+                result["tables"].append(table_data)
+    # 图片
+    with profiler.stage("images"):
         rels = doc.part.rels
         for rel in rels:
             rel = rels[rel]
             if "image" in rel.target_ref:
                 image_bytes = rel.target_part.blob
                 result["images"].append({"filename": os.path.basename(rel.target_ref), "size": len(image_bytes)})
+
+
+def _pdf_metadata(info: Dict[str, Any], total_pages: int) -> Dict[str, Any]:
+    """
+    从 PDF 文档信息字典中提取元数据。
+    
+    Args:
+        info: pdfplumber 解码后的文档信息字典（键不带 "/" 前缀）
+        total_pages: 文档总页数
+        
+    Returns:
+        包含总页数、标题、作者、主题和创建者的字典，缺失字段为空字符串
+    """
+    return {
+        "total_pages": total_pages,
+        "title": info.get('Title', ''),
+        "author": info.get('Author', ''),
+        "subject": info.get('Subject', ''),
+        "creator": info.get('Creator', '')
+    }
+
+
+def _parse_page_ranges(spec: str) -> List[Tuple[int, int]]:
+    """
+    解析页码范围字符串，如 "1-5,10"。
+    
+    Args:
+        spec: 逗号分隔的页码或闭区间，页码从 1 开始
+        
+    Returns:
+        (起始页, 结束页) 闭区间列表
+        
+    Raises:
+        ValueError: 格式错误或区间无效时抛出
+    """
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start, end = (int(x) for x in part.split("-", 1))
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"无效的页码范围: {spec}")
+        if start < 1 or end < start:
+            raise ValueError(f"无效的页码范围: {part}")
+        ranges.append((start, end))
+    if not ranges:
+        raise ValueError(f"无效的页码范围: {spec}")
+    return ranges
+
+
+def _select_pages(ranges: List[Tuple[int, int]], total_pages: int) -> List[int]:
+    """将页码区间展开为去重排序后的页码列表，超出文档页数时抛出 ValueError"""
+    last = max(end for _, end in ranges)
+    if last > total_pages:
+        raise ValueError(f"页码 {last} 超出文档总页数 {total_pages}")
+    return sorted({n for start, end in ranges for n in range(start, end + 1)})
+
+
+def _pdf_page_count(pdf) -> int:
+    """从页面树根节点的 /Count 读取总页数，不实例化任何页面"""
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdftypes import resolve1
+
+    try:
+        return int(resolve1(resolve1(pdf.doc.catalog["Pages"])["Count"]))
+    except Exception:
+        return sum(1 for _ in PDFPage.create_pages(pdf.doc))
+
+
+# 页面没有任何字符且图片覆盖面积达到该比例时视为扫描页
+SCANNED_IMAGE_COVERAGE = 0.5
+
+
+def _image_coverage(page, page_images: List[Dict[str, Any]]) -> float:
+    """计算图片覆盖页面面积的比例（裁剪到页面范围内，重叠部分不去重，上限为 1）"""
+    page_area = page.width * page.height
+    if page_area <= 0:
+        return 0.0
+    x0, top, x1, bottom = page.bbox
+    covered = 0.0
+    for img in page_images:
+        width = min(img['x1'], x1) - max(img['x0'], x0)
+        height = min(img['bottom'], bottom) - max(img['top'], top)
+        if width > 0 and height > 0:
+            covered += width * height
+    return min(covered / page_area, 1.0)
+
+
+def _pdf_filter_names(stream) -> List[str]:
+    """返回图片流 /Filter 中的解码器名称列表，如 ["DCTDecode"]"""
+    from pdfminer.pdftypes import resolve1
+
+    filters = resolve1(stream.attrs.get('Filter'))
+    if filters is None:
+        return []
+    if not isinstance(filters, list):
+        filters = [filters]
+    return [getattr(resolve1(f), 'name', str(f)) for f in filters]
+
+
+def _extract_pdf_page(page, text: bool = True, tables: bool = True, images: bool = True,
+                      image_table: Optional[Dict[int, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    提取单个 pdfplumber 页面的内容。
+    
+    先做一次低成本的扫描页检测：页面没有任何字符（无文本层）且图片覆盖了大部分
+    页面时标记 "scanned": true，并跳过文本和表格提取。字符和图片列表来自内容流
+    的一次解释，文本聚类和表格检测都会复用它，检测本身几乎没有额外开销。
+    
+    图片按 XObject 对象号标识：页面中的每个图片条目带 "object_id"，同一个
+    XObject 只在 image_table 中登记一次（像素尺寸和解码器）。内联图片没有
+    对象号，object_id 为 null，也不进入 image_table。
+    
+    Args:
+        page: pdfplumber 页面对象
+        text: 是否提取文本
+        tables: 是否检测并提取表格
+        images: 是否提取图片信息
+        image_table: 文档级图片表（对象号 -> 图片信息），为 None 时不登记
+        
+    Returns:
+        页面字典，未开启的项保留为空值
+    """
+    page_data = {
+        "page_number": page.page_number,
+        "text": "",
+        "tables": [],
+        "images": [],
+        "scanned": False
+    }
+    if not (text or tables or images):
+        return page_data
+    
+    page_images = page.images
+    if not page.chars and _image_coverage(page, page_images) >= SCANNED_IMAGE_COVERAGE:
+        page_data["scanned"] = True
+    
+    # 提取文本
+    if text and not page_data["scanned"]:
+        page_text = page.extract_text()
+        if page_text:
+            page_data["text"] = page_text.strip()
+    
+    # 提取表格
+    if tables and not page_data["scanned"]:
+        for table in page.extract_tables():
+            if table:  # 确保表格不为空
+                page_data["tables"].append(table)
+    
+    # 提取图片信息
+    if images:
+        for img in page_images:
+            object_id = img['stream'].objid
+            page_data["images"].append({
+                "object_id": object_id,
+                "bbox": [img['x0'], img['top'], img['x1'], img['bottom']],
+                "type": "image",
+                "width": img['width'],
+                "height": img['height']
+            })
+            if image_table is not None and object_id is not None and object_id not in image_table:
+                image_table[object_id] = {
+                    "object_id": object_id,
+                    "width": img['srcsize'][0],
+                    "height": img['srcsize'][1],
+                    "filter": _pdf_filter_names(img['stream'])
+                }
+    
+    return page_data
+
+
+def _iter_pdf_pages(pdf, page_numbers: Optional[List[int]] = None) -> Iterator["Page"]:
+    """
+    逐页创建并释放 pdfplumber 页面。
+    
+    pdf.pages 会一次性创建全部页面，并把每页的布局对象缓存到文档关闭为止，
+    内存随页数线性增长。这里同一时间只保留当前页：调用方处理完一页后，
+    该页的布局缓存和 pdfminer 的文档级对象缓存（包含图片 XObject 的原始数据）随即释放。
+    
+    Args:
+        pdf: pdfplumber 文档对象
+        page_numbers: 升序排列的页码列表，为 None 时遍历全部页面
+        
+    Yields:
+        pdfplumber 页面对象
+    """
+    from pdfminer.pdfpage import PDFPage
+    from pdfplumber.page import Page
+
+    selected = set(page_numbers) if page_numbers is not None else None
+    last = page_numbers[-1] if page_numbers else None
+    doctop = 0
+    for page_number, page_obj in enumerate(PDFPage.create_pages(pdf.doc), start=1):
+        if selected is not None and page_number not in selected:
+            continue
+        page = Page(pdf, page_obj, page_number=page_number, initial_doctop=doctop)
+        doctop += page.height
+        try:
+            yield page
+        finally:
+            page.close()
+            # _cached_objs 是 PDFDocument 的私有属性（按 pdfminer.six 20260107 核对，requirements.txt
+            # 固定该版本），其他版本没有该属性时只是不清空对象缓存
+            cached_objs = getattr(pdf.doc, "_cached_objs", None)
+            if cached_objs is not None:
+                cached_objs.clear()
+        if page_number == last:
+            break
+
+
+def _close_pdf(pdf) -> None:
+    """
+    释放 pdfplumber 文档对象的缓存。
+    
+    不调用 pdf.close()：它会通过 pdf.pages 重新创建全部页面再逐一关闭。
+    传入的始终是调用方持有的内存流，无需关闭。
+    """
+    pdf.flush_cache()
+
+
+class _BufferReader(io.RawIOBase):
+    """只读、可定位的文件对象，直接读取共享内存缓冲区而不复制整份数据"""
+
+    def __init__(self, buf: memoryview):
+        self._buf = buf
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._buf) + offset
+        return self._pos
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._buf) - self._pos))
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+def _tracker_pid() -> Optional[int]:
+    """当前进程使用的 resource_tracker 进程号，尚未启动时为 None"""
+    return getattr(resource_tracker._resource_tracker, "_pid", None)
+
+
+def _attach_shared_memory(name: str, tracker: Optional[int]) -> shared_memory.SharedMemory:
+    """
+    在其他进程中挂载创建方的共享内存，生命周期由创建方负责。
+
+    tracker 为创建方创建共享内存后的 _tracker_pid()。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    # 旧版本挂载时也会向当前进程的 resource_tracker 登记。在创建方之后 fork 的进程
+    # （如 PDF_WORKERS 的页面进程）与创建方共用同一个 resource_tracker，重复登记没有影响，
+    # 也不能注销（否则创建方 unlink 时注销失败）。长期运行的执行池进程可能在创建方启动
+    # resource_tracker 之前就已创建，挂载时会启动自己的 resource_tracker，该进程退出或被终止时
+    # 会 unlink 创建方仍在使用的共享内存，因此立即注销
+    shm = shared_memory.SharedMemory(name=name)
+    if _tracker_pid() != tracker:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedProgress:
+    """
+    跨进程共享的进度（共享内存中的已完成数和总数），用作 parse_pdf 的 progress 回调。
+
+    由等待结果的进程创建，随解析任务 pickle 到执行池中的进程后调用 progress(done, total) 写入，
+    创建方通过 value 读取 (done, total)；用完后由创建方调用 close 释放共享内存。
+    """
+
+    def __init__(self):
+        self._shm: Optional[shared_memory.SharedMemory] = shared_memory.SharedMemory(create=True, size=16)
+        self.name = self._shm.name
+        self._tracker = _tracker_pid()
+        self._owner = True
+        self(0, 0)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.name, "tracker": self._tracker}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.name = state["name"]
+        self._tracker = state["tracker"]
+        self._shm = None
+        self._owner = False
+
+    def __call__(self, done: int, total: int) -> None:
+        if self._shm is None:
+            self._shm = _attach_shared_memory(self.name, self._tracker)
+        struct.pack_into("qq", self._shm.buf, 0, done, total)
+
+    @property
+    def value(self) -> Tuple[int, int]:
+        return struct.unpack_from("qq", self._shm.buf, 0)
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+
+    def __del__(self):
+        # 解析进程中的副本在任务结束后释放挂载
+        if not self._owner:
+            self.close()
+
+
+@contextmanager
+def _open_shared_memory(name: str, size: int, tracker: Optional[int]) -> Iterator[BinaryIO]:
+    """在子进程中以文件对象的形式读取共享内存中的文件内容"""
+    shm = _attach_shared_memory(name, tracker)
+    try:
+        buf = shm.buf[:size]
+        try:
+            yield _BufferReader(buf)
+        finally:
+            buf.release()
     finally:
-        os.remove(tmp_path)
-    return result
+        shm.close()
 
 
-def parse_pdf(file_bytes: bytes) -> Dict[str, Any]:
+def _parse_pdf_pages_worker(source: Union[str, Tuple[str, int, Optional[int]]], page_numbers: List[int],
+                            text: bool, tables: bool, images: bool, deadline: Optional[float] = None
+                            ) -> Tuple[List[Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+    """
+    进程池任务：打开 PDF，只解析 page_numbers 中的页面，返回页面列表和图片表。
+    
+    source 为文件路径，或 (共享内存名, 文件大小, 创建方的 resource_tracker 进程号)。
+    deadline 过期后不再解析后续页面。
+    """
+    import pdfplumber
+
+    opened = _open_source(source) if isinstance(source, str) else _open_shared_memory(*source)
+    with opened as f:
+        pdf = pdfplumber.open(f)
+        try:
+            image_table: Dict[int, Dict[str, Any]] = {}
+            pages = []
+            for page in _iter_pdf_pages(pdf, page_numbers):
+                if _expired(deadline):
+                    break
+                pages.append(_extract_pdf_page(page, text, tables, images, image_table))
+            return pages, image_table
+        finally:
+            _close_pdf(pdf)
+
+
+def _parse_pdf_pages_parallel(file_bytes: DocumentSource, page_numbers: List[int], workers: int,
+                              text: bool, tables: bool, images: bool,
+                              image_table: Dict[int, Dict[str, Any]],
+                              deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    将页面按连续区间分给多个进程并行解析，结果按页码顺序合并。
+    
+    文件来源为路径时各进程直接打开同一个文件；否则文件内容只复制一次到共享内存，
+    各进程直接从共享内存读取，不会为每个任务序列化一份完整的文件副本。
+    各进程的图片表按页码顺序合并到 image_table 中。deadline 过期后各进程停止解析，
+    返回的页面少于 page_numbers（每个区间只保留开头已完成的部分）。
+    """
+    if not page_numbers:
+        return []
+    workers = min(workers, len(page_numbers))
+    chunk = -(-len(page_numbers) // workers)
+    slices = [page_numbers[i:i + chunk] for i in range(0, len(page_numbers), chunk)]
+    shm = None
+    if isinstance(file_bytes, (str, os.PathLike)):
+        source = os.fspath(file_bytes)
+    else:
+        if not isinstance(file_bytes, bytes):
+            file_bytes.seek(0)
+            file_bytes = file_bytes.read()
+        shm = shared_memory.SharedMemory(create=True, size=max(len(file_bytes), 1))
+        shm.buf[:len(file_bytes)] = file_bytes
+        source = (shm.name, len(file_bytes), _tracker_pid())
+    try:
+        with ProcessPoolExecutor(max_workers=len(slices)) as executor:
+            futures = [
+                executor.submit(_parse_pdf_pages_worker, source, page_slice, text, tables, images, deadline)
+                for page_slice in slices
+            ]
+            pages = []
+            for future in futures:
+                slice_pages, slice_images = future.result()
+                pages.extend(slice_pages)
+                for object_id, entry in slice_images.items():
+                    image_table.setdefault(object_id, entry)
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+    return pages
+
+
+PDF_MODES = ("layout", "fast", "outline")
+
+
+def _iter_pdf_fast(file_bytes: DocumentSource, page_ranges: Optional[List[Tuple[int, int]]],
+                   deadline: Optional[float] = None, profiler=NULL_PROFILER) -> Iterator[Tuple[str, Any]]:
+    """
+    快速模式：用 PyPDF2 直接从内容流中提取文本，不做字符级版面分析。
+    
+    Args:
+        file_bytes: PDF文件的二进制内容、文件路径或二进制文件对象
+        page_ranges: 页码区间列表，为 None 时解析全部页面
+        
+    Yields:
+        与 iter_parse_pdf 相同的事件，页面的 tables 和 images 始终为空
+    """
+    import PyPDF2
+
+    with _open_source(file_bytes) as f:
+        with profiler.stage("open"):
+            reader = PyPDF2.PdfReader(f)
+            total_pages = len(reader.pages)
+            # 文档信息字典的值可以是间接引用（如 /Title 3 0 R），items() 不会解析
+            info = {key.lstrip('/'): str(value.get_object()) for key, value in (reader.metadata or {}).items()}
+            if page_ranges is not None:
+                page_numbers = _select_pages(page_ranges, total_pages)
+            else:
+                page_numbers = range(1, total_pages + 1)
+        yield "metadata", _pdf_metadata(info, total_pages)
+        with profiler.stage("extract"):
+            for page_number in page_numbers:
+                if _expired(deadline):
+                    yield "partial", True
+                    break
+                with profiler.item("page", page_number):
+                    page_text = reader.pages[page_number - 1].extract_text() or ""
+                yield "page", {
+                    "page_number": page_number,
+                    "text": page_text.strip(),
+                    "tables": [],
+                    "images": []
+                }
+        yield "images", []
+
+
+def _pdf_page_numbers_by_objid(doc) -> Dict[int, int]:
+    """遍历页面树，返回页面对象号到页码的映射；只读取页面树节点，不读取页面内容"""
+    from pdfminer.pdftypes import resolve1
+
+    numbers: Dict[int, int] = {}
+    visited = set()
+    stack = [doc.catalog["Pages"]]
+    while stack:
+        ref = stack.pop()
+        objid = getattr(ref, "objid", None)
+        if objid is not None:
+            if objid in visited:  # 防止损坏文件中的循环引用
+                continue
+            visited.add(objid)
+        node = resolve1(ref)
+        if not isinstance(node, dict):
+            continue
+        if "Kids" in node:
+            # 逆序入栈，保证按文档顺序深度优先遍历
+            stack.extend(reversed(resolve1(node["Kids"]) or []))
+        elif objid is not None:
+            numbers[objid] = len(numbers) + 1
+    return numbers
+
+
+def _outline_page_number(doc, dest: Any, action: Any, page_numbers: Dict[int, int]) -> Optional[int]:
+    """将书签的目标（显式数组、命名目标或 GoTo 动作）解析为页码，无法解析时返回 None"""
+    from pdfminer.pdftypes import resolve1
+    from pdfminer.psparser import LIT, PSLiteral
+
+    try:
+        if dest is None and action is not None:
+            action = resolve1(action)
+            if action.get("S") is not LIT("GoTo"):
+                return None
+            dest = action.get("D")
+        dest = resolve1(dest)
+        if isinstance(dest, (PSLiteral, bytes, str)):
+            name = dest.name if isinstance(dest, PSLiteral) else dest
+            dest = resolve1(doc.get_dest(name))
+        if isinstance(dest, dict):
+            dest = resolve1(dest.get("D"))
+        if isinstance(dest, list) and dest:
+            target = dest[0]
+            if isinstance(target, int):  # 指向其他文档的目标使用从 0 开始的页序号
+                return target + 1
+            return page_numbers.get(getattr(target, "objid", None))
+    except Exception:
+        return None
+    return None
+
+
+def _iter_pdf_outline(file_bytes: DocumentSource) -> Iterator[Tuple[str, Any]]:
+    """
+    目录模式：只读取文档目录（catalog）中的书签树和页面标签，不读取任何页面内容。
+    
+    Yields:
+        ("metadata", {...})、("outline", [...])、("page_labels", [...])
+    """
+    import pdfplumber
+    from pdfminer.pdfdocument import PDFNoOutlines, PDFNoPageLabels
+
+    with _open_source(file_bytes) as f:
+        pdf = pdfplumber.open(f)
+        try:
+            doc = pdf.doc
+            total_pages = _pdf_page_count(pdf)
+            yield "metadata", _pdf_metadata(pdf.metadata, total_pages)
+        
+            outline = []
+            try:
+                entries = list(doc.get_outlines())
+            except PDFNoOutlines:
+                entries = []
+            if entries:
+                page_numbers = _pdf_page_numbers_by_objid(doc)
+                for level, title, dest, action, _se in entries:
+                    outline.append({
+                        "title": title,
+                        "level": level,
+                        "page_number": _outline_page_number(doc, dest, action, page_numbers)
+                    })
+            yield "outline", outline
+        
+            try:
+                page_labels = list(itertools.islice(doc.get_page_labels(), total_pages))
+            except PDFNoPageLabels:
+                page_labels = []
+            yield "page_labels", page_labels
+        finally:
+            _close_pdf(pdf)
+
+
+def _iter_pdf_layout(file_bytes: DocumentSource, page_ranges: Optional[List[Tuple[int, int]]], text: bool,
+                     tables: bool, images: bool, workers: int,
+                     deadline: Optional[float] = None, profiler=NULL_PROFILER) -> Iterator[Tuple[str, Any]]:
+    """
+    版面分析模式：用 pdfplumber 逐页提取内容。
+    
+    元数据、页数和页面内容都来自同一个 pdfplumber 文档对象，
+    交叉引用表和对象流只解析一次。多进程模式下页面在全部完成后按顺序产出，
+    剖析时只记录整个 extract 阶段，不记录每页。
+    """
+    import pdfplumber
+
+    with _open_source(file_bytes) as f:
+        pdf = None
+        try:
+            with profiler.stage("open"):
+                pdf = pdfplumber.open(f)
+                total_pages = _pdf_page_count(pdf)
+                page_numbers = None
+                if page_ranges is not None:
+                    page_numbers = _select_pages(page_ranges, total_pages)
+                metadata = _pdf_metadata(pdf.metadata, total_pages)
+            yield "metadata", metadata
+            image_table: Dict[int, Dict[str, Any]] = {}
+            with profiler.stage("extract"):
+                # 空文档和只选一页时没有可以并行的页面，在当前进程解析
+                selected = total_pages if page_numbers is None else len(page_numbers)
+                if workers > 1 and selected > 1:
+                    if page_numbers is None:
+                        page_numbers = list(range(1, total_pages + 1))
+                    pages = _parse_pdf_pages_parallel(file_bytes, page_numbers, workers, text, tables,
+                                                      images, image_table, deadline)
+                    for page_data in pages:
+                        yield "page", page_data
+                    if len(pages) < len(page_numbers):
+                        yield "partial", True
+                else:
+                    for page in _iter_pdf_pages(pdf, page_numbers):
+                        if _expired(deadline):
+                            yield "partial", True
+                            break
+                        with profiler.item("page", page.page_number):
+                            page_data = _extract_pdf_page(page, text, tables, images, image_table)
+                        yield "page", page_data
+            yield "images", list(image_table.values())
+        finally:
+            if pdf is not None:
+                _close_pdf(pdf)
+
+
+def _wrap_pdf_errors(events: Iterator[Tuple[str, Any]]) -> Iterator[Tuple[str, Any]]:
+    """将解析过程中的异常统一转换为 ValueError"""
+    try:
+        yield from events
+    except Exception as e:
+        raise ValueError(f"无法读取 PDF 文件: {e}")
+
+
+def iter_parse_pdf(file_bytes: DocumentSource, pages: Optional[str] = None, text: bool = True,
+                   tables: bool = True, images: bool = True, workers: int = 1,
+                   mode: str = "layout", deadline: Optional[float] = None,
+                   profiler=NULL_PROFILER) -> Iterator[Tuple[str, Any]]:
+    """
+    逐页解析 PDF 文件，每解析完一页就产出一个事件，调用方无需等待整份文档。
+    
+    事件按以下顺序产出：
+    1. ("metadata", {...})：文档元数据，打开文档后立即产出
+    2. ("page", {...})：每页一个，结构与 parse_pdf 的 pages 元素相同
+    3. ("images", [...])：文档级图片表
+    
+    deadline 过期后不再解析后续页面，在 images 之前产出 ("partial", True)。
+    
+    目录模式（mode="outline"）只产出 ("metadata", ...)、("outline", ...)
+    和 ("page_labels", ...)，不产出页面事件。
+    
+    参数含义与 parse_pdf 相同。参数错误在调用时立即抛出，
+    文件损坏等解析错误在迭代过程中以 ValueError 抛出。
+    profiler 为 profiling.Profiler 时在迭代过程中记录 open、extract 阶段和每页
+    （outline 模式不记录）。
+    
+    Raises:
+        ValueError: 参数无效，或迭代过程中文件无法解析
+    """
+    if mode not in PDF_MODES:
+        raise ValueError(f"不支持的解析模式: {mode}，可选值: {', '.join(PDF_MODES)}")
+    if workers < 1:
+        raise ValueError(f"workers 必须大于 0: {workers}")
+    page_ranges = _parse_page_ranges(pages) if pages is not None else None
+    if mode == "fast":
+        return _wrap_pdf_errors(_iter_pdf_fast(file_bytes, page_ranges, deadline, profiler))
+    if mode == "outline":
+        return _wrap_pdf_errors(_iter_pdf_outline(file_bytes))
+    return _wrap_pdf_errors(_iter_pdf_layout(file_bytes, page_ranges, text, tables, images, workers,
+                                             deadline, profiler))
+
+
+def parse_pdf(file_bytes: DocumentSource, pages: Optional[str] = None, text: bool = True,
+              tables: bool = True, images: bool = True, workers: int = 1,
+              mode: str = "layout", deadline: Optional[float] = None,
+              profile: bool = False, progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
     """
     解析 PDF 文件，返回结构化 JSON。
     
@@ -176,9 +985,11 @@ def parse_pdf(file_bytes: bytes) -> Dict[str, Any]:
                        ...
                    ],
                    "images": [
-                       {"bbox": [x1, y1, x2, y2], "type": "image"},
+                       {"object_id": 12, "bbox": [x0, top, x1, bottom], "type": "image",
+                        "width": 100, "height": 80},
                        ...
-                   ]
+                   ],
+                   "scanned": false
                },
                ...
            ],
@@ -188,82 +999,174 @@ def parse_pdf(file_bytes: bytes) -> Dict[str, Any]:
                "author": "作者",
                "subject": "主题",
                "creator": "创建者"
-           }
+           },
+           "images": [
+               {"object_id": 12, "width": 800, "height": 600, "filter": ["DCTDecode"]},
+               ...
+           ]
        }
+       页面中的 width/height 为图片在页面上的显示尺寸，顶层 images 为文档级
+       图片表：每个不同的图片 XObject 只列出一次，并给出像素尺寸和解码器，
+       页面通过 object_id 引用。
+    
+    3. 页码选择（pages 不为空）：
+       - 格式如 "1-5,10"，页码从 1 开始
+       - 只实例化并分析所选页面，"pages" 中仅包含这些页
+       - "metadata" 仍描述整个文档（total_pages 为文档总页数）
+    
+    4. 内容开关：
+       - text、tables、images 可分别关闭，关闭的项在页面中保留为空值
+       - 表格检测是最慢的步骤，只需要文本时应设置 tables=False
+       - 没有文本层且图片覆盖大部分页面的扫描页会标记 "scanned": true，
+         并跳过文本和表格提取；三项均关闭时不做检测，scanned 为 false
+    
+    5. 多进程并行（workers > 1）：
+       - 所选页面按连续区间分给多个进程，文件内容通过共享内存共享
+       - 结果按页码顺序合并，与单进程输出一致
+    
+    6. 解析模式（mode）：
+       - "layout"（默认）：使用 pdfplumber 做字符级版面分析，支持表格和图片
+       - "fast"：使用 PyPDF2 直接从内容流提取文本，不做版面、表格和图片分析，
+         返回相同的 pages[].text 结构（tables、images 为空，不含 scanned）。以版面保真度
+         （阅读顺序、空格和换行可能不同）换取约一个数量级的速度提升，适合搜索索引；
+         此模式忽略 text/tables/images/workers 参数
+       - "outline"：只读取文档目录中的书签树和页面标签，不读取任何页面内容，
+         适合在决定解析哪些页之前先浏览长文档的结构。返回：
+         {
+             "pages": [],
+             "metadata": {...},
+             "outline": [{"title": "第一章", "level": 1, "page_number": 3}, ...],
+             "page_labels": ["i", "ii", "1", "2", ...]
+         }
+         level 从 1 开始表示书签层级；无法解析目标页时 page_number 为 null；
+         文档没有书签或页面标签时对应列表为空。此模式忽略除 mode 外的所有参数
     
     Args:
-        file_bytes: PDF文件的二进制内容
+        file_bytes: PDF文件的二进制内容、文件路径或二进制文件对象。传入路径时
+            文件按需从磁盘读取，多进程模式下各进程直接打开该文件
+        pages: 要解析的页码范围，为 None 时解析全部页面
+        text: 是否提取页面文本
+        tables: 是否检测并提取表格
+        images: 是否提取图片信息
+        workers: 并行解析页面的进程数，默认 1（在当前进程内解析）
+        mode: 解析模式，"layout"、"fast" 或 "outline"
+        deadline: 截止时间（time.time() 时间戳），过期后不再解析后续页面，
+            返回已解析的页面并增加 "partial": true（outline 模式忽略）
+        profile: 是否剖析 open、extract 阶段和每页的墙钟时间、CPU 时间和内存分配峰值，
+            结果加入 "profile"：{"stages": [...], "items": [...]}。多进程模式下
+            不记录每页，outline 模式不记录阶段
+        progress: 以 (已解析的页数, 所选页数) 调用：打开文档后调用一次，之后每解析完一页调用一次，
+            用于报告长文档的进度；在执行池的其他进程中解析时传入 SharedProgress。
+            多进程模式下全部页面完成后才报告各页，outline 模式不调用
         
     Returns:
         包含PDF内容的结构化字典
         
     Raises:
-        ValueError: 当文件不是有效的PDF格式时抛出
+        ValueError: 当文件不是有效的PDF格式或页码范围无效时抛出
+        
+    注意：
+    - 需要边解析边输出时使用 iter_parse_pdf
     """
     result = {"pages": [], "metadata": {}}
-    
+    profiler = _profiler(profile)
+    events = iter_parse_pdf(file_bytes, pages=pages, text=text, tables=tables, images=images,
+                            workers=workers, mode=mode, deadline=deadline, profiler=profiler)
+    with profiler:
+        for kind, payload in events:
+            if kind == "page":
+                result["pages"].append(payload)
+                if progress is not None:
+                    progress(len(result["pages"]), selected)
+            else:
+                if kind == "metadata" and progress is not None and mode != "outline":
+                    # 页码范围已在打开文档时校验
+                    selected = payload["total_pages"]
+                    if pages is not None:
+                        selected = len(_select_pages(_parse_page_ranges(pages), selected))
+                    progress(0, selected)
+                result[kind] = payload
+    return _attach_profile(result, profiler)
+
+
+def iter_pdf_result(result: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """将 parse_pdf 的返回结果还原为与 iter_parse_pdf 相同的事件序列（用于输出缓存的结果）"""
+    yield "metadata", result["metadata"]
+    for page in result["pages"]:
+        yield "page", page
+    for kind, payload in result.items():
+        if kind not in ("metadata", "pages"):
+            yield kind, payload
+
+
+def select_pdf_pages(file_bytes: DocumentSource, pages: Optional[str] = None) -> List[int]:
+    """
+    返回 pages 所选的页码列表（pages 为 None 时为全部页码），只读取页面树，不解析页面内容。
+
+    用于在解析前确定要解析的页面，如把长文档拆成多段分别调用 parse_pdf(pages=...)。
+
+    Raises:
+        ValueError: 页码范围无效，或文件不是有效的 PDF
+    """
+    import pdfplumber
+
+    page_ranges = _parse_page_ranges(pages) if pages is not None else None
     try:
-        # 使用PyPDF2获取基本信息和文本
-        pdf_reader = PyPDF2.PdfReader(BytesIO(file_bytes))
-        
-        # 获取元数据
-        if pdf_reader.metadata:
-            result["metadata"] = {
-                "total_pages": len(pdf_reader.pages),
-                "title": pdf_reader.metadata.get('/Title', ''),
-                "author": pdf_reader.metadata.get('/Author', ''),
-                "subject": pdf_reader.metadata.get('/Subject', ''),
-                "creator": pdf_reader.metadata.get('/Creator', '')
-            }
-        else:
-            result["metadata"] = {
-                "total_pages": len(pdf_reader.pages),
-                "title": "",
-                "author": "",
-                "subject": "",
-                "creator": ""
-            }
-        
-        # 使用pdfplumber进行更详细的解析
-        with pdfplumber.open(BytesIO(file_bytes)) as pdf:
-            for page_num, page in enumerate(pdf.pages, start=1):
-                page_data = {
-                    "page_number": page_num,
-                    "text": "",
-                    "tables": [],
-                    "images": []
-                }
-                
-                # 提取文本
-                page_text = page.extract_text()
-                if page_text:
-                    page_data["text"] = page_text.strip()
-                
-                # 提取表格
-                tables = page.extract_tables()
-                for table in tables:
-                    if table:  # 确保表格不为空
-                        page_data["tables"].append(table)
-                
-                # 提取图片信息
-                images = page.images
-                for img in images:
-                    page_data["images"].append({
-                        "bbox": img['bbox'],
-                        "type": "image",
-                        "width": img['width'],
-                        "height": img['height']
-                    })
-                
-                result["pages"].append(page_data)
-                
+        with _open_source(file_bytes) as f:
+            pdf = pdfplumber.open(f)
+            try:
+                total_pages = _pdf_page_count(pdf)
+            finally:
+                _close_pdf(pdf)
     except Exception as e:
         raise ValueError(f"无法读取 PDF 文件: {e}")
+    if page_ranges is None:
+        return list(range(1, total_pages + 1))
+    return _select_pages(page_ranges, total_pages)
+
+
+class _StringTable:
+    """
+    工作簿级字符串表。
     
-    return result
+    相同文本在整个工作簿内只保留一个 str 对象，并按首次出现的顺序编号，
+    用于压缩状态列、地区名等大量重复的分类数据。
+    """
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, value: str) -> str:
+        """返回与 value 相等的共享 str 对象"""
+        return self.strings[self.index(value)]
+
+    def index(self, value: str) -> int:
+        """返回 value 在字符串表中的下标，首次出现时追加到表尾"""
+        idx = self._index.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self._index[value] = idx
+            self.strings.append(value)
+        return idx
 
 
-def parse_xlsx(file_bytes: bytes) -> Dict[str, Any]:
+def _xlsx_cell_info(value: Any, coordinate: str, data_type: str, sheet_data: Dict[str, Any],
+                    strings: _StringTable, string_table: bool) -> Dict[str, Any]:
+    """构造单个单元格的输出，公式同时登记到工作表的 formulas 列表"""
+    if data_type == 'f':
+        sheet_data["formulas"].append({"coordinate": coordinate, "formula": value})
+        return {"value": value, "coordinate": coordinate, "formula": value}
+    if isinstance(value, str):
+        if string_table:
+            return {"string_index": strings.index(value), "coordinate": coordinate}
+        value = strings.intern(value)
+    return {"value": value, "coordinate": coordinate}
+
+
+def parse_xlsx(file_bytes: DocumentSource, preview_rows: Optional[int] = None,
+               string_table: bool = False, deadline: Optional[float] = None,
+               profile: bool = False) -> Dict[str, Any]:
     """
     解析 XLSX 文件，返回结构化 JSON。
     
@@ -294,34 +1197,134 @@ def parse_xlsx(file_bytes: bytes) -> Dict[str, Any]:
            ]
        }
     
+    3. 预览模式（preview_rows 不为空）：
+       - 只读取每个工作表的 <dimension> 元素和前 N 行，读到第 N 行即停止
+       - 每个工作表额外返回 "dimension"、"max_row"、"max_column"
+         （工作表未声明 <dimension> 时为 null）
+       - 耗时与工作表总行数无关，适合上传文件的快速分拣
+    
+    4. 字符串表（string_table=True）：
+       - 结果顶层增加 "strings": ["open", "closed", ...]，每个不同的文本只出现一次
+       - 文本单元格输出为 {"string_index": 0, "coordinate": "B2"}，不再携带 "value"
+       - 数字、日期和公式单元格保持原格式
+       - 无论是否开启，相同文本在整个工作簿内都只保留一个 str 对象
+    
     Args:
-        file_bytes: XLSX文件的二进制内容
+        file_bytes: XLSX文件的二进制内容、文件路径或二进制文件对象
+        preview_rows: 预览模式下每个工作表读取的行数，为 None 时解析完整工作簿
+        string_table: 是否以字符串表下标的形式输出文本单元格
+        deadline: 截止时间（time.time() 时间戳），过期后不再读取后续行，
+            返回已读取的行并增加 "partial": true
+        profile: 是否剖析各阶段（open、extract 等）和每个工作表的墙钟时间、CPU 时间和
+            内存分配峰值，结果加入 "profile"：{"stages": [...], "items": [...]}
         
     Returns:
         包含Excel文件内容的结构化字典
         
     注意：
-    - 使用临时文件处理，会自动清理
+    - 直接从内存或原文件读取，不再写入临时文件
     - data_only=False 设置可以获取公式内容
     """
+    import openpyxl
+
+    strings = _StringTable()
+    profiler = _profiler(profile)
+    with profiler, _open_source(file_bytes) as f:
+        if preview_rows is not None:
+            result = _preview_xlsx(f, preview_rows, strings, string_table, deadline, profiler)
+        else:
+            result = {"sheets": []}
+            with profiler.stage("open"):
+                wb = openpyxl.load_workbook(f, data_only=False)
+            with profiler.stage("extract"):
+                for index, sheet in enumerate(wb.worksheets, start=1):
+                    sheet_data = {"title": sheet.title, "cells": [], "formulas": []}
+                    result["sheets"].append(sheet_data)
+                    with profiler.item("sheet", index, title=sheet.title):
+                        for row in sheet.iter_rows():
+                            if _expired(deadline):
+                                result["partial"] = True
+                                break
+                            row_data = []
+                            for cell in row:
+                                row_data.append(_xlsx_cell_info(cell.value, cell.coordinate, cell.data_type,
+                                                                sheet_data, strings, string_table))
+                            sheet_data["cells"].append(row_data)
+                    if result.get("partial"):
+                        break
+    if string_table:
+        result["strings"] = strings.strings
+    return _attach_profile(result, profiler)
+
+
+def _preview_xlsx(f: BinaryIO, preview_rows: int, strings: _StringTable,
+                  string_table: bool, deadline: Optional[float] = None,
+                  profiler=NULL_PROFILER) -> Dict[str, Any]:
+    """
+    以只读模式预览 XLSX 文件，仅读取每个工作表的尺寸和前 preview_rows 行。
+    
+    只读模式下工作表按需流式解析，迭代在第 preview_rows 行处结束，
+    不会读取之后的 XML 内容。
+    
+    Args:
+        f: XLSX文件对象
+        preview_rows: 每个工作表读取的最大行数
+        strings: 工作簿级字符串表
+        string_table: 是否以字符串表下标的形式输出文本单元格
+        deadline: 截止时间，含义与 parse_xlsx 相同
+        profiler: 记录 open、extract 阶段和每个工作表的剖析器
+        
+    Returns:
+        与 parse_xlsx 相同结构的字典，工作表额外包含尺寸信息
+    """
+    if preview_rows < 0:
+        raise ValueError(f"preview_rows 不能为负数: {preview_rows}")
+    import openpyxl
+
     result = {"sheets": []}
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        tmp.write(file_bytes)
-        tmp_path = tmp.name
+    with profiler.stage("open"):
+        wb = openpyxl.load_workbook(f, read_only=True, data_only=False)
     try:
-        wb = openpyxl.load_workbook(tmp_path, data_only=False)
-        for sheet in wb.worksheets:
-            sheet_data = {"title": sheet.title, "cells": [], "formulas": []}
-            for row in sheet.iter_rows():
-                row_data = []
-                for cell in row:
-                    cell_info = {"value": cell.value, "coordinate": cell.coordinate}
-                    if cell.data_type == 'f':
-                        cell_info["formula"] = cell.value
-                        sheet_data["formulas"].append({"coordinate": cell.coordinate, "formula": cell.value})
-                    row_data.append(cell_info)
-                sheet_data["cells"].append(row_data)
-            result["sheets"].append(sheet_data)
+        with profiler.stage("extract"):
+            for index, sheet in enumerate(wb.worksheets, start=1):
+                with profiler.item("sheet", index, title=sheet.title):
+                    _preview_xlsx_sheet(sheet, preview_rows, strings, string_table, deadline, result)
+                if result.get("partial"):
+                    break
     finally:
-        os.remove(tmp_path)
-    return result
\ No newline at end of file
+        wb.close()
+    return result
+
+
+def _preview_xlsx_sheet(sheet, preview_rows: int, strings: _StringTable, string_table: bool,
+                        deadline: Optional[float], result: Dict[str, Any]) -> None:
+    """读取一个工作表的尺寸和前 preview_rows 行，加入 result["sheets"]"""
+    from openpyxl.utils import get_column_letter
+
+    sized = bool(sheet.max_row and sheet.max_column)
+    sheet_data = {
+        "title": sheet.title,
+        "dimension": sheet.calculate_dimension() if sized else None,
+        "max_row": sheet.max_row,
+        "max_column": sheet.max_column,
+        "cells": [],
+        "formulas": []
+    }
+    result["sheets"].append(sheet_data)
+    if preview_rows == 0:
+        return
+    min_row = sheet.min_row or 1
+    min_col = sheet.min_column or 1
+    rows = sheet.iter_rows(min_row=min_row, min_col=min_col,
+                           max_row=min_row + preview_rows - 1)
+    for row_idx, row in enumerate(rows, start=min_row):
+        if _expired(deadline):
+            result["partial"] = True
+            break
+        row_data = []
+        for col_idx, cell in enumerate(row, start=min_col):
+            # 只读模式下缺失的单元格为 EmptyCell，没有 coordinate 属性
+            coordinate = f"{get_column_letter(col_idx)}{row_idx}"
+            row_data.append(_xlsx_cell_info(cell.value, coordinate, cell.data_type,
+                                            sheet_data, strings, string_table))
+        sheet_data["cells"].append(row_data)
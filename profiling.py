@@ -0,0 +1,162 @@
+"""
+单次解析的分阶段性能剖析。
+
+Profiler 记录每个阶段（下载、读取上传文件、打开文档、逐页提取、序列化等）以及每张幻灯片、
+每页的墙钟时间、CPU 时间和 tracemalloc 统计的内存分配峰值，用于定位某个文档慢在哪一步。
+
+- CPU 时间为执行该阶段的线程的 CPU 时间（time.thread_time），跨 await 的阶段还包括
+  同一线程上其他请求的 CPU 时间
+- 内存峰值为阶段内相对阶段开始时新增分配的峰值；tracemalloc 按进程统计，
+  同一进程中同时进行的其他请求也会计入
+- 开启 tracemalloc 会使内存分配变慢，剖析时的耗时通常高于正常解析
+"""
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _start_tracing() -> None:
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+def _reset_after_fork() -> None:
+    # 在父进程剖析期间创建的解析进程不继承父进程的 tracemalloc 状态
+    global _tracing_lock, _tracing_users
+    _tracing_lock = threading.Lock()
+    _tracing_users = 0
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class _Frame:
+    def __init__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.memory = 0
+        self.peak = 0
+
+
+class Profiler:
+    """
+    记录阶段和条目（幻灯片、页、工作表等）耗时的剖析器，作为上下文管理器使用时开启 tracemalloc。
+
+    阶段可以嵌套；stage 和 item 产出本次记录的字典，调用方可以向其中补充信息
+    （如解析进程返回的子阶段）。
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+        self.items: List[Dict[str, Any]] = []
+        self._stack: List[_Frame] = []
+        self._tracing = False
+
+    def __enter__(self) -> "Profiler":
+        _start_tracing()
+        self._tracing = True
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._tracing:
+            self._tracing = False
+            _stop_tracing()
+
+    def _traced_memory(self):
+        return tracemalloc.get_traced_memory() if self._tracing else (0, 0)
+
+    @contextmanager
+    def _measure(self, record: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        # 嵌套阶段会重置峰值，重置前先把当前峰值计入外层阶段
+        current, peak = self._traced_memory()
+        for frame in self._stack:
+            frame.peak = max(frame.peak, peak)
+        if self._tracing:
+            tracemalloc.reset_peak()
+        frame = _Frame()
+        frame.memory = frame.peak = current
+        self._stack.append(frame)
+        try:
+            yield record
+        finally:
+            self._stack.pop()
+            _, peak = self._traced_memory()
+            frame.peak = max(frame.peak, peak)
+            for outer in self._stack:
+                outer.peak = max(outer.peak, frame.peak)
+            record["wall_ms"] = round((time.perf_counter() - frame.wall) * 1000, 3)
+            record["cpu_ms"] = round((time.thread_time() - frame.cpu) * 1000, 3)
+            record["peak_bytes"] = max(0, frame.peak - frame.memory) if self._tracing else None
+
+    def stage(self, name: str) -> ContextManager[Dict[str, Any]]:
+        """记录一个阶段"""
+        record = {"name": name}
+        self.stages.append(record)
+        return self._measure(record)
+
+    def item(self, kind: str, index: int, **info: Any) -> ContextManager[Dict[str, Any]]:
+        """记录一个条目，如 item("slide", 3) 或 item("sheet", 1, title="Sheet1")"""
+        record = {"kind": kind, "index": index, **info}
+        self.items.append(record)
+        return self._measure(record)
+
+    def merge(self, record: Dict[str, Any], profile: Dict[str, Any]) -> None:
+        """
+        把解析器返回的剖析结果（另一个 Profiler 的 to_dict()）并入已结束的阶段 record：
+        子阶段放入 record["stages"]，条目加入本剖析器的 items
+        """
+        record["stages"] = profile["stages"]
+        self.items.extend(profile["items"])
+        # 在同一进程内解析时（线程池、MCP 服务）内层剖析器会重置 tracemalloc 峰值，
+        # 外层阶段的峰值至少为子阶段的峰值
+        peaks = [stage["peak_bytes"] for stage in profile["stages"] if stage.get("peak_bytes") is not None]
+        if record.get("peak_bytes") is not None and peaks:
+            record["peak_bytes"] = max(record["peak_bytes"], *peaks)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """{"stages": [...], "items": [...]}，每条记录包含 wall_ms、cpu_ms 和 peak_bytes"""
+        return {"stages": self.stages, "items": self.items}
+
+
+class _NullProfiler:
+    """不记录任何内容的剖析器，未开启剖析时使用，避免调用方判断"""
+    enabled = False
+
+    def __enter__(self) -> "_NullProfiler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def stage(self, name: str) -> ContextManager[Dict[str, Any]]:
+        return nullcontext({})
+
+    def item(self, kind: str, index: int, **info: Any) -> ContextManager[Dict[str, Any]]:
+        return nullcontext({})
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return None
+
+
+NULL_PROFILER = _NullProfiler()
@@ -0,0 +1,194 @@
+"""
+JSON 响应的序列化与压缩。
+
+- 序列化：JSON_SERIALIZER=orjson 时使用 orjson（未安装时退回标准库 json），
+  多兆字节的解析结果序列化耗时可降低一个数量级
+- 压缩：CompressionMiddleware 按 Accept-Encoding 协商 br（需安装 brotli）或 gzip，
+  JSON 结果重复度高，通常可压缩到原大小的 10% 以下；流式响应逐块压缩并立即刷新，
+  不影响 NDJSON 事件的实时性
+"""
+import json
+import logging
+import zlib
+from typing import Any, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 为可选依赖
+    brotli = None
+
+logger = logging.getLogger("ppt-mcp")
+
+SERIALIZERS = ("json", "orjson")
+
+
+class JSONSerializer:
+    """
+    将对象序列化为 UTF-8 JSON 字节串，输出格式与 starlette 的 JSONResponse 相同（紧凑、不转义非 ASCII 字符）。
+
+    Args:
+        kind: "json"（标准库）或 "orjson"；orjson 未安装时退回标准库
+    """
+
+    def __init__(self, kind: str = "json"):
+        if kind not in SERIALIZERS:
+            raise ValueError(f"不支持的序列化器: {kind}，可选值: {', '.join(SERIALIZERS)}")
+        if kind == "orjson" and orjson is None:
+            logger.warning("未安装 orjson，改用标准库 json")
+            kind = "json"
+        self.kind = kind
+
+    def dumps(self, content: Any) -> bytes:
+        if self.kind == "orjson":
+            try:
+                return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                # orjson 不支持的类型（如超过 64 位的整数）交给标准库处理
+                pass
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(",", ":")).encode("utf-8")
+
+
+class SerializedJSONResponse(JSONResponse):
+    """使用类属性 serializer 序列化的 JSONResponse，子类替换 serializer 即可切换序列化器"""
+
+    serializer = JSONSerializer()
+
+    def render(self, content: Any) -> bytes:
+        return self.serializer.dumps(content)
+
+
+def available_encodings() -> tuple:
+    """当前环境支持的压缩编码，按优先级排列"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """
+    从 Accept-Encoding 中选出客户端接受（q > 0）且服务端支持的编码，
+    客户端权重相同时按 encodings 的顺序选择；都不接受时返回 None。
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.process(data) + (
+            self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    """
+    ASGI 中间件：按 Accept-Encoding 压缩响应体。
+
+    - 一次性返回的响应体小于 minimum_size 字节时不压缩
+    - 分多次发送的（流式）响应逐块压缩，每块压缩后立即刷新
+    - 已设置 Content-Encoding 的响应原样返回
+
+    Args:
+        encodings: 允许使用的编码，按优先级排列；不可用的编码（如未安装 brotli 时的 br）被忽略
+        minimum_size: 压缩的最小响应体字节数
+        gzip_level: gzip 压缩级别（1-9）
+        brotli_quality: brotli 压缩质量（0-11）
+    """
+
+    def __init__(self, app, encodings: Sequence[str] = ("br", "gzip"), minimum_size: int = 1024,
+                 gzip_level: int = 1, brotli_quality: int = 4):
+        self.app = app
+        self.encodings = [e for e in encodings if e in available_encodings()]
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _stream(self, encoding: str):
+        if encoding == "br":
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        stream = None
+        passthrough = False
+
+        async def compressed_send(message):
+            nonlocal start_message, stream, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # 等到第一块响应体才能决定是否压缩
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if "content-encoding" in headers or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                stream = self._stream(encoding)
+                body = stream.compress(body, final=not more_body)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+            else:
+                body = stream.compress(body, final=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, compressed_send)
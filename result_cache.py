@@ -0,0 +1,211 @@
+"""
+解析结果缓存。
+
+缓存键由文件内容的 SHA-256、解析器名称、解析选项（补全为解析器的默认值）和 PARSER_VERSION 组成，
+同一份文件以相同选项再次解析时直接返回缓存结果。缓存分两级：
+- 内存：进程内 LRU，按序列化后的字节数限制容量
+- 磁盘：SQLite 数据库，服务重启后仍然有效；HTTP 服务和 MCP 服务
+  配置同一个数据库文件即可共享缓存
+
+结果以 JSON 序列化后保存，命中时返回新的对象，调用方修改结果不会影响缓存。
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from parser import PARSER_VERSION, DocumentSource
+
+# 只影响解析方式、不影响（完整）解析结果的选项，不计入缓存键
+UNKEYED_OPTIONS = frozenset({"workers", "deadline", "progress"})
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_source(source: DocumentSource) -> str:
+    """计算文件内容的 SHA-256；文件路径和文件对象按块读取，不把整个文件读入内存"""
+    digest = hashlib.sha256()
+    if isinstance(source, bytes):
+        digest.update(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            while chunk := f.read(_HASH_CHUNK_SIZE):
+                digest.update(chunk)
+    else:
+        source.seek(0)
+        while chunk := source.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _signature(parser: Callable[..., Dict[str, Any]]) -> inspect.Signature:
+    return inspect.signature(parser)
+
+
+def _parser_signature(parser: Callable[..., Dict[str, Any]]) -> inspect.Signature:
+    # 调用方可能每次传入新的包装函数（functools.wraps），按被包装的解析器缓存签名
+    return _signature(inspect.unwrap(parser))
+
+
+class ResultCache:
+    """
+    两级解析结果缓存，可在多个线程中使用。
+
+    Args:
+        memory_bytes: 内存缓存容量（字节），为 0 时不使用内存缓存
+        path: SQLite 数据库文件路径，为 None 时不使用磁盘缓存
+        disk_bytes: 磁盘缓存容量（字节），超过后淘汰最久未访问的结果
+    """
+
+    def __init__(self, memory_bytes: int = 64 * 1024 * 1024, path: Optional[str] = None,
+                 disk_bytes: int = 1024 * 1024 * 1024):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                       "memory_evictions": 0, "disk_evictions": 0}
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                       isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS results ("
+                             "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                             "size INTEGER NOT NULL, accessed REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    @staticmethod
+    def key(source: DocumentSource, parser: Callable[..., Dict[str, Any]],
+            options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        计算缓存键。
+
+        未传入的选项按解析器的默认值计入，省略选项与显式传入默认值得到相同的键。
+
+        Args:
+            source: 文件内容、文件路径或二进制文件对象
+            parser: 解析函数，如 parse_pdf
+            options: 解析选项，UNKEYED_OPTIONS 中的选项会被忽略
+
+        Raises:
+            TypeError: options 中有解析器不接受的选项
+        """
+        bound = _parser_signature(parser).bind_partial(**(options or {}))
+        bound.apply_defaults()
+        options = {k: v for k, v in bound.arguments.items() if k not in UNKEYED_OPTIONS}
+        meta = json.dumps([parser.__name__, PARSER_VERSION, options], sort_keys=True)
+        return hashlib.sha256(f"{_hash_source(source)}:{meta}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """返回缓存的解析结果，未命中时返回 None；磁盘缓存命中的结果会放入内存缓存"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+            elif self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = bytes(row[0])
+                    self._db.execute("UPDATE results SET accessed = ? WHERE key = ?",
+                                     (time.time(), key))
+                    self._stats["disk_hits"] += 1
+                    self._put_memory(key, value)
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+        return json.loads(value)
+
+    def put(self, key: str, result: Dict[str, Any]) -> bool:
+        """
+        保存解析结果。
+
+        因截止时间过期而不完整（"partial": true）的结果不保存。
+
+        Returns:
+            结果是否已保存（结果不完整、超过内存和磁盘缓存容量、或两级缓存都未启用时为 False）
+        """
+        if result.get("partial"):
+            return False
+        value = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            stored = self._put_memory(key, value)
+            if self._db is not None and len(value) <= self.disk_bytes:
+                self._db.execute("INSERT OR REPLACE INTO results (key, value, size, accessed) "
+                                 "VALUES (?, ?, ?, ?)", (key, value, len(value), time.time()))
+                self._evict_disk()
+                stored = True
+        return stored
+
+    def _put_memory(self, key: str, value: bytes) -> bool:
+        if len(value) > self.memory_bytes:
+            return False
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = value
+        self._memory_size += len(value)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self._stats["memory_evictions"] += 1
+        return True
+
+    def _evict_disk(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        while total > self.disk_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM results ORDER BY accessed LIMIT 64").fetchall()
+            for key, size in rows:
+                if total <= self.disk_bytes:
+                    break
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+                self._stats["disk_evictions"] += 1
+
+    def parse(self, func: Callable[..., Dict[str, Any]], source: DocumentSource,
+              **options: Any) -> Dict[str, Any]:
+        """先查缓存，未命中时调用 func(source, **options) 解析并写入缓存"""
+        key = self.key(source, func, options)
+        result = self.get(key)
+        if result is None:
+            result = func(source, **options)
+            self.put(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        返回缓存统计：命中次数（内存/磁盘）、未命中次数、命中率、
+        淘汰次数（内存/磁盘）以及当前内存缓存的条目数和字节数
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_size
+            if self._db is not None:
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+                stats["disk_entries"] = count
+                stats["disk_bytes"] = size
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        """关闭磁盘缓存数据库连接"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
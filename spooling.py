@@ -0,0 +1,143 @@
+"""
+请求体暂存与大小限制。
+
+小文件保存在内存中；超过内存阈值后转存到磁盘上的临时文件，
+避免多个大文件同时处理时把整个文件内容都放在内存里。
+"""
+import os
+import tempfile
+from io import BytesIO
+from typing import Optional, Union
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+# 按块读取上传文件和下载内容时每块的大小
+CHUNK_SIZE = 64 * 1024
+
+
+class PayloadTooLarge(Exception):
+    """内容超过允许的最大字节数"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"文件大小超过上限 {limit} 字节")
+        self.limit = limit
+
+
+class SpooledBuffer:
+    """
+    按块写入的暂存缓冲区。
+
+    - 累计大小不超过 max_memory 时内容保存在内存中
+    - 超过 max_memory 后把已有内容和后续块写入命名临时文件
+    - 累计大小超过 max_size 时 write 抛出 PayloadTooLarge
+
+    用完后调用 close（或使用 with 语句）删除临时文件。
+    内容在内存中时 source 和 getvalue 只在第一次调用时复制一次内容，之后返回同一个 bytes 对象。
+    """
+
+    def __init__(self, max_memory: int, max_size: Optional[int] = None):
+        self.max_memory = max_memory
+        self.max_size = max_size
+        self.size = 0
+        self._buffer: Optional[BytesIO] = BytesIO()
+        self._value: Optional[bytes] = None
+        self._file = None
+
+    @property
+    def spilled(self) -> bool:
+        """内容是否已转存到磁盘"""
+        return self._file is not None
+
+    @property
+    def path(self) -> Optional[str]:
+        """转存文件的路径，内容仍在内存中时为 None"""
+        return self._file.name if self._file is not None else None
+
+    def write(self, chunk: bytes) -> None:
+        if self.max_size is not None and self.size + len(chunk) > self.max_size:
+            raise PayloadTooLarge(self.max_size)
+        self.size += len(chunk)
+        if self._value is not None:
+            # 取得内容后又写入：缓冲区中已是同样的内容，丢弃已取得的副本
+            self._value = None
+        if self._file is None and self.size > self.max_memory:
+            self._file = tempfile.NamedTemporaryFile(prefix="ppt-mcp-", delete=False)
+            self._file.write(self._buffer.getvalue())
+            self._buffer = None
+        (self._file or self._buffer).write(chunk)
+
+    def source(self) -> Union[bytes, str]:
+        """
+        供解析器使用的文件来源：内容仍在内存中时返回 bytes，已转存时返回文件路径，
+        解析器直接从磁盘读取，不再把整个文件读回内存
+        """
+        if self._file is None:
+            return self._memory_value()
+        self._file.flush()
+        return self._file.name
+
+    def getvalue(self) -> bytes:
+        """返回全部内容"""
+        if self._file is None:
+            return self._memory_value()
+        self._file.flush()
+        with open(self._file.name, "rb") as f:
+            return f.read()
+
+    def _memory_value(self) -> bytes:
+        if self._value is None:
+            self._value = self._buffer.getvalue()
+        return self._value
+
+    def close(self) -> None:
+        """释放内存缓冲区并删除临时文件"""
+        self._buffer = None
+        self._value = None
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.unlink(self._file.name)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "SpooledBuffer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class MaxBodySizeMiddleware:
+    """
+    ASGI 中间件：请求体超过 max_size 字节时返回 413。
+
+    声明了 Content-Length 的请求在读取请求体之前直接拒绝；
+    分块传输的请求在累计接收的字节数超过上限时中断读取。
+    """
+
+    def __init__(self, app, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        detail = f"请求体大小超过上限 {self.max_size} 字节"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_size:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
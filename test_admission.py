@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from admission import AdmissionController, Overloaded, parse_format_map
+
+
+class TestParseFormatMap(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_format_map(" pdf=2, XLSX=0.5,"), {"pdf": 2.0, "xlsx": 0.5})
+        self.assertEqual(parse_format_map(""), {})
+        for spec in ("pdf", "pdf=x"):
+            with self.assertRaises(ValueError):
+                parse_format_map(spec)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_limit_queue_and_reject(self):
+        async def scenario():
+            controller = AdmissionController({"pdf": 1}, queue_size=1)
+            cost = await controller.acquire("pdf", 100)
+            waiting = asyncio.create_task(controller.acquire("pdf", 100))
+            await asyncio.sleep(0)
+            self.assertFalse(waiting.done())
+            with self.assertRaises(Overloaded) as cm:
+                await controller.acquire("pdf", 100)
+            self.assertGreaterEqual(cm.exception.retry_after, 1)
+            # 不计入等待队列的调用方不会被拒绝
+            unqueued = asyncio.create_task(controller.acquire("pdf", 100, queue=False))
+            # 其他格式不受影响
+            await controller.acquire("xlsx", 100)
+            controller.release("pdf", cost, elapsed=0.5)
+            await waiting
+            self.assertFalse(unqueued.done())
+            controller.release("pdf", cost)
+            await unqueued
+            stats = controller.stats()
+            self.assertEqual(stats["formats"]["pdf"], {"limit": 1, "active": 1, "waiting": 0, "rejected": 1})
+
+        asyncio.run(scenario())
+
+    def test_memory_budget(self):
+        async def scenario():
+            controller = AdmissionController(default_limit=10, memory_bytes=1000,
+                                             memory_factors={"pdf": 10, "xlsx": 1})
+            self.assertEqual(controller.cost("pdf", 60), 600)
+            # 超过整个预算的文件按整个预算计算，只能单独执行
+            self.assertEqual(controller.cost("pdf", 10 ** 6), 1000)
+            first = await controller.acquire("pdf", 60)
+            second = asyncio.create_task(controller.acquire("pdf", 60))
+            await asyncio.sleep(0)
+            self.assertFalse(second.done())
+            # 剩余的 400 不足以执行 second，全部为它预留：后到的小文件（任何格式）都不能插队
+            small = asyncio.create_task(controller.acquire("xlsx", 300))
+            tiny = asyncio.create_task(controller.acquire("pptx", 20))
+            await asyncio.sleep(0)
+            self.assertFalse(small.done() or tiny.done())
+            self.assertEqual(controller.memory_used, 600)
+            controller.release("pdf", first)
+            # second 先执行，预算剩余部分按先后放行
+            await asyncio.wait_for(asyncio.gather(second, small, tiny), 1)
+            self.assertEqual(controller.memory_used, 1000)
+
+        asyncio.run(scenario())
+
+    def test_large_file_not_starved_by_other_formats(self):
+        async def scenario():
+            controller = AdmissionController(default_limit=10, memory_bytes=1000,
+                                             memory_factors={"pdf": 10, "xlsx": 1})
+            small = await controller.acquire("xlsx", 100)
+            large = asyncio.create_task(controller.acquire("pdf", 10 ** 6))
+            await asyncio.sleep(0)
+            # 大文件需要整个预算：之后到达的其他格式的任务都要等它执行
+            later = asyncio.create_task(controller.acquire("xlsx", 100))
+            await asyncio.sleep(0)
+            self.assertFalse(later.done())
+            controller.release("xlsx", small)
+            cost = await large
+            self.assertFalse(later.done())
+            controller.release("pdf", cost)
+            await later
+            self.assertEqual(controller.memory_used, 100)
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter(self):
+        async def scenario():
+            controller = AdmissionController({"pdf": 1})
+            async with controller.slot("pdf", 0):
+                waiting = asyncio.create_task(controller.acquire("pdf", 0))
+                await asyncio.sleep(0)
+                waiting.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await waiting
+                self.assertEqual(controller.stats()["formats"]["pdf"]["waiting"], 0)
+            self.assertEqual(controller.stats()["formats"]["pdf"]["active"], 0)
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,613 @@
+import asyncio
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+import zipfile
+from io import BytesIO
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+import app as app_module
+import metrics
+from app import app
+from admission import AdmissionController
+from benchmark import make_pdf, make_xlsx
+from downloader import Downloader
+from parse_pool import ParsePool, ParseTimeout
+from result_cache import ResultCache
+from spooling import MaxBodySizeMiddleware, SpooledBuffer
+from test_downloader import LocalServer
+
+
+def _sleep_then_pid(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _sleep_with_child_pool(path, seconds):
+    """在工作进程中再创建一个进程池（类似 PDF_WORKERS），把子进程号写入 path 后等待"""
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(1) as executor:
+        executor.submit(os.getpid).result()
+        with open(path, "w") as f:
+            f.write(" ".join(str(pid) for pid in executor._processes))
+        time.sleep(seconds)
+
+
+def _process_alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+class TestParsePdfStream(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_metadata_then_pages_then_images(self):
+        files = {"file": ("doc.pdf", make_pdf(pages=3, lines=1), "application/pdf")}
+        resp = self.client.post("/parse-pdf-stream", files=files, params={"pages": "2-3"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["content-type"].startswith("application/x-ndjson"))
+        events = [json.loads(line) for line in resp.text.splitlines()]
+        self.assertEqual([e["type"] for e in events], ["metadata", "page", "page", "images"])
+        self.assertEqual(events[0]["metadata"]["total_pages"], 3)
+        self.assertEqual(events[1]["page"]["page_number"], 2)
+
+    def test_invalid_pdf_rejected_before_streaming(self):
+        files = {"file": ("doc.pdf", b"not a pdf", "application/pdf")}
+        resp = self.client.post("/parse-pdf-stream", files=files)
+        self.assertEqual(resp.status_code, 400)
+
+
+class TestParsePool(unittest.TestCase):
+    def setUp(self):
+        self.original = app_module.result_cache
+        app_module.result_cache = ResultCache(memory_bytes=0)
+
+    def tearDown(self):
+        app_module.result_cache = self.original
+
+    def test_event_loop_free_while_parsing(self):
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                files = {"file": ("big.pdf", make_pdf(pages=40), "application/pdf")}
+                big = asyncio.create_task(client.post("/parse-pdf", files=files))
+                await asyncio.sleep(0.2)
+                small = await client.get("/openapi.json")
+                self.assertEqual(small.status_code, 200)
+                # 事件循环未被解析阻塞：小请求返回时大文件仍在解析
+                self.assertFalse(big.done())
+                resp = await big
+                self.assertEqual(resp.status_code, 200)
+                self.assertEqual(len(resp.json()["pages"]), 40)
+
+        asyncio.run(scenario())
+
+
+class TestUploadLimits(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.limits = (app_module.UPLOAD_MAX_BYTES, app_module.UPLOAD_MEMORY_BYTES)
+        self.cache = app_module.result_cache
+        app_module.result_cache = ResultCache(memory_bytes=0)
+
+    def tearDown(self):
+        app_module.UPLOAD_MAX_BYTES, app_module.UPLOAD_MEMORY_BYTES = self.limits
+        app_module.result_cache = self.cache
+
+    def spooled_files(self):
+        return set(glob.glob(os.path.join(tempfile.gettempdir(), "ppt-mcp-*")))
+
+    def test_large_upload_spilled_to_disk_and_removed(self):
+        app_module.UPLOAD_MEMORY_BYTES = 1024
+        before = self.spooled_files()
+        files = {"file": ("doc.pdf", make_pdf(pages=5, lines=5), "application/pdf")}
+        resp = self.client.post("/parse-pdf", files=files)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()["pages"]), 5)
+        resp = self.client.post("/parse-pdf-stream", files=files)
+        self.assertEqual(len(resp.text.splitlines()), 7)
+        self.assertEqual(self.spooled_files(), before)
+
+    def test_source_copied_once(self):
+        body = SpooledBuffer(max_memory=1024)
+        body.write(b"abc")
+        self.assertIs(body.source(), body.source())
+        self.assertIs(body.getvalue(), body.source())
+        body.write(b"def")
+        self.assertEqual(body.source(), b"abcdef")
+        body.close()
+
+    def test_upload_over_limit(self):
+        app_module.UPLOAD_MAX_BYTES = 1024
+        files = {"file": ("doc.pdf", make_pdf(pages=5, lines=5), "application/pdf")}
+        resp = self.client.post("/parse-pdf", files=files)
+        self.assertEqual(resp.status_code, 413)
+
+    def test_request_body_limit(self):
+        limited = FastAPI()
+        limited.add_middleware(MaxBodySizeMiddleware, max_size=1024)
+
+        @limited.post("/upload")
+        async def upload(file: UploadFile = File(...)):
+            return {"size": len(await file.read())}
+
+        client = TestClient(limited)
+        files = {"file": ("a.bin", b"x" * 100)}
+        self.assertEqual(client.post("/upload", files=files).json(), {"size": 100})
+        # 声明了 Content-Length 的请求在读取请求体之前被拒绝
+        files = {"file": ("a.bin", b"x" * 2048)}
+        self.assertEqual(client.post("/upload", files=files).status_code, 413)
+        # 分块传输的请求在累计字节数超过上限时被拒绝
+        request = httpx.Request("POST", "http://test/upload", files=files)
+        data = request.read()
+        chunks = iter([data[:512], data[512:1536], data[1536:]])
+        resp = client.post("/upload", content=chunks,
+                           headers={"content-type": request.headers["content-type"]})
+        self.assertEqual(resp.status_code, 413)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.original = app_module.result_cache
+        app_module.result_cache = ResultCache()
+
+    def tearDown(self):
+        app_module.result_cache = self.original
+
+    def test_repeated_upload_served_from_cache(self):
+        files = {"file": ("doc.pdf", make_pdf(pages=2, lines=1), "application/pdf")}
+        first = self.client.post("/parse-pdf", files=files, params={"tables": "false"})
+        second = self.client.post("/parse-pdf", files=files, params={"tables": "false"})
+        self.assertEqual(second.json(), first.json())
+        # 参数不同时重新解析
+        self.client.post("/parse-pdf", files=files)
+        stats = self.client.get("/cache/stats").json()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        # 流式接口直接输出缓存结果
+        resp = self.client.post("/parse-pdf-stream", files=files)
+        events = [json.loads(line) for line in resp.text.splitlines()]
+        self.assertEqual([e["type"] for e in events], ["metadata", "page", "page", "images"])
+        self.assertEqual(self.client.get("/cache/stats").json()["hits"], 2)
+
+
+class TestParseBatch(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.max_files = app_module.BATCH_MAX_FILES
+
+    def tearDown(self):
+        app_module.BATCH_MAX_FILES = self.max_files
+
+    def test_multiple_files(self):
+        files = [
+            ("files", ("a.pdf", make_pdf(pages=2, lines=1), "application/pdf")),
+            ("files", ("b.xlsx", make_xlsx(rows=5), "application/octet-stream")),
+            ("files", ("c.txt", b"hello", "text/plain")),
+            ("files", ("d.pdf", b"not a pdf", "application/pdf")),
+        ]
+        resp = self.client.post("/parse-batch", files=files)
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        self.assertEqual([r["filename"] for r in body["results"]], ["a.pdf", "b.xlsx", "c.txt", "d.pdf"])
+        self.assertEqual([r["status_code"] for r in body["results"]], [200, 200, 400, 400])
+        self.assertEqual(body["results"][0]["result"]["metadata"]["total_pages"], 2)
+        self.assertEqual(len(body["results"][1]["result"]["sheets"][0]["cells"]), 5)
+        self.assertIn("error", body["results"][3])
+        self.assertEqual((body["succeeded"], body["failed"]), (2, 2))
+
+    def test_zip_archive(self):
+        buf = BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr("docs/", b"")
+            zf.writestr("docs/a.pdf", make_pdf(pages=1, lines=1))
+            zf.writestr("docs/b.xlsx", make_xlsx(rows=3))
+            zf.writestr("__MACOSX/docs/._a.pdf", b"resource fork")
+            zf.writestr("docs/.DS_Store", b"")
+        files = [("files", ("docs.zip", buf.getvalue(), "application/zip"))]
+        body = self.client.post("/parse-batch", files=files).json()
+        self.assertEqual([r["filename"] for r in body["results"]], ["docs/a.pdf", "docs/b.xlsx"])
+        self.assertEqual(body["succeeded"], 2)
+
+    def test_invalid_zip_and_file_limit(self):
+        files = [("files", ("docs.zip", b"not a zip", "application/zip"))]
+        self.assertEqual(self.client.post("/parse-batch", files=files).status_code, 400)
+        app_module.BATCH_MAX_FILES = 1
+        files = [("files", ("a.pdf", b"x")), ("files", ("b.pdf", b"y"))]
+        self.assertEqual(self.client.post("/parse-batch", files=files).status_code, 400)
+
+
+class TestParseDetectsFormat(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_misnamed_files(self):
+        resp = self.client.post("/parse", files={"file": ("upload.bin", make_xlsx(rows=3))},
+                                params={"preview_rows": 2})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["x-document-format"], "xlsx")
+        self.assertEqual(len(resp.json()["sheets"][0]["cells"]), 2)
+        resp = self.client.post("/parse", files={"file": ("doc.xlsx", make_pdf(pages=3, lines=1))},
+                                params={"pages": "2"})
+        self.assertEqual(resp.headers["x-document-format"], "pdf")
+        self.assertEqual([p["page_number"] for p in resp.json()["pages"]], [2])
+
+    def test_unsupported(self):
+        buf = BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr("readme.txt", "hello")
+        for data in (b"plain text", buf.getvalue()):
+            resp = self.client.post("/parse", files={"file": ("a.pdf", data)})
+            self.assertEqual(resp.status_code, 400)
+        # 文件头正确但内容损坏
+        resp = self.client.post("/parse", files={"file": ("a.pdf", b"%PDF-1.4 broken")})
+        self.assertEqual(resp.status_code, 400)
+
+
+class TestAdmission(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.original = (app_module.admission, app_module.result_cache)
+        app_module.admission = AdmissionController({"pdf": 1}, queue_size=0)
+        app_module.result_cache = ResultCache()
+
+    def tearDown(self):
+        app_module.admission, app_module.result_cache = self.original
+
+    def test_rejects_when_full(self):
+        files = {"file": ("doc.pdf", make_pdf(pages=1, lines=1), "application/pdf")}
+        self.assertEqual(self.client.post("/parse-pdf", files=files).status_code, 200)
+        # 流式输出结束后归还额度
+        self.assertEqual(self.client.post("/parse-pdf-stream", files=files, params={"tables": "false"}).status_code, 200)
+        self.assertEqual(app_module.admission.stats()["formats"]["pdf"]["active"], 0)
+        cost = asyncio.run(app_module.admission.acquire("pdf", 0))
+        other = {"file": ("other.pdf", make_pdf(pages=2, lines=1), "application/pdf")}
+        for path in ("/parse-pdf", "/parse-pdf-stream", "/parse"):
+            resp = self.client.post(path, files=other)
+            self.assertEqual(resp.status_code, 429)
+            self.assertGreaterEqual(int(resp.headers["retry-after"]), 1)
+        # 缓存命中不需要准入；其他格式不受影响
+        self.assertEqual(self.client.post("/parse-pdf", files=files).status_code, 200)
+        xlsx = {"file": ("a.xlsx", make_xlsx(rows=2), "application/octet-stream")}
+        self.assertEqual(self.client.post("/parse-xlsx", files=xlsx).status_code, 200)
+        app_module.admission.release("pdf", cost)
+        self.assertEqual(self.client.post("/parse-pdf", files=other).status_code, 200)
+
+
+class TestDeadline(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.original = (app_module.admission, app_module.result_cache)
+        app_module.admission = AdmissionController({"pdf": 1})
+        app_module.result_cache = ResultCache()
+
+    def tearDown(self):
+        app_module.admission, app_module.result_cache = self.original
+
+    def test_admission_wait_bounded_by_deadline(self):
+        files = {"file": ("doc.pdf", make_pdf(pages=1, lines=1), "application/pdf")}
+        cost = asyncio.run(app_module.admission.acquire("pdf", 0))
+        for path in ("/parse-pdf", "/parse-pdf-stream"):
+            resp = self.client.post(path, files=files, headers={"X-Request-Timeout": "0.2"})
+            self.assertEqual(resp.status_code, 504)
+        self.assertEqual(app_module.admission.stats()["formats"]["pdf"]["waiting"], 0)
+        app_module.admission.release("pdf", cost)
+        resp = self.client.post("/parse-pdf", files=files, headers={"X-Request-Timeout": "30"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("partial", resp.json())
+
+    def test_invalid_timeout_header(self):
+        files = {"file": ("doc.pdf", make_pdf(pages=1, lines=1), "application/pdf")}
+        resp = self.client.post("/parse-pdf", files=files, headers={"X-Request-Timeout": "0"})
+        self.assertEqual(resp.status_code, 422)
+
+    def test_pool_terminates_overdue_task(self):
+        async def scenario():
+            pool = ParsePool("process", 2)
+            try:
+                # 与超时任务同时运行的任务在工作进程被终止后自动重试
+                other = asyncio.create_task(pool.run(time.sleep, 0.5))
+                started = time.monotonic()
+                with self.assertRaises(ParseTimeout):
+                    await pool.run_until(time.time() + 0.3, time.sleep, 30)
+                self.assertLess(time.monotonic() - started, 5)
+                await other
+                self.assertIsInstance(await pool.run(os.getpid), int)
+            finally:
+                pool.shutdown()
+
+        asyncio.run(scenario())
+
+    def test_queued_task_timeout_does_not_kill_running_task(self):
+        async def scenario():
+            pool = ParsePool("process", 1)
+            try:
+                pid = await pool.run(os.getpid)
+                running = asyncio.create_task(pool.run(_sleep_then_pid, 1))
+                await asyncio.sleep(0.2)
+                with self.assertRaises(ParseTimeout):
+                    await pool.run_until(time.time() + 0.3, os.getpid)
+                self.assertEqual(pool.waiting, 0)
+                # 超时的任务只在排队，正在执行的任务没有被终止重跑
+                self.assertEqual(await running, pid)
+            finally:
+                pool.shutdown()
+
+        asyncio.run(scenario())
+
+    def test_retry_bounded_by_original_deadline(self):
+        async def scenario():
+            pool = ParsePool("process", 2)
+            try:
+                other = asyncio.create_task(pool.run_until(time.time() + 1, time.sleep, 0.8))
+                await asyncio.sleep(0.1)
+                with self.assertRaises(ParseTimeout):
+                    await pool.run_until(time.time() + 0.4, time.sleep, 30)
+                # 被连带终止后重试，剩余时间不足以完成
+                with self.assertRaises(ParseTimeout):
+                    await other
+            finally:
+                pool.shutdown()
+
+        asyncio.run(scenario())
+
+    def test_terminated_worker_keeps_shared_progress(self):
+        # 在新的解释器中运行：执行池进程在主进程启动 resource_tracker 之前创建
+        script = textwrap.dedent("""
+            import asyncio, time
+            from parse_pool import ParsePool, ParseTimeout
+            from parser import SharedProgress
+
+            def report_then_sleep(progress, value, seconds):
+                progress(value, 2)
+                time.sleep(seconds)
+
+            async def scenario():
+                pool = ParsePool("process", 1)
+                pool.start()
+                progress = SharedProgress()
+                try:
+                    try:
+                        await pool.run_until(time.time() + 1, report_then_sleep, progress, 1, 30)
+                    except ParseTimeout:
+                        pass
+                    time.sleep(0.5)
+                    # 被终止的进程没有删除共享内存，重建的进程仍可挂载
+                    await pool.run(report_then_sleep, progress, 2, 0)
+                    print(*progress.value)
+                finally:
+                    progress.close()
+                    pool.shutdown()
+
+            asyncio.run(scenario())
+        """)
+        proc = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=60,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.strip(), "2 2")
+        self.assertNotIn("leaked shared_memory", proc.stderr)
+
+    def test_terminated_worker_kills_its_child_processes(self):
+        async def scenario(path):
+            pool = ParsePool("process", 1)
+            try:
+                with self.assertRaises(ParseTimeout):
+                    await pool.run_until(time.time() + 2, _sleep_with_child_pool, path, 30)
+            finally:
+                pool.shutdown()
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            asyncio.run(scenario(path))
+            with open(path) as f:
+                children = [int(pid) for pid in f.read().split()]
+            self.assertTrue(children)
+            for _ in range(50):
+                if not any(_process_alive(pid) for pid in children):
+                    break
+                time.sleep(0.1)
+            self.assertFalse(any(_process_alive(pid) for pid in children))
+        finally:
+            os.remove(path)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.original = app_module.result_cache
+        app_module.result_cache = ResultCache(memory_bytes=0)
+
+    def tearDown(self):
+        app_module.result_cache = self.original
+
+    def test_metrics_endpoint(self):
+        requests = metrics.REQUESTS.value(handler="/parse-xlsx", status="200")
+        parses = metrics.STAGE_SECONDS.count(stage="parse", format="xlsx")
+        rows = metrics.PARSED_ITEMS.value(format="xlsx", kind="row")
+        files = {"file": ("a.xlsx", make_xlsx(rows=5), "application/octet-stream")}
+        resp = self.client.post("/parse-xlsx", files=files)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(metrics.REQUESTS.value(handler="/parse-xlsx", status="200"), requests + 1)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage="parse", format="xlsx"), parses + 1)
+        self.assertEqual(metrics.PARSED_ITEMS.value(format="xlsx", kind="row"),
+                         rows + sum(len(sheet["cells"]) for sheet in resp.json()["sheets"]))
+        self.assertGreater(metrics.REQUEST_BYTES.value(handler="/parse-xlsx"), 0)
+
+        resp = self.client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        for stage in ("decode", "parse", "serialize"):
+            self.assertIn(f'docparse_stage_duration_seconds_count{{stage="{stage}",format="xlsx"}}', resp.text)
+        # 路径中的任意值不产生新的标签
+        self.client.get("/jobs/abc")
+        self.client.get("/no-such-path")
+        text = self.client.get("/metrics").text
+        self.assertIn('docparse_requests_total{handler="/jobs/{job_id}",status="404"}', text)
+        self.assertIn('docparse_requests_total{handler="unmatched",status="404"}', text)
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.original = app_module.result_cache
+        app_module.result_cache = ResultCache()
+
+    def tearDown(self):
+        app_module.result_cache = self.original
+
+    def test_profile_stages_and_pages(self):
+        files = {"file": ("a.pdf", make_pdf(pages=3, lines=1), "application/pdf")}
+        plain = self.client.post("/parse-pdf", files=files).json()
+        self.assertNotIn("profile", plain)
+        # 已缓存的文件在剖析时仍然实际解析
+        resp = self.client.post("/parse-pdf?profile=true", files=files)
+        self.assertEqual(resp.status_code, 200)
+        result = resp.json()
+        profile = result.pop("profile")
+        self.assertEqual(result, plain)
+        self.assertEqual([stage["name"] for stage in profile["stages"]],
+                         ["decode", "admission", "parse", "serialize"])
+        parse = profile["stages"][2]
+        self.assertEqual([stage["name"] for stage in parse["stages"]], ["open", "extract"])
+        self.assertEqual([(item["kind"], item["index"]) for item in profile["items"]],
+                         [("page", 1), ("page", 2), ("page", 3)])
+        for record in profile["stages"] + parse["stages"] + profile["items"]:
+            self.assertGreaterEqual(record["wall_ms"], 0)
+            self.assertGreaterEqual(record["cpu_ms"], 0)
+            self.assertGreaterEqual(record["peak_bytes"], 0)
+
+    def test_parse_records_detect_stage(self):
+        files = {"file": ("report", make_xlsx(rows=3), "application/octet-stream")}
+        profile = self.client.post("/parse?profile=true", files=files).json()["profile"]
+        self.assertEqual([stage["name"] for stage in profile["stages"]],
+                         ["decode", "detect", "admission", "parse", "serialize"])
+        self.assertEqual(profile["items"][0]["kind"], "sheet")
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.original = (app_module.result_cache, app_module.JOB_PROGRESS_INTERVAL)
+        app_module.result_cache = ResultCache()
+        app_module.JOB_PROGRESS_INTERVAL = 0.02
+
+    def tearDown(self):
+        app_module.result_cache, app_module.JOB_PROGRESS_INTERVAL = self.original
+
+    def wait(self, client, job_id):
+        for _ in range(300):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            time.sleep(0.05)
+        self.fail("任务未在限定时间内结束")
+
+    def test_pdf_job_matches_sync_result(self):
+        files = {"file": ("doc.pdf", make_pdf(pages=5, lines=2), "application/pdf")}
+        with TestClient(app) as client:
+            resp = client.post("/jobs", files=files, params={"tables": "false"})
+            self.assertEqual(resp.status_code, 202)
+            self.assertEqual(resp.headers["location"], f"/jobs/{resp.json()['job_id']}")
+            job = self.wait(client, resp.json()["job_id"])
+            self.assertEqual((job["status"], job["progress"]), ("succeeded", 1.0))
+            # 结果与同步接口相同，并已写入缓存
+            sync = client.post("/parse-pdf", files=files, params={"tables": "false"}).json()
+            self.assertEqual(job["result"], sync)
+            self.assertEqual(client.get("/cache/stats").json()["misses"], 1)
+
+    def test_pdf_job_reports_progress_while_parsing(self):
+        files = {"file": ("big.pdf", make_pdf(pages=40), "application/pdf")}
+        with TestClient(app) as client:
+            job_id = client.post("/jobs", files=files).json()["job_id"]
+            seen = set()
+            for _ in range(600):
+                job = client.get(f"/jobs/{job_id}").json()
+                if job["status"] in ("succeeded", "failed"):
+                    break
+                seen.add(job["progress"])
+                time.sleep(0.02)
+            self.assertEqual(job["status"], "succeeded")
+            self.assertTrue([p for p in seen if 0 < p < 1], seen)
+
+    def test_result_kept_without_cache(self):
+        app_module.result_cache = ResultCache(memory_bytes=0)
+        files = {"file": ("data.xlsx", make_xlsx(rows=3), "application/octet-stream")}
+        with TestClient(app) as client:
+            job_id = client.post("/jobs", files=files).json()["job_id"]
+            job = self.wait(client, job_id)
+        self.assertEqual(len(job["result"]["sheets"][0]["cells"]), 3)
+
+    def test_result_kept_after_cache_eviction(self):
+        files = {"file": ("data.xlsx", make_xlsx(rows=3), "application/octet-stream")}
+        with TestClient(app) as client:
+            job_id = client.post("/jobs", files=files).json()["job_id"]
+            self.wait(client, job_id)
+            # 结果已从缓存中淘汰（换成空缓存），任务过期前仍可查询
+            app_module.result_cache = ResultCache()
+            job = client.get(f"/jobs/{job_id}").json()
+        self.assertEqual(len(job["result"]["sheets"][0]["cells"]), 3)
+
+    def test_errors(self):
+        with TestClient(app) as client:
+            resp = client.post("/jobs", files={"file": ("a.txt", b"hello")})
+            self.assertEqual(resp.status_code, 400)
+            self.assertEqual(client.get("/jobs/missing").status_code, 404)
+            job_id = client.post("/jobs", files={"file": ("bad.pdf", b"not a pdf")}).json()["job_id"]
+            job = self.wait(client, job_id)
+            self.assertEqual((job["status"], job["status_code"]), ("failed", 400))
+            self.assertNotIn("result", job)
+
+
+class TestParseUrl(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalServer({"/doc.pdf": make_pdf(pages=2, lines=1)}).__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__(None, None, None)
+
+    def setUp(self):
+        self.original = app_module.downloader
+
+    def tearDown(self):
+        app_module.downloader = self.original
+
+    def post(self, path):
+        with TestClient(app) as client:
+            return client.post("/parse-url", params={"url": self.server.url + path})
+
+    def test_parse_downloaded_pdf(self):
+        resp = self.post("/doc.pdf")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["metadata"]["total_pages"], 2)
+
+    def test_download_too_large(self):
+        app_module.downloader = Downloader(max_size=100)
+        self.assertEqual(self.post("/doc.pdf").status_code, 413)
+
+    def test_download_timeout(self):
+        app_module.downloader = Downloader(read_timeout=0.2)
+        resp = self.post("/slow.pdf")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("超时", resp.json()["detail"])
+
+    def test_download_failed(self):
+        self.assertEqual(self.post("/missing.pdf").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
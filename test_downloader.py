@@ -0,0 +1,180 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from downloader import Downloader
+from spooling import PayloadTooLarge, SpooledBuffer
+
+PAYLOAD = bytes(range(256)) * 1024  # 256 KB
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    本地测试服务器，按路径（忽略扩展名）返回测试数据：
+    /fixed 带 Content-Length，/chunked 分块传输，/slow 发送前停顿，/missing 返回 404
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        name = self.path.rsplit(".", 1)[0]
+        if name == "/missing":
+            self.send_error(404)
+            return
+        if name == "/slow":
+            time.sleep(1)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        if name == "/chunked":
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(PAYLOAD), 32 * 1024):
+                chunk = PAYLOAD[i:i + 32 * 1024]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(PAYLOAD)))
+            self.end_headers()
+            self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # 客户端因超出大小上限提前断开连接属于预期行为
+
+
+class LocalServer:
+    """在后台线程中运行的本地 HTTP 服务器，files 为 {路径: 内容}，其余路径使用测试数据"""
+
+    def __init__(self, files=None):
+        files = files or {}
+
+        class Handler(_Handler):
+            def do_GET(self):
+                if self.path in files:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(files[self.path])))
+                    self.end_headers()
+                    self.wfile.write(files[self.path])
+                else:
+                    super().do_GET()
+
+        self.server = _Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestSpooledBuffer(unittest.TestCase):
+    def test_small_content_stays_in_memory(self):
+        with SpooledBuffer(max_memory=10) as body:
+            body.write(b"12345")
+            self.assertFalse(body.spilled)
+            self.assertEqual(body.getvalue(), b"12345")
+
+    def test_spills_to_disk_and_cleans_up(self):
+        body = SpooledBuffer(max_memory=4)
+        body.write(b"123")
+        body.write(b"456")
+        self.assertTrue(body.spilled)
+        self.assertEqual(body.getvalue(), b"123456")
+        path = body.path
+        self.assertTrue(os.path.exists(path))
+        body.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_source_is_bytes_or_path(self):
+        with SpooledBuffer(max_memory=4) as body:
+            body.write(b"123")
+            self.assertEqual(body.source(), b"123")
+            body.write(b"456")
+            with open(body.source(), "rb") as f:
+                self.assertEqual(f.read(), b"123456")
+
+    def test_max_size(self):
+        with SpooledBuffer(max_memory=4, max_size=5) as body:
+            body.write(b"12345")
+            with self.assertRaises(PayloadTooLarge):
+                body.write(b"6")
+
+
+class TestDownloader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalServer().__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__(None, None, None)
+
+    def fetch(self, path, **options):
+        async def run():
+            downloader = Downloader(**options)
+            try:
+                return await downloader.fetch(self.server.url + path)
+            finally:
+                await downloader.aclose()
+
+        return asyncio.run(run())
+
+    def test_fetch_in_memory_and_spilled(self):
+        with self.fetch("/fixed") as body:
+            self.assertFalse(body.spilled)
+            self.assertEqual(body.getvalue(), PAYLOAD)
+        with self.fetch("/chunked", max_memory=64 * 1024) as body:
+            self.assertTrue(body.spilled)
+            self.assertEqual(body.getvalue(), PAYLOAD)
+
+    def test_content_length_over_limit(self):
+        with self.assertRaises(PayloadTooLarge):
+            self.fetch("/fixed", max_size=1024)
+
+    def test_streamed_body_over_limit(self):
+        with self.assertRaises(PayloadTooLarge):
+            self.fetch("/chunked", max_size=100 * 1024, max_memory=16 * 1024)
+
+    def test_read_timeout(self):
+        with self.assertRaises(httpx.ReadTimeout):
+            self.fetch("/slow", read_timeout=0.2)
+
+    def test_http_error(self):
+        with self.assertRaises(httpx.HTTPStatusError):
+            self.fetch("/missing")
+
+    def test_connection_pool_reused(self):
+        async def run():
+            downloader = Downloader(max_connections=2)
+            try:
+                bodies = await asyncio.gather(*(downloader.fetch(self.server.url + "/fixed")
+                                                for _ in range(6)))
+                client = downloader.client
+                for body in bodies:
+                    self.assertEqual(body.size, len(PAYLOAD))
+                    body.close()
+                (await downloader.fetch(self.server.url + "/fixed")).close()
+                self.assertIs(downloader.client, client)
+            finally:
+                await downloader.aclose()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import jobs
+from jobs import Job, JobManager, JobQueueFull
+
+
+class _Body:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestJobManager(unittest.TestCase):
+    def test_runs_jobs_and_maps_errors(self):
+        async def runner(job):
+            if job.filename == "bad":
+                raise ValueError("无效文件")
+            if job.filename == "crash":
+                raise RuntimeError("boom")
+            job.result = {"ok": job.filename}
+
+        async def scenario():
+            manager = JobManager(runner, workers=2)
+            submitted = [manager.submit(Job(name, None, {}, _Body())) for name in ("good", "bad", "crash")]
+            self.assertEqual([job.status for job in submitted], ["queued"] * 3)
+            await manager._queue.join()
+            await manager.stop()
+            return submitted
+
+        good, bad, crash = asyncio.run(scenario())
+        self.assertEqual((good.status, good.progress, good.result), ("succeeded", 1.0, {"ok": "good"}))
+        self.assertEqual(bad.to_dict()["status_code"], 400)
+        self.assertEqual(bad.error, "无效文件")
+        self.assertEqual((crash.status, crash.status_code), ("failed", 500))
+        # 任务结束后释放暂存的文件
+        self.assertTrue(all(job.body is None for job in (good, bad, crash)))
+
+    def test_queue_full(self):
+        async def runner(job):
+            await asyncio.sleep(10)
+
+        async def scenario():
+            manager = JobManager(runner, workers=1, max_queued=1)
+            manager.submit(Job("a", None, {}))
+            await asyncio.sleep(0)  # 第一个任务开始执行，离开队列
+            manager.submit(Job("b", None, {}))
+            body = _Body()
+            with self.assertRaises(JobQueueFull):
+                manager.submit(Job("c", None, {}, body))
+            queued = Job("d", None, {}, _Body())
+            manager._jobs[queued.id] = queued
+            await manager.stop()
+            # 停止时释放尚未执行的任务的文件
+            self.assertIsNone(queued.body)
+
+        asyncio.run(scenario())
+
+    def test_expires_after_ttl(self):
+        async def runner(job):
+            pass
+
+        async def scenario():
+            manager = JobManager(runner, ttl=60)
+            job = manager.submit(Job("a", None, {}))
+            await manager._queue.join()
+            self.assertIs(manager.get(job.id), job)
+            with mock.patch.object(jobs.time, "time", return_value=job.finished_at + 61):
+                self.assertIsNone(manager.get(job.id))
+            await manager.stop()
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,21 @@
 import base64
 import unittest
 import json
-from mcp_server import parse_pptx_handler
+import mcp_server
+from benchmark import make_pdf
+from mcp_server import parse_pptx_handler, parse_pdf_handler, cache_stats_handler, metrics_handler
+from result_cache import ResultCache
 
 MOCK_PPTX_BYTES = b"FakePPTXContent"
 MOCK_PPTX_B64 = base64.b64encode(MOCK_PPTX_BYTES).decode()
 
 class TestMCPServer(unittest.TestCase):
+    def setUp(self):
+        self.original = mcp_server.result_cache
+
+    def tearDown(self):
+        mcp_server.result_cache = self.original
+
     def test_parse_pptx_handler_with_b64(self):
         resp = parse_pptx_handler(file_bytes_b64=MOCK_PPTX_B64)
         # 应该返回错误信息，因为不是有效的 PPTX 文件
@@ -21,5 +30,37 @@ class TestMCPServer(unittest.TestCase):
         resp = parse_pptx_handler()
         self.assertIn("Error", resp)
 
+    def test_parse_pdf_handler_uses_result_cache(self):
+        mcp_server.result_cache = ResultCache()
+        b64 = base64.b64encode(make_pdf(pages=2, lines=1)).decode()
+        first = parse_pdf_handler(file_bytes_b64=b64, tables=False)
+        second = parse_pdf_handler(file_bytes_b64=b64, tables=False)
+        self.assertEqual(json.loads(first), json.loads(second))
+        stats = json.loads(cache_stats_handler())
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_parse_pdf_handler_timeout(self):
+        b64 = base64.b64encode(make_pdf(pages=2, lines=1)).decode()
+        self.assertIn("Error", parse_pdf_handler(file_bytes_b64=b64, timeout=0))
+        result = json.loads(parse_pdf_handler(file_bytes_b64=b64, timeout=30))
+        self.assertEqual(len(result["pages"]), 2)
+        self.assertNotIn("partial", result)
+
+    def test_parse_pdf_handler_profile(self):
+        b64 = base64.b64encode(make_pdf(pages=2, lines=1)).decode()
+        result = json.loads(parse_pdf_handler(file_bytes_b64=b64, profile=True))
+        profile = result.pop("profile")
+        self.assertEqual(result, json.loads(parse_pdf_handler(file_bytes_b64=b64)))
+        self.assertEqual([stage["name"] for stage in profile["stages"]], ["decode", "parse", "serialize"])
+        self.assertEqual([stage["name"] for stage in profile["stages"][1]["stages"]], ["open", "extract"])
+        self.assertEqual([item["index"] for item in profile["items"]], [1, 2])
+        self.assertGreaterEqual(profile["stages"][1]["peak_bytes"], profile["stages"][1]["stages"][1]["peak_bytes"])
+
+    def test_metrics_handler(self):
+        parse_pptx_handler()
+        text = metrics_handler()
+        self.assertIn("# TYPE docparse_stage_duration_seconds histogram", text)
+        self.assertIn('docparse_requests_total{handler="parse_pptx_handler",status="error"}', text)
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
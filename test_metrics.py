@@ -0,0 +1,42 @@
+import unittest
+
+from metrics import Registry, count_items, PARSED_ITEMS
+
+
+class TestRegistry(unittest.TestCase):
+    def test_counter_render(self):
+        registry = Registry()
+        counter = registry.counter("requests_total", "请求数", ("handler", "status"))
+        counter.inc(handler="/parse", status="200")
+        counter.inc(2, handler='a"b\\c\n', status="500")
+        self.assertEqual(counter.value(handler="/parse", status="200"), 1)
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:2], ["# HELP requests_total 请求数", "# TYPE requests_total counter"])
+        self.assertIn('requests_total{handler="/parse",status="200"} 1', lines)
+        self.assertIn('requests_total{handler="a\\"b\\\\c\\n",status="500"} 2', lines)
+        with self.assertRaises(ValueError):
+            counter.inc(handler="/parse")
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram("stage_seconds", "耗时", ("stage",), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, stage="parse")
+        self.assertEqual(histogram.count(stage="parse"), 4)
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[2:], [
+            'stage_seconds_bucket{stage="parse",le="0.1"} 2',
+            'stage_seconds_bucket{stage="parse",le="1"} 3',
+            'stage_seconds_bucket{stage="parse",le="+Inf"} 4',
+            'stage_seconds_sum{stage="parse"} 3.65',
+            'stage_seconds_count{stage="parse"} 4',
+        ])
+
+    def test_count_items(self):
+        before = PARSED_ITEMS.value(format="xlsx", kind="row")
+        count_items("xlsx", {"sheets": [{"cells": [[], []]}, {"cells": [[]]}]})
+        self.assertEqual(PARSED_ITEMS.value(format="xlsx", kind="row"), before + 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,405 @@
+import os
+import tempfile
+import time
+import tracemalloc
+import unittest
+import zipfile
+from io import BytesIO
+
+from docx import Document
+from pptx import Presentation
+
+from benchmark import import_time, make_pdf, make_xlsx
+from parser import (detect_format, iter_parse_pdf, parse_docx, parse_pptx, parse_pdf, parse_xlsx,
+                    select_pdf_pages, sniff_format, SharedProgress)
+
+
+class TestParseXlsx(unittest.TestCase):
+    def test_full_parse(self):
+        result = parse_xlsx(make_xlsx(rows=10))
+        sheet = result["sheets"][0]
+        self.assertEqual(sheet["title"], "Data")
+        self.assertEqual(len(sheet["cells"]), 10)
+        self.assertEqual(len(sheet["formulas"]), 9)
+
+    def test_preview_stops_after_n_rows(self):
+        result = parse_xlsx(make_xlsx(rows=500), preview_rows=20)
+        sheet = result["sheets"][0]
+        self.assertEqual(sheet["dimension"], "A1:C500")
+        self.assertEqual(sheet["max_row"], 500)
+        self.assertEqual(sheet["max_column"], 3)
+        self.assertEqual(len(sheet["cells"]), 20)
+        self.assertEqual(sheet["cells"][0][0], {"value": "name", "coordinate": "A1"})
+        self.assertEqual(sheet["cells"][19][2]["coordinate"], "C20")
+        self.assertEqual(len(sheet["formulas"]), 19)
+
+    def test_preview_zero_rows_returns_dimensions_only(self):
+        result = parse_xlsx(make_xlsx(rows=50), preview_rows=0)
+        sheet = result["sheets"][0]
+        self.assertEqual(sheet["max_row"], 50)
+        self.assertEqual(sheet["cells"], [])
+
+    def test_repeated_strings_share_one_object(self):
+        result = parse_xlsx(make_xlsx(rows=10))
+        cells = result["sheets"][0]["cells"]
+        self.assertIs(cells[2][1]["value"], cells[4][1]["value"])
+        self.assertNotIn("strings", result)
+
+    def test_string_table_output(self):
+        result = parse_xlsx(make_xlsx(rows=10), string_table=True)
+        self.assertEqual(result["strings"][:4], ["name", "status", "total", "item2"])
+        cells = result["sheets"][0]["cells"]
+        status = [result["strings"][row[1]["string_index"]] for row in cells[1:]]
+        self.assertEqual(set(status), {"open", "closed"})
+        self.assertEqual(result["strings"].count("open"), 1)
+        # 公式单元格保持原格式
+        self.assertEqual(cells[1][2], {"value": "=LEN(A2)", "coordinate": "C2", "formula": "=LEN(A2)"})
+
+    def test_string_table_in_preview(self):
+        result = parse_xlsx(make_xlsx(rows=100), preview_rows=5, string_table=True)
+        self.assertEqual(len(result["sheets"][0]["cells"]), 5)
+        self.assertIn("open", result["strings"])
+
+
+def _pdf_with_indirect_title() -> bytes:
+    """文档信息字典中 /Title 为间接引用的单页 PDF"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << >> >>",
+        b"<< /Title 5 0 R /Author (ppt-mcp) >>",
+        b"(Indirect title)",
+    ]
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+class TestParsePdf(unittest.TestCase):
+    def test_metadata_and_pages(self):
+        result = parse_pdf(make_pdf(pages=3, lines=2))
+        self.assertEqual(result["metadata"], {
+            "total_pages": 3,
+            "title": "Benchmark",
+            "author": "ppt-mcp",
+            "subject": "",
+            "creator": ""
+        })
+        self.assertEqual([p["page_number"] for p in result["pages"]], [1, 2, 3])
+        self.assertIn("Page 2 line 1", result["pages"][1]["text"])
+
+    def test_page_selection(self):
+        result = parse_pdf(make_pdf(pages=12, lines=1), pages="2-3, 10")
+        self.assertEqual([p["page_number"] for p in result["pages"]], [2, 3, 10])
+        self.assertIn("Page 10 line 1", result["pages"][2]["text"])
+        self.assertEqual(result["metadata"]["total_pages"], 12)
+
+    def test_select_pdf_pages(self):
+        data = make_pdf(pages=12, lines=1)
+        self.assertEqual(select_pdf_pages(data), list(range(1, 13)))
+        self.assertEqual(select_pdf_pages(data, "10, 2-3"), [2, 3, 10])
+        for source, spec in ((data, "13"), (b"not a pdf", None)):
+            with self.assertRaises(ValueError):
+                select_pdf_pages(source, spec)
+
+    def test_invalid_page_selection(self):
+        data = make_pdf(pages=3, lines=1)
+        for spec in ("", "a-b", "3-1", "0", "2-4"):
+            with self.assertRaises(ValueError):
+                parse_pdf(data, pages=spec)
+
+    def test_feature_toggles(self):
+        data = make_pdf(pages=2, lines=2)
+        result = parse_pdf(data, tables=False, images=False)
+        self.assertIn("Page 1 line 1", result["pages"][0]["text"])
+        self.assertEqual(result["pages"][0]["tables"], [])
+        result = parse_pdf(data, text=False)
+        self.assertEqual(result["pages"][0]["text"], "")
+        self.assertEqual(result["metadata"]["total_pages"], 2)
+
+    def test_parallel_matches_serial(self):
+        data = make_pdf(pages=7, lines=2)
+        serial = parse_pdf(data)
+        parallel = parse_pdf(data, workers=3)
+        self.assertEqual(parallel, serial)
+        selected = parse_pdf(data, pages="2,4-6", workers=2)
+        self.assertEqual([p["page_number"] for p in selected["pages"]], [2, 4, 5, 6])
+
+    def test_peak_memory_flat_in_page_count(self):
+        def peak(pages):
+            data = make_pdf(pages=pages, lines=5)
+            tracemalloc.start()
+            try:
+                parse_pdf(data)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        parse_pdf(make_pdf(pages=1, lines=5))  # 预热模块级缓存
+        per_page = (peak(80) - peak(10)) / 70
+        # 逐页释放布局缓存后，每多一页峰值内存只增加结果本身的几 KB（未释放时约 370 KB）
+        self.assertLess(per_page, 40 * 1024)
+
+    def test_fast_mode(self):
+        data = make_pdf(pages=5, lines=2)
+        result = parse_pdf(data, mode="fast", pages="2-3")
+        self.assertEqual(result["metadata"]["total_pages"], 5)
+        self.assertEqual(result["metadata"]["title"], "Benchmark")
+        self.assertEqual([p["page_number"] for p in result["pages"]], [2, 3])
+        self.assertIn("Page 2 line 1", result["pages"][0]["text"])
+        self.assertEqual(result["pages"][0]["tables"], [])
+        with self.assertRaises(ValueError):
+            parse_pdf(data, mode="ocr")
+
+    def test_scanned_pages_skip_text_and_tables(self):
+        result = parse_pdf(make_pdf(pages=2, lines=0, image=True))
+        page = result["pages"][0]
+        self.assertTrue(page["scanned"])
+        self.assertEqual(page["text"], "")
+        self.assertEqual(page["images"][0]["bbox"], [0.0, 0.0, 612.0, 792.0])
+
+    def test_text_over_image_is_not_scanned(self):
+        result = parse_pdf(make_pdf(pages=1, lines=2, image=True))
+        page = result["pages"][0]
+        self.assertFalse(page["scanned"])
+        self.assertIn("Page 1 line 1", page["text"])
+        self.assertEqual(len(page["images"]), 1)
+
+    def test_image_table_lists_shared_xobject_once(self):
+        data = make_pdf(pages=4, lines=1, image=True)
+        for workers in (1, 2):
+            result = parse_pdf(data, workers=workers)
+            object_ids = {p["images"][0]["object_id"] for p in result["pages"]}
+            self.assertEqual(len(object_ids), 1)
+            self.assertEqual(result["images"], [
+                {"object_id": object_ids.pop(), "width": 16, "height": 16, "filter": ["FlateDecode"]}
+            ])
+
+    def test_outline_mode(self):
+        result = parse_pdf(make_pdf(pages=3, lines=1, outline=True), mode="outline")
+        self.assertEqual(result["pages"], [])
+        self.assertEqual(result["metadata"]["total_pages"], 3)
+        self.assertEqual(result["outline"], [
+            {"title": "Page 1", "level": 1, "page_number": 1},
+            {"title": "Section 1.1", "level": 2, "page_number": 1},
+            {"title": "Page 2", "level": 1, "page_number": 2},
+            {"title": "Page 3", "level": 1, "page_number": 3},
+        ])
+        self.assertEqual(result["page_labels"], ["i", "1", "2"])
+
+    def test_outline_mode_without_outline(self):
+        result = parse_pdf(make_pdf(pages=2, lines=1), mode="outline")
+        self.assertEqual(result["outline"], [])
+        self.assertEqual(result["page_labels"], [])
+
+    def test_parallel_empty_document(self):
+        result = parse_pdf(make_pdf(pages=0), workers=2)
+        self.assertEqual((result["pages"], result["metadata"]["total_pages"]), ([], 0))
+
+    def test_fast_mode_indirect_metadata(self):
+        for mode in ("fast", "layout"):
+            metadata = parse_pdf(_pdf_with_indirect_title(), mode=mode)["metadata"]
+            self.assertEqual((metadata["title"], metadata["author"]), ("Indirect title", "ppt-mcp"), mode)
+            self.assertIs(type(metadata["title"]), str)
+
+    def test_invalid_pdf(self):
+        with self.assertRaises(ValueError):
+            parse_pdf(b"not a pdf")
+
+    def test_progress_reported_from_other_process(self):
+        from concurrent.futures import ProcessPoolExecutor
+        calls = []
+        parse_pdf(make_pdf(pages=3, lines=1), tables=False, progress=lambda *args: calls.append(args))
+        self.assertEqual(calls, [(0, 3), (1, 3), (2, 3), (3, 3)])
+        progress = SharedProgress()
+        try:
+            with ProcessPoolExecutor(1) as executor:
+                executor.submit(parse_pdf, make_pdf(pages=4, lines=1), "2-3", progress=progress).result()
+            self.assertEqual(progress.value, (2, 2))
+        finally:
+            progress.close()
+
+
+class TestDetectFormat(unittest.TestCase):
+    def test_office_documents(self):
+        for factory, expected in ((Presentation, "pptx"), (Document, "docx")):
+            buf = BytesIO()
+            factory().save(buf)
+            self.assertEqual(detect_format(buf.getvalue()), expected)
+        self.assertEqual(detect_format(make_xlsx(rows=3)), "xlsx")
+        self.assertEqual(detect_format(make_pdf(pages=1, lines=1)), "pdf")
+
+    def test_unsupported(self):
+        buf = BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr("readme.txt", "not an office document")
+        for data in (b"hello", b"", b"PK\x03\x04truncated", buf.getvalue()):
+            self.assertIsNone(detect_format(data))
+        self.assertEqual(sniff_format(b"PK\x03\x04"), "zip")
+        self.assertIsNone(sniff_format(b"\xd0\xcf\x11\xe0"))  # 旧版 Office（OLE）格式
+
+    def test_path_source(self):
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(make_xlsx(rows=3))
+            self.assertEqual(detect_format(path), "xlsx")
+        finally:
+            os.remove(path)
+
+
+class TestDeadline(unittest.TestCase):
+    def test_expired_deadline_returns_partial_result(self):
+        expired = time.time() - 1
+        pdf = make_pdf(pages=3, lines=1)
+        for mode in ("layout", "fast"):
+            result = parse_pdf(pdf, mode=mode, deadline=expired)
+            self.assertTrue(result["partial"])
+            self.assertEqual(result["pages"], [])
+            self.assertEqual(result["metadata"]["total_pages"], 3)
+        self.assertEqual(parse_pdf(pdf, workers=2, deadline=expired)["pages"], [])
+        events = [kind for kind, _ in iter_parse_pdf(pdf, deadline=expired)]
+        self.assertEqual(events, ["metadata", "partial", "images"])
+
+        xlsx = make_xlsx(rows=10)
+        for options in ({}, {"preview_rows": 5}):
+            result = parse_xlsx(xlsx, deadline=expired, **options)
+            self.assertTrue(result["partial"])
+            self.assertEqual(result["sheets"][0]["cells"], [])
+
+        presentation = Presentation()
+        presentation.slides.add_slide(presentation.slide_layouts[6])
+        buf = BytesIO()
+        presentation.save(buf)
+        result = parse_pptx(buf.getvalue(), deadline=expired)
+        self.assertEqual((result["slides"], result["partial"]), ([], True))
+
+        document = Document()
+        document.add_paragraph("段落")
+        buf = BytesIO()
+        document.save(buf)
+        result = parse_docx(buf.getvalue(), deadline=expired)
+        self.assertEqual((result["paragraphs"], result["partial"]), ([], True))
+
+    def test_future_deadline_returns_complete_result(self):
+        later = time.time() + 60
+        pdf = make_pdf(pages=2, lines=1)
+        self.assertEqual(parse_pdf(pdf, deadline=later), parse_pdf(pdf))
+        xlsx = make_xlsx(rows=5)
+        self.assertEqual(parse_xlsx(xlsx, deadline=later), parse_xlsx(xlsx))
+
+
+class TestProfile(unittest.TestCase):
+    def assertMeasured(self, records):
+        for record in records:
+            self.assertGreaterEqual(record["wall_ms"], 0)
+            self.assertGreaterEqual(record["cpu_ms"], 0)
+            self.assertGreaterEqual(record["peak_bytes"], 0)
+
+    def test_pdf_stages_and_pages(self):
+        pdf = make_pdf(pages=3, lines=2)
+        for mode in ("layout", "fast"):
+            result = parse_pdf(pdf, mode=mode, profile=True)
+            profile = result.pop("profile")
+            self.assertEqual(result, parse_pdf(pdf, mode=mode))
+            self.assertEqual([stage["name"] for stage in profile["stages"]], ["open", "extract"])
+            self.assertEqual([(item["kind"], item["index"]) for item in profile["items"]],
+                             [("page", 1), ("page", 2), ("page", 3)])
+            self.assertMeasured(profile["stages"] + profile["items"])
+        # 多进程模式只记录阶段
+        profile = parse_pdf(pdf, workers=2, profile=True)["profile"]
+        self.assertEqual(([stage["name"] for stage in profile["stages"]], profile["items"]),
+                         (["open", "extract"], []))
+        self.assertNotIn("profile", parse_pdf(pdf))
+
+    def test_office_items(self):
+        presentation = Presentation()
+        for _ in range(2):
+            presentation.slides.add_slide(presentation.slide_layouts[6])
+        buf = BytesIO()
+        presentation.save(buf)
+        profile = parse_pptx(buf.getvalue(), profile=True)["profile"]
+        self.assertEqual([stage["name"] for stage in profile["stages"]], ["open", "extract"])
+        self.assertEqual([(item["kind"], item["index"]) for item in profile["items"]], [("slide", 1), ("slide", 2)])
+
+        document = Document()
+        document.add_paragraph("段落")
+        document.add_table(rows=2, cols=2)
+        buf = BytesIO()
+        document.save(buf)
+        profile = parse_docx(buf.getvalue(), profile=True)["profile"]
+        self.assertEqual([stage["name"] for stage in profile["stages"]], ["open", "paragraphs", "tables", "images"])
+        self.assertEqual([(item["kind"], item["index"]) for item in profile["items"]], [("table", 1)])
+
+        xlsx = make_xlsx(rows=5)
+        for options in ({}, {"preview_rows": 2}):
+            result = parse_xlsx(xlsx, profile=True, **options)
+            profile = result.pop("profile")
+            self.assertEqual(result, parse_xlsx(xlsx, **options))
+            self.assertEqual([(item["kind"], item["index"]) for item in profile["items"]],
+                             [("sheet", index) for index in range(1, len(result["sheets"]) + 1)])
+            self.assertEqual(profile["items"][0]["title"], result["sheets"][0]["title"])
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class TestImportTime(unittest.TestCase):
+    # 解析依赖在首次解析对应格式时才导入，启动时不应加载
+    PARSER_DEPENDENCIES = {"pptx", "docx", "openpyxl", "PyPDF2", "pdfplumber", "pdfminer", "PIL"}
+    # 新进程中 import parser 的耗时上限（秒）：延迟导入后约 40 ms，启动时导入全部依赖约 550 ms
+    PARSER_IMPORT_BUDGET = 0.2
+
+    def test_entry_points_do_not_import_parser_dependencies(self):
+        for module in ("parser", "mcp_server", "app"):
+            _, modules = import_time(module)
+            loaded = {name.split(".")[0] for name in modules} & self.PARSER_DEPENDENCIES
+            self.assertEqual(loaded, set(), module)
+
+    def test_parser_import_within_budget(self):
+        seconds = min(import_time("parser")[0] for _ in range(3))
+        self.assertLess(seconds, self.PARSER_IMPORT_BUDGET)
+
+
+class TestDocumentSources(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+        return self.path
+
+    def test_pdf_from_path_and_file_object(self):
+        data = make_pdf(pages=4, lines=2)
+        expected = parse_pdf(data)
+        path = self.write(data)
+        self.assertEqual(parse_pdf(path), expected)
+        # 多进程模式下各进程直接打开同一个文件
+        self.assertEqual(parse_pdf(path, workers=2), expected)
+        self.assertEqual(parse_pdf(BytesIO(data), workers=2), expected)
+        self.assertEqual(parse_pdf(path, mode="fast")["metadata"]["total_pages"], 4)
+        self.assertEqual(parse_pdf(path, mode="outline")["metadata"]["total_pages"], 4)
+
+    def test_xlsx_from_path_and_file_object(self):
+        data = make_xlsx(rows=10)
+        expected = parse_xlsx(data)
+        self.assertEqual(parse_xlsx(self.write(data)), expected)
+        with open(self.path, "rb") as f:
+            self.assertEqual(parse_xlsx(f, preview_rows=3)["sheets"][0]["cells"], expected["sheets"][0]["cells"][:3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import tracemalloc
+import unittest
+
+from profiling import NULL_PROFILER, Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_nested_stage_peak_counts_toward_outer_stage(self):
+        with Profiler() as profiler:
+            with profiler.stage("outer") as outer:
+                with profiler.stage("inner"):
+                    data = bytearray(4 * 1024 * 1024)
+                    del data
+            with profiler.item("page", 1, width=10) as item:
+                pass
+        inner = profiler.stages[1]
+        self.assertEqual([stage["name"] for stage in profiler.stages], ["outer", "inner"])
+        self.assertGreaterEqual(inner["peak_bytes"], 4 * 1024 * 1024)
+        self.assertGreaterEqual(outer["peak_bytes"], inner["peak_bytes"])
+        self.assertLess(item["peak_bytes"], 1024 * 1024)
+        self.assertEqual(profiler.to_dict()["items"], [item])
+        self.assertEqual((item["kind"], item["index"], item["width"]), ("page", 1, 10))
+        self.assertGreaterEqual(outer["wall_ms"], inner["wall_ms"])
+
+    def test_tracing_stops_after_last_profiler(self):
+        with Profiler():
+            with Profiler() as inner:
+                with inner.stage("parse"):
+                    pass
+            self.assertTrue(tracemalloc.is_tracing())
+        self.assertFalse(tracemalloc.is_tracing())
+        # 未开启 tracemalloc 时只记录时间
+        profiler = Profiler()
+        with profiler.stage("parse") as record:
+            pass
+        self.assertIsNone(record["peak_bytes"])
+        self.assertGreaterEqual(record["wall_ms"], 0)
+
+    def test_null_profiler_records_nothing(self):
+        with NULL_PROFILER:
+            with NULL_PROFILER.stage("parse") as record:
+                record["stages"] = []
+            with NULL_PROFILER.item("page", 1):
+                pass
+        self.assertFalse(NULL_PROFILER.enabled)
+        self.assertIsNone(NULL_PROFILER.to_dict())
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import gzip
+import unittest
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from responses import CompressionMiddleware, JSONSerializer, SerializedJSONResponse, negotiate_encoding
+
+SAMPLE = {"sheets": [{"title": "数据", "cells": [[{"value": 1.5, "coordinate": "A1"}, {"value": None}]]}],
+          "strings": ["开放", "关闭"], "count": 3, "ok": True}
+
+
+class TestJSONSerializer(unittest.TestCase):
+    def test_matches_starlette_output(self):
+        expected = JSONResponse(SAMPLE).body
+        for kind in ("json", "orjson"):
+            self.assertEqual(JSONSerializer(kind).dumps(SAMPLE), expected)
+
+    def test_orjson_falls_back_for_unsupported_values(self):
+        self.assertEqual(JSONSerializer("orjson").dumps({"n": 2 ** 70}), b'{"n":1180591620717411303424}')
+
+    def test_unknown_serializer(self):
+        with self.assertRaises(ValueError):
+            JSONSerializer("yaml")
+
+
+class TestNegotiateEncoding(unittest.TestCase):
+    def test_negotiation(self):
+        encodings = ["br", "gzip"]
+        self.assertEqual(negotiate_encoding("gzip, deflate, br", encodings), "br")
+        self.assertEqual(negotiate_encoding("gzip", encodings), "gzip")
+        self.assertEqual(negotiate_encoding("br;q=0.5, gzip", encodings), "gzip")
+        self.assertEqual(negotiate_encoding("br;q=0, *", encodings), "gzip")
+        self.assertIsNone(negotiate_encoding("gzip;q=0", encodings))
+        self.assertIsNone(negotiate_encoding("", encodings))
+        self.assertIsNone(negotiate_encoding("deflate", encodings))
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+
+        @app.get("/large")
+        async def large():
+            return SerializedJSONResponse({"rows": ["value"] * 1000})
+
+        @app.get("/small")
+        async def small():
+            return PlainTextResponse("ok")
+
+        @app.get("/stream")
+        async def stream():
+            return StreamingResponse((f"line {i}\n" * 50 for i in range(5)), media_type="text/plain")
+
+        app.add_middleware(CompressionMiddleware, encodings=["br", "gzip"], minimum_size=100)
+        self.client = TestClient(app)
+
+    def get(self, path, accept_encoding):
+        return self.client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    def test_gzip_whole_body(self):
+        resp = self.get("/large", "gzip")
+        self.assertEqual(resp.headers["content-encoding"], "gzip")
+        self.assertIn("Accept-Encoding", resp.headers["vary"])
+        self.assertLess(int(resp.headers["content-length"]), 200)
+        self.assertEqual(resp.json(), {"rows": ["value"] * 1000})
+
+    def test_uncompressed(self):
+        self.assertNotIn("content-encoding", self.get("/small", "gzip").headers)
+        resp = self.get("/large", "identity")
+        self.assertNotIn("content-encoding", resp.headers)
+        self.assertEqual(len(resp.json()["rows"]), 1000)
+
+    def test_streaming_chunks_flushed(self):
+        with self.client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as resp:
+            self.assertEqual(resp.headers["content-encoding"], "gzip")
+            self.assertNotIn("content-length", resp.headers)
+            raw = b"".join(resp.iter_raw())
+        self.assertEqual(gzip.decompress(raw).decode(), "".join(f"line {i}\n" * 50 for i in range(5)))
+        # 每块都以同步刷新结束，客户端不必等到流结束就能解压已收到的内容
+        first_line = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(raw[:len(raw) // 2])
+        self.assertTrue(first_line.startswith(b"line 0\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
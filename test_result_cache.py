@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import result_cache
+from benchmark import make_pdf
+from parser import parse_pdf, parse_pptx, parse_xlsx
+from result_cache import ResultCache
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_key_components(self):
+        key = ResultCache.key(b"abc", parse_pdf, {"pages": "1", "mode": "fast"})
+        self.assertEqual(key, ResultCache.key(b"abc", parse_pdf, {"mode": "fast", "pages": "1"}))
+        self.assertNotEqual(key, ResultCache.key(b"abd", parse_pdf, {"pages": "1", "mode": "fast"}))
+        self.assertNotEqual(ResultCache.key(b"abc", parse_pdf), ResultCache.key(b"abc", parse_pptx))
+        self.assertNotEqual(key, ResultCache.key(b"abc", parse_pdf, {"pages": "2", "mode": "fast"}))
+        with mock.patch.object(result_cache, "PARSER_VERSION", "changed"):
+            self.assertNotEqual(key, ResultCache.key(b"abc", parse_pdf, {"pages": "1", "mode": "fast"}))
+
+    def test_workers_not_in_key(self):
+        self.assertEqual(ResultCache.key(b"abc", parse_pdf, {"workers": 4, "deadline": 1e9}),
+                         ResultCache.key(b"abc", parse_pdf, {}))
+
+    def test_options_normalized_to_parser_defaults(self):
+        self.assertEqual(ResultCache.key(b"abc", parse_pdf, {}),
+                         ResultCache.key(b"abc", parse_pdf, {"pages": None, "text": True, "tables": True,
+                                                             "images": True, "mode": "layout"}))
+        self.assertEqual(ResultCache.key(b"abc", parse_xlsx, {}),
+                         ResultCache.key(b"abc", parse_xlsx, {"preview_rows": None, "string_table": False}))
+        self.assertNotEqual(ResultCache.key(b"abc", parse_xlsx, {}),
+                            ResultCache.key(b"abc", parse_xlsx, {"string_table": True}))
+        with self.assertRaises(TypeError):
+            ResultCache.key(b"abc", parse_pdf, {"unknown": 1})
+
+    def test_path_and_bytes_share_key(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"abc" * 1000)
+            self.assertEqual(ResultCache.key(path, parse_pdf), ResultCache.key(b"abc" * 1000, parse_pdf))
+        finally:
+            os.remove(path)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_memory_lru_bounded_by_bytes(self):
+        cache = ResultCache(memory_bytes=100)
+        cache.put("a", {"v": "x" * 30})
+        cache.put("b", {"v": "y" * 30})
+        cache.get("a")  # a 成为最近使用
+        cache.put("c", {"v": "z" * 30})
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        stats = cache.stats()
+        self.assertEqual(stats["memory_evictions"], 1)
+        self.assertEqual(stats["memory_entries"], 2)
+        self.assertLessEqual(stats["memory_bytes"], 100)
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertAlmostEqual(stats["hit_ratio"], 2 / 3)
+
+    def test_results_are_copies(self):
+        cache = ResultCache()
+        cache.put("a", {"pages": [1]})
+        cache.get("a")["pages"].append(2)
+        self.assertEqual(cache.get("a"), {"pages": [1]})
+
+    def test_disk_tier_survives_restart(self):
+        cache = ResultCache(path=self.path)
+        cache.put("a", {"v": 1})
+        cache.close()
+        cache = ResultCache(path=self.path)
+        self.assertEqual(cache.get("a"), {"v": 1})
+        self.assertEqual(cache.get("a"), {"v": 1})
+        stats = cache.stats()
+        self.assertEqual((stats["disk_hits"], stats["memory_hits"]), (1, 1))
+        cache.close()
+
+    def test_disk_tier_bounded_by_bytes(self):
+        cache = ResultCache(memory_bytes=0, path=self.path, disk_bytes=100)
+        for key in "abcd":
+            cache.put(key, {"v": key * 30})
+        stats = cache.stats()
+        self.assertLessEqual(stats["disk_bytes"], 100)
+        self.assertEqual(stats["disk_evictions"], 4 - stats["disk_entries"])
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("d"))
+        cache.close()
+
+    def test_parse_calls_parser_once(self):
+        cache = ResultCache()
+        data = make_pdf(pages=2, lines=1)
+        with mock.patch("result_cache.ResultCache.put", wraps=cache.put) as put:
+            first = cache.parse(parse_pdf, data, pages="1")
+            second = cache.parse(parse_pdf, data, pages="1", workers=2)
+        self.assertEqual(first, second)
+        self.assertEqual(put.call_count, 1)
+
+    def test_partial_results_not_cached(self):
+        cache = ResultCache()
+        self.assertFalse(cache.put("k", {"pages": [], "partial": True}))
+        self.assertIsNone(cache.get("k"))
+
+
+if __name__ == "__main__":
+    unittest.main()